@@ -1,13 +1,8 @@
 __version__ = "1.0.0-alpha.0"
 
 # Overrides for Standard Frappe Doctypes 
+# Google Calendar se parchea al importarse por primera vez, no al cargar la app
 
-from frappe.integrations.doctype.google_calendar import google_calendar
-from extended_calendars.overrides.google_calendar.custom_google_calendar import (
-    update_event_in_calendar as custom_update_event_in_calendar,
-    get_google_calendar_object as custom_get_google_calendar_object,
-    authorize_access as custom_authorize_access,
-)
-google_calendar.update_event_in_calendar = custom_update_event_in_calendar
-google_calendar.get_google_calendar_object = custom_get_google_calendar_object
-google_calendar.authorize_access = custom_authorize_access
+from extended_calendars.overrides.google_calendar import patches as google_calendar_patches
+
+google_calendar_patches.install()
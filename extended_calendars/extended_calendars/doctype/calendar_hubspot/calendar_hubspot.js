@@ -2,6 +2,14 @@
 // For license information, please see license.txt
 
 frappe.ui.form.on('Calendar Hubspot', {
+    setup: function(frm) {
+        frappe.realtime.on('calendar_sync_progress', function(data) {
+            if (data.doctype === frm.doctype && data.calendar === frm.doc.name) {
+                show_hubspot_sync_progress(data);
+            }
+        });
+    },
+
     refresh: function(frm) {
         // Botón Sync HubSpot
         frm.add_custom_button(__('Sync HubSpot'), function() {
@@ -25,49 +33,20 @@ frappe.ui.form.on('Calendar Hubspot', {
             frappe.confirm(
                 __('Are you sure you want to sync with HubSpot? This will pull data to HubSpot and then push data from HubSpot.'),
                 function() {
-                    let current_progress = 0;
-                    let maximum_progress = 100;
-                    let yield_progress = 90;
-                    let time_interval = 200;
-                    let finish_time_interval = 1000;
-                    let title = __('Syncing with HubSpot');
-                    frappe.show_alert({indicator: 'green', message: __(title)});
-                    frappe.show_progress(title, current_progress, maximum_progress, 'Please wait');
-                    let progress_interval = setInterval(function() {
-                        if (current_progress < yield_progress) {
-                            current_progress += 1;
-                            frappe.show_progress(title, current_progress, maximum_progress, __('Processing: ') + current_progress + '%');
-                        }
-                    }, time_interval);
                     frappe.call({
                         method: 'extended_calendars.extended_calendars.doctype.calendar_hubspot.calendar_hubspot.sync_hubspot_data',
                         args: { hubspot_doc: frm.doc.name },
                         callback: function(r) {
-                            clearInterval(progress_interval);
-                            frappe.show_progress(title, maximum_progress, maximum_progress, __('Synchronization complete!'));
-                            setTimeout(function() {
-                                frappe.hide_progress();
-                                if (r.message) {
-                                    frappe.msgprint({
-                                        title: __('Sync Completed'),
-                                        indicator: 'green',
-                                        message: r.message.message || 'Sync completed.'
-                                    });
-                                }
-                            }, finish_time_interval);
+                            // El avance llega por realtime desde el trabajo en segundo plano
+                            frappe.show_alert({indicator: r.message.queued ? 'green' : 'orange', message: r.message.message});
+                            frappe.show_progress(__('Syncing with HubSpot'), 0, 100, __('Waiting for a background worker'));
                         },
                         error: function(r) {
-                            // Detener simulación y mostrar error
-                            clearInterval(progress_interval);
-                            frappe.show_progress(title , yield_progress, maximum_progress, __('Error occurred during synchronization.'));
-                            setTimeout(function() {
-                                frappe.hide_progress();
-                                frappe.msgprint({
-                                    title: __('Error'),
-                                    indicator: 'red',
-                                    message: 'An error occurred while syncing. Check the logs for details.'
-                                });
-                            }, finish_time_interval);
+                            frappe.msgprint({
+                                title: __('Error'),
+                                indicator: 'red',
+                                message: 'An error occurred while starting the sync. Check the logs for details.'
+                            });
                         }
                     });
                 }
@@ -103,4 +82,24 @@ frappe.ui.form.on('Calendar Hubspot', {
             frappe.msgprint("Push is disabled. Enable it to send data to HubSpot.");
         }
     }
-});
\ No newline at end of file
+});
+
+function show_hubspot_sync_progress(data) {
+    let title = __('Syncing with HubSpot');
+    if (data.stage === 'started') {
+        frappe.show_progress(title, 5, 100, 'Please wait');
+    } else if (data.stage === 'pull') {
+        frappe.show_progress(title, Math.min(60, 5 + data.pages * 5), 100,
+            __('Pull: {0} meetings processed ({1} created, {2} updated)', [data.records, data.created, data.updated]));
+    } else if (data.stage === 'push') {
+        frappe.show_progress(title, 70, 100, __('Pushing events'));
+    } else if (data.stage === 'finished') {
+        frappe.hide_progress();
+        let result = data.result || {};
+        frappe.msgprint({
+            title: result.success ? __('Sync Completed') : __('Error'),
+            indicator: result.success ? 'green' : 'red',
+            message: result.message || 'Sync completed.'
+        });
+    }
+}
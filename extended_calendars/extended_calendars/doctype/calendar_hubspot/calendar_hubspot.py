@@ -3,11 +3,22 @@
 
 import frappe
 import json
-import time
+import logging
 from frappe.model.document import Document
 import requests
 from datetime import datetime, timedelta
 from frappe.utils import get_datetime
+from extended_calendars.sync.adapter import ProviderAdapter
+from extended_calendars.sync.concurrency import map_concurrently
+from extended_calendars.sync.config import get_provider_config, invalidate_provider_config
+from extended_calendars.sync.engine import run_pull, run_push
+from extended_calendars.sync.http import get_session
+from extended_calendars.sync.jobs import enqueue_sync
+from extended_calendars.sync.metrics import track_sync_run
+from extended_calendars.sync.push import get_events_to_push, mark_event_pushed, mark_events_pushed
+from extended_calendars.sync.resilience import IDEMPOTENCY_HEADER, expire_create_key, get_create_key
+
+logger = logging.getLogger(__name__)
 
 # Constantes para URLs de la API de HubSpot
 HUBSPOT_API_BASE = "https://api.hubapi.com/crm/v3"
@@ -25,6 +36,11 @@ MEETING_PROPERTIES = [
     "hs_meeting_body"
 ]
 
+# Límite de solicitudes por token y timeout por solicitud
+HUBSPOT_RATE_LIMIT = 100
+HUBSPOT_RATE_PERIOD = 10
+HUBSPOT_TIMEOUT = 10
+
 # Códigos de estado HTTP exitosos
 SUCCESS_STATUS_CODES = {200, 201, 204}
 
@@ -37,24 +53,31 @@ HUBSPOT_ASSOCIATION = {
 
 @frappe.whitelist()
 def sync_hubspot_data(hubspot_doc):
+    """Queue the HubSpot sync in the background; progress is published over realtime."""
+    return enqueue_sync("Calendar Hubspot", hubspot_doc)
+
+
+def run_hubspot_sync(hubspot_doc):
     """Execute pull followed by push for HubSpot calendar synchronization."""
-    print(f"Executing sync_hubspot_data for doc: {hubspot_doc}")
+    print(f"Executing run_hubspot_sync for doc: {hubspot_doc}")
     
     # Inicializar resultados
     pull_result = {"success": False, "message": "Pull skipped (disabled)", "stats": {}}
     push_result = {"success": False, "message": "Push skipped (disabled)", "stats": {"total_events": 0, "successful": 0, "skipped": 0}}
 
-    doc = frappe.get_doc("Calendar Hubspot", hubspot_doc)
+    adapter = HubspotAdapter(hubspot_doc)
+    config = adapter.config
 
-    # Ejecutar pull si está habilitado
-    if doc.pull:
-        print("Running pull_hubspot_data...")
-        pull_result = pull_hubspot_data(hubspot_doc)
+    with track_sync_run("Calendar Hubspot", adapter.calendar):
+        # Ejecutar pull si está habilitado
+        if config["pull"]:
+            print("Running pull_hubspot_data...")
+            pull_result = run_pull(adapter)
 
-    # Ejecutar push si está habilitado
-    if doc.push:
-        print("Running push_hubspot_data...")
-        push_result = push_hubspot_data(hubspot_doc)
+        # Ejecutar push si está habilitado
+        if config["push"]:
+            print("Running push_hubspot_data...")
+            push_result = run_push(adapter)
     
     # Combinar resultados
     combined_message = (
@@ -62,12 +85,13 @@ def sync_hubspot_data(hubspot_doc):
         f"<b>Push Result:</b> {push_result.get('message', 'No push result')}"
     )
     
-    if pull_result.get("stats", {}).get("total_meetings"):
+    if pull_result.get("stats", {}).get("total_records"):
         combined_message += (
             f"<br><br><b>Pull Stats:</b><br>"
-            f"- Total Meetings: {pull_result['stats']['total_meetings']}<br>"
+            f"- Total Meetings: {pull_result['stats']['total_records']}<br>"
             f"- Events Created: {pull_result['stats']['created_count']}<br>"
             f"- Events Updated: {pull_result['stats']['updated_count']}<br>"
+            f"- Events Unchanged: {pull_result['stats']['unchanged_count']}<br>"
             f"- Events Skipped: {pull_result['stats']['skipped_count']}"
         )
     # Incluir estadísticas si están disponibles
@@ -148,6 +172,22 @@ class CalendarHubspot(Document):
             frappe.throw("No token has been entered in 'Access Token'.")
         return self.access_token
 
+    def get_config(self):
+        """Return the credentials and flags used by hooks and sync entry points."""
+        return {
+            "access_token": self.get_access_token(),
+            "calendar_id": self.calendar_id,
+            "owner_id": getattr(self, "owner_id", None),
+            "pull": self.pull,
+            "push": self.push
+        }
+
+    def on_update(self):
+        invalidate_provider_config(self.doctype, self.name)
+
+    def on_trash(self):
+        invalidate_provider_config(self.doctype, self.name)
+
 
 @frappe.whitelist()
 def get_contact_id_with_firstname(firstname, access_token, headers):
@@ -175,7 +215,7 @@ def get_contact_id_with_firstname(firstname, access_token, headers):
     }
     try:
         while True:
-            response = requests.get(CONTACTS_URL, headers=headers, params=params)
+            response = get_session("Calendar Hubspot").get(CONTACTS_URL, headers=headers, params=params, timeout=HUBSPOT_TIMEOUT)
             print(f"API response for contacts fetch: {response.status_code}")
             
             if response.status_code not in SUCCESS_STATUS_CODES:
@@ -225,7 +265,7 @@ def create_hubspot_contact(mobile_no, first_name, owner_id, headers):
         payload["properties"]["hubspot_owner_id"] = owner_id
     
     try:
-        response = requests.post(CONTACTS_URL, headers=headers, json=payload)
+        response = get_session("Calendar Hubspot").post(CONTACTS_URL, headers=headers, json=payload, timeout=HUBSPOT_TIMEOUT)
         print(f"Create contact API response: {response.status_code}, {response.text}")
         
         if response.status_code in SUCCESS_STATUS_CODES:
@@ -261,207 +301,147 @@ def get_or_create_frappe_contact(email, first_name, last_name):
     print(f"Created new Contact for email {email}: {contact.name}")
     return contact.name
 
-@frappe.whitelist()
-def pull_hubspot_data(hubspot_doc):
-    """Fetch meeting data from HubSpot and create/update events in Frappe's Event Doctype."""
-    print(f"Executing pull_hubspot_data for doc: {hubspot_doc}")
-    doc = frappe.get_doc("Calendar Hubspot", hubspot_doc)
-    
-    if not doc.pull:
-        print("Pull is disabled.")
-        return {"success": False, "message": "Pull is disabled."}
-    
-    access_token = doc.get_access_token()
-    calendar_id = doc.calendar_id
-    headers = get_headers(access_token)
-    print(f"Using access token: {access_token}, Calendar ID: {calendar_id}")
-    
-    params = {
-        "properties": ",".join(MEETING_PROPERTIES),  # Corregido: usar join en lugar de currents
-        "limit": "100"
-    }
-
-    all_meetings = []
-    next_page = None
-    page_count = 0
-    total_meetings = 0
-    created_count = 0
-    updated_count = 0
-    skipped_count = 0
-
-    try:
+class HubspotAdapter(ProviderAdapter):
+    """Sync engine adapter for HubSpot meetings."""
+
+    doctype = "Calendar Hubspot"
+    sync_method = "extended_calendars.extended_calendars.doctype.calendar_hubspot.calendar_hubspot.run_hubspot_sync"
+    # Private apps may send 100 requests every 10 seconds
+    rate_limit = (HUBSPOT_RATE_LIMIT, HUBSPOT_RATE_PERIOD)
+    has_participants = True
+
+    def __init__(self, calendar):
+        super().__init__(calendar)
+        self.headers = get_headers(self.config["access_token"])
+        self.session = get_session(self.doctype)
+        self.participants = {}
+        self.hubspot_contacts = {}
+        self.frappe_contacts = {}
+
+    def get(self, url, params=None):
+        self.throttle()
+        return self.session.get(url, headers=self.headers, params=params, timeout=HUBSPOT_TIMEOUT)
+
+    def fetch_pages(self):
+        """Yield meetings page by page, following the `paging.next.after` cursor.
+
+        The cursor is the `after` of the next page, so a resumed pull starts there.
+        """
+        params = {"properties": ",".join(MEETING_PROPERTIES), "limit": "100"}
+        if self.resume_from:
+            params["after"] = self.resume_from
         while True:
-            page_count += 1
-            current_params = params.copy()
-            if next_page:
-                current_params["after"] = next_page
-
-            print(f"Fetching page {page_count} of meetings...")
-            response = requests.get(MEETINGS_URL, headers=headers, params=current_params)
-            
+            response = self.get(MEETINGS_URL, params=params)
             if response.status_code not in SUCCESS_STATUS_CODES:
                 error_msg = f"Error fetching meetings: {response.status_code} - {response.text}"
-                print(error_msg)
+                frappe.log_error(error_msg)
                 frappe.throw(error_msg)
 
             data = response.json()
             meetings = data.get("results", [])
-            total_meetings += len(meetings)
-            print(f"Found {len(meetings)} meetings in this batch (Total: {total_meetings})")
-
-            for meeting in meetings:
-                meeting_id = meeting.get("id")
-                if not meeting_id:
-                    print("Skipping meeting: No ID found.")
-                    skipped_count += 1
-                    continue
-
-                # Buscar el evento existente incluyendo el campo custom_sync_with_calendar_provider
-                event_info = frappe.db.get_value(
-                    "Event",
-                    {"custom_calendar_event_id": meeting_id},
-                    ["name", "custom_sync_with_calendar_provider"],
-                    as_dict=True
-                )
-                
-                event_exists = bool(event_info)
-                sync_enabled = event_exists and event_info.get("custom_sync_with_calendar_provider") == 1
-                
-                print(f"Checking event with meeting_id {meeting_id}: "
-                      f"Exists={event_exists}, SyncEnabled={sync_enabled}")
-
-                # Si el evento existe pero no tiene sync habilitado, saltar
-                if event_exists and not sync_enabled:
-                    print(f"Skipping meeting {meeting_id}: Sync not enabled for existing event")
-                    skipped_count += 1
-                    continue
-                
-                properties = meeting.get("properties", {})
-                subject = properties.get("hs_meeting_title", "Reunión")
-                start_time_str = properties.get("hs_meeting_start_time", "1970-01-01T00:00:00Z")
-                end_time_str = properties.get("hs_meeting_end_time", "1970-01-01T00:00:00Z")
-                
-                start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
-                end_time = datetime.fromisoformat(end_time_str.replace("Z", "+00:00"))
-                start_time_formatted = start_time.strftime("%Y-%m-%d %H:%M:%S")
-                end_time_formatted = end_time.strftime("%Y-%m-%d %H:%M:%S")
-                description = properties.get("hs_meeting_body", "")
-
-                # Obtener participantes
-                participants = []
-                assoc_response = requests.get(
-                    MEETING_ASSOCIATIONS_URL.format(meeting_id=meeting_id),
-                    headers=headers
-                )
-                if assoc_response.status_code in SUCCESS_STATUS_CODES:
-                    assoc_data = assoc_response.json()
-                    for result in assoc_data.get("results", []):
-                        contact_id = result.get("id")
-                        if contact_id:
-                            contact_response = requests.get(
-                                CONTACT_URL.format(contact_id=contact_id),
-                                headers=headers,
-                                params={"properties": "firstname,lastname,email"}
-                            )
-                            if contact_response.status_code in SUCCESS_STATUS_CODES:
-                                contact_data = contact_response.json()
-                                contact_props = contact_data.get("properties", {})
-                                participants.append({
-                                    "email": contact_props.get("email"),
-                                    "first_name": contact_props.get("firstname"),
-                                    "last_name": contact_props.get("lastname")
-                                })
-
-                # Preparar datos del evento
-                event_data = {
-                    "subject": subject,
-                    "starts_on": start_time_formatted,
-                    "ends_on": end_time_formatted,
-                    "description": description,
-                    "custom_calendar_event_id": meeting_id,
-                    "custom_calendar_provider": "Calendar Hubspot",
-                    "custom_hubspot_calendar_id": calendar_id,
-                    "custom_pulled_from_calendar_provider": 1,
-                    "custom_calendar": hubspot_doc,
-                    "custom_sync_with_calendar_provider": 1
-                }
-
-                # Procesar participantes
-                event_participants = []
-                for participant in participants:
-                    if participant.get("email"):
-                        contact_name = get_or_create_frappe_contact(
-                            participant["email"],
-                            participant["first_name"],
-                            participant["last_name"]
-                        )
-                        event_participants.append({
-                            "reference_doctype": "Contact",
-                            "reference_docname": contact_name
-                        })
-
-                if event_exists:
-                    event_name = event_info["name"]
-                    print(f"Updating existing event {event_name}...")
-                    event = frappe.get_doc("Event", event_name)
-                    event.update(event_data)
-                    event.set("event_participants", event_participants)
-                    event.save(ignore_permissions=True)
-                    updated_count += 1
-                    print(f"Updated event {event_name} with meeting_id {meeting_id}")
-                else:
-                    print(f"Creating new event for meeting_id {meeting_id}...")
-                    event = frappe.get_doc({
-                        "doctype": "Event",
-                        **event_data,
-                        "event_participants": event_participants
-                    })
-                    event.insert(ignore_permissions=True)
-                    created_count += 1
-                    print(f"Created new event {event.name} with meeting_id {meeting_id}")
-
-                all_meetings.append(meeting)
-                time.sleep(0.1)
+            logger.debug(f"Found {len(meetings)} meetings in this batch")
+            after = data.get("paging", {}).get("next", {}).get("after")
+            self.cursor = after
+            yield meetings
 
-            if "paging" in data and "next" in data["paging"]:
-                next_page = data["paging"]["next"]["after"]
-            else:
+            if not after:
                 break
+            params["after"] = after
+
+    def prepare_page(self, records):
+        """Fetch the participants of every meeting in the page concurrently."""
+        meeting_ids = [meeting.get("id") for meeting in records if meeting.get("id")]
+        self.participants.update(map_concurrently(self.fetch_meeting_participants, meeting_ids))
+
+    def fetch_meeting_participants(self, meeting_id):
+        response = self.get(MEETING_ASSOCIATIONS_URL.format(meeting_id=meeting_id))
+        if response.status_code not in SUCCESS_STATUS_CODES:
+            return []
+        contact_ids = [result.get("id") for result in response.json().get("results", []) if result.get("id")]
+        return [contact for contact in map(self.fetch_hubspot_contact, contact_ids) if contact]
+
+    def fetch_hubspot_contact(self, contact_id):
+        # Contacts are shared across meetings: fetch each one once per run
+        if contact_id not in self.hubspot_contacts:
+            response = self.get(CONTACT_URL.format(contact_id=contact_id), params={"properties": "firstname,lastname,email"})
+            contact = None
+            if response.status_code in SUCCESS_STATUS_CODES:
+                properties = response.json().get("properties", {})
+                contact = {
+                    "email": properties.get("email"),
+                    "first_name": properties.get("firstname"),
+                    "last_name": properties.get("lastname")
+                }
+            self.hubspot_contacts[contact_id] = contact
+        return self.hubspot_contacts[contact_id]
+
+    def map_record(self, record, existing):
+        meeting_id = record.get("id")
+        properties = record.get("properties", {})
+        start_time = datetime.fromisoformat(properties.get("hs_meeting_start_time", "1970-01-01T00:00:00Z").replace("Z", "+00:00"))
+        end_time = datetime.fromisoformat(properties.get("hs_meeting_end_time", "1970-01-01T00:00:00Z").replace("Z", "+00:00"))
+
+        event_participants = []
+        for participant in self.participants.get(meeting_id, []):
+            if participant.get("email"):
+                event_participants.append({
+                    "reference_doctype": "Contact",
+                    "reference_docname": self.get_frappe_contact(participant)
+                })
 
-        result = {
-            "total_meetings": total_meetings,
-            "page_count": page_count,
-            "created_count": created_count,
-            "updated_count": updated_count,
-            "skipped_count": skipped_count,
-            "meetings": all_meetings
-        }
-        
-        print("\nHubSpot Meetings Data Processed:")
-        print(f"Total meetings fetched: {total_meetings} from {page_count} pages")
-        print(f"Events created: {created_count}, Events updated: {updated_count}, Events skipped: {skipped_count}")
         return {
-            "success": True,
-            "message": f"Processed {total_meetings} meetings: {created_count} created, {updated_count} updated, {skipped_count} skipped",
-            "stats": result
+            "subject": properties.get("hs_meeting_title", "Reunión"),
+            "starts_on": start_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "ends_on": end_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "description": properties.get("hs_meeting_body", ""),
+            "custom_calendar_provider": self.doctype,
+            "custom_hubspot_calendar_id": self.config["calendar_id"],
+            "custom_pulled_from_calendar_provider": 1,
+            "custom_calendar": self.calendar,
+            "custom_sync_with_calendar_provider": 1,
+            "event_participants": event_participants
         }
 
-    except Exception as e:
-        error_msg = f"Pull error: {str(e)}"
-        print(error_msg)
-        frappe.log_error(error_msg, "HubSpot Pull Error")
-        return {
-            "success": False,
-            "message": error_msg
-        }
+    def get_frappe_contact(self, participant):
+        email = participant["email"]
+        if email not in self.frappe_contacts:
+            self.frappe_contacts[email] = get_or_create_frappe_contact(
+                email,
+                participant["first_name"],
+                participant["last_name"]
+            )
+        return self.frappe_contacts[email]
+
+    def push_batch(self):
+        return push_hubspot_data(self.calendar)
+
+    @classmethod
+    def insert_event(cls, doc, method=None):
+        insert_event_in_calendar_hubspot(doc, method)
+
+    @classmethod
+    def update_event(cls, doc, method=None):
+        update_event_in_calendar_hubspot(doc, method)
+
+    @classmethod
+    def delete_event(cls, doc, method=None):
+        delete_event_in_calendar_hubspot(doc, method)
+
+@frappe.whitelist()
+def pull_hubspot_data(hubspot_doc):
+    """Fetch meeting data from HubSpot and create/update events in Frappe's Event Doctype."""
+    print(f"Executing pull_hubspot_data for doc: {hubspot_doc}")
+    result = run_pull(HubspotAdapter(hubspot_doc))
+    print(result["message"])
+    return result
 
 @frappe.whitelist()
 def push_hubspot_data(hubspot_doc):
     """Push events to HubSpot, creating or updating meetings based on custom_calendar_event_id."""
     print(f"Executing push_hubspot_data for doc: {hubspot_doc}")
-    doc = frappe.get_doc("Calendar Hubspot", hubspot_doc)
+    config = get_provider_config("Calendar Hubspot", hubspot_doc)
     
-    if not doc.push:
+    if not config["push"]:
         print("Push is disabled.")
         return {
             "success": False,
@@ -469,8 +449,8 @@ def push_hubspot_data(hubspot_doc):
             "stats": {"total_events": 0, "successful": 0, "skipped": 0}
         }
     
-    access_token = doc.get_access_token()
-    calendar_id = doc.calendar_id
+    access_token = config["access_token"]
+    calendar_id = config["calendar_id"]
     if not calendar_id:
         error_msg = "Calendar ID is not set in the Calendar Hubspot document."
         print(error_msg)
@@ -479,29 +459,26 @@ def push_hubspot_data(hubspot_doc):
     headers = get_headers(access_token)
     print(f"Using access token: {access_token}, Calendar ID: {calendar_id}")
     
-    # Filtrar eventos que cumplan con los criterios exactos
-    events = frappe.get_all(
-        "Event",
-        filters={
-            "custom_calendar_provider": "Calendar Hubspot",
-            "custom_sync_with_calendar_provider": 1,
-            "custom_calendar": hubspot_doc
-        },
-        fields=["name", "subject", "description", "starts_on", "ends_on", 
-                "custom_calendar_event_id"]
+    # Only events changed since their last successful push
+    events = get_events_to_push(
+        "Calendar Hubspot",
+        hubspot_doc,
+        ["name", "subject", "description", "starts_on", "ends_on", 
+         "custom_sync_with_calendar_provider", "custom_calendar_event_id"]
     )
     
     if not events:
-        print(f"No events found for calendar {hubspot_doc} with sync enabled.")
+        print(f"No changed events found for calendar {hubspot_doc} with sync enabled.")
         return {
             "success": True,
-            "message": f"No events found for calendar {hubspot_doc} with sync enabled.",
+            "message": f"No changed events found for calendar {hubspot_doc} with sync enabled.",
             "stats": {"total_events": 0, "successful": 0, "skipped": 0}
         }
     
-    owner_id = getattr(doc, "owner_id", None)
+    owner_id = config["owner_id"]
     success_count = 0
     skipped_count = 0
+    pushed_events = []
     
     for event in events:
         try:
@@ -511,18 +488,19 @@ def push_hubspot_data(hubspot_doc):
             custom_id = event.get("custom_calendar_event_id")
             if custom_id:
                 print(f"Found existing meeting ID: {custom_id}")
-                response = requests.get(f"{MEETINGS_URL}/{custom_id}", headers=headers)
+                response = get_session("Calendar Hubspot").get(f"{MEETINGS_URL}/{custom_id}", headers=headers, timeout=HUBSPOT_TIMEOUT)
                 print(f"Check API response: {response.status_code}")
                 
                 if response.status_code in SUCCESS_STATUS_CODES:
                     success, message = update_hubspot_meeting(event, access_token, headers, owner_id)
                 else:
-                    success, message, meeting_id = push_hubspot_meeting(event, access_token, headers, owner_id)
+                    success, message, meeting_id = push_hubspot_meeting(event, access_token, headers, owner_id, calendar=hubspot_doc)
             else:
-                success, message, meeting_id = push_hubspot_meeting(event, access_token, headers, owner_id)
+                success, message, meeting_id = push_hubspot_meeting(event, access_token, headers, owner_id, calendar=hubspot_doc)
                 
             if success:
                 success_count += 1
+                pushed_events.append(event)
                 print(f"Successfully processed event {event.name}: {message}")
             else:
                 print(f"Failed to process event {event.name}: {message}")
@@ -535,6 +513,9 @@ def push_hubspot_data(hubspot_doc):
             skipped_count += 1
             continue
     
+    mark_events_pushed(pushed_events)
+    frappe.db.commit()
+    
     result = {
         "success": True,
         "message": f"Processed {success_count}/{len(events)} events to HubSpot. Skipped {skipped_count} events.",
@@ -549,8 +530,12 @@ def push_hubspot_data(hubspot_doc):
 
 
 @frappe.whitelist()
-def push_hubspot_meeting(event, access_token, headers, owner_id=None):
-    """Push a new meeting to HubSpot and update the event with the new meeting ID."""
+def push_hubspot_meeting(event, access_token, headers, owner_id=None, calendar=None):
+    """Push a new meeting to HubSpot and update the event with the new meeting ID.
+
+    `calendar` is the Calendar Hubspot the meeting is created for; it is part of the
+    idempotency key, so an Event moved to another calendar creates a new meeting.
+    """
     print(f"Pushing new meeting for event {event.name}")
     
     participants = frappe.get_all(
@@ -587,7 +572,10 @@ def push_hubspot_meeting(event, access_token, headers, owner_id=None):
     print(f"Pushing new meeting to HubSpot: {event.name}")
     print(f"Meeting data: {json.dumps(meeting_data, indent=2)}")
     
-    response = requests.post(MEETINGS_URL, headers=headers, json=meeting_data)
+    # A retried create of the same event returns the meeting that was already created
+    create_key = get_create_key("Calendar Hubspot", calendar or event.get("custom_calendar"), event.name, meeting_data)
+    headers = {**headers, IDEMPOTENCY_HEADER: create_key}
+    response = get_session("Calendar Hubspot").post(MEETINGS_URL, headers=headers, json=meeting_data, timeout=HUBSPOT_TIMEOUT)
     print(f"Push API response: {response.status_code}, {response.text}")
     
     if response.status_code in SUCCESS_STATUS_CODES:
@@ -601,6 +589,7 @@ def push_hubspot_meeting(event, access_token, headers, owner_id=None):
                 update_modified=False
             )
             frappe.db.commit()
+            expire_create_key(create_key)
             return True, f"Successfully pushed event {event.name} to HubSpot with ID {meeting_id}", meeting_id
         error_msg = f"Meeting created but no ID returned for event {event.name}"
         print(error_msg)
@@ -656,7 +645,7 @@ def update_hubspot_meeting(event, access_token, headers, owner_id=None):
     print(f"Updating meeting in HubSpot: {event.name}")
     print(f"Meeting data: {json.dumps(meeting_data, indent=2)}")
     
-    response = requests.patch(url, headers=headers, json=meeting_data)
+    response = get_session("Calendar Hubspot").patch(url, headers=headers, json=meeting_data, timeout=HUBSPOT_TIMEOUT)
     print(f"Update API response: {response.status_code}, {response.text}")
     
     if response.status_code in SUCCESS_STATUS_CODES:
@@ -678,7 +667,7 @@ def delete_hubspot_meeting(event, access_token, headers):
     url = f"{MEETINGS_URL}/{custom_id}"
     print(f"Deleting meeting in HubSpot: {event.name}")
     
-    response = requests.delete(url, headers=headers)
+    response = get_session("Calendar Hubspot").delete(url, headers=headers, timeout=HUBSPOT_TIMEOUT)
     print(f"Delete API response: {response.status_code}, {response.text}")
     
     if response.status_code in SUCCESS_STATUS_CODES:
@@ -696,16 +685,17 @@ def insert_event_in_calendar_hubspot(doc, method = None):
             and doc.custom_calendar_provider == "Calendar Hubspot" 
             and doc.custom_calendar
             and not doc.custom_calendar_event_id):
-            calendar = frappe.get_doc("Calendar Hubspot", doc.custom_calendar)
+            config = get_provider_config("Calendar Hubspot", doc.custom_calendar)
             event = frappe.get_doc("Event", doc.name)
-            access_token = calendar.get_access_token()
+            access_token = config["access_token"]
             headers = get_headers(access_token)
-            owner_id = calendar.calendar_id
+            owner_id = config["calendar_id"]
 
-            success, message, meeting_id = push_hubspot_meeting(event, access_token, headers, owner_id)
+            success, message, meeting_id = push_hubspot_meeting(event, access_token, headers, owner_id, calendar=doc.custom_calendar)
             if success:
                 event.custom_calendar_event_id = meeting_id
                 event.db_update()
+                mark_event_pushed(event)
                 frappe.msgprint(message)
         
     except frappe.DoesNotExistError:
@@ -727,14 +717,15 @@ def update_event_in_calendar_hubspot(doc, method = None):
             and doc.custom_calendar_provider == "Calendar Hubspot" 
             and doc.custom_calendar
             and doc.custom_calendar_event_id):
-            calendar = frappe.get_doc("Calendar Hubspot", doc.custom_calendar)
+            config = get_provider_config("Calendar Hubspot", doc.custom_calendar)
             event = frappe.get_doc("Event", doc.name)
-            access_token = calendar.get_access_token()
+            access_token = config["access_token"]
             headers = get_headers(access_token)
-            owner_id = calendar.calendar_id
+            owner_id = config["calendar_id"]
 
             success, message = update_hubspot_meeting(event, access_token, headers, owner_id)
             if success:
+                mark_event_pushed(event)
                 frappe.msgprint(message)
             else:
                 frappe.msgprint(f"Failed to update HubSpot meeting: {message}")
@@ -753,9 +744,9 @@ def delete_event_in_calendar_hubspot(doc, method = None):
             and doc.custom_calendar_provider == "Calendar Hubspot" 
             and doc.custom_calendar
             and doc.custom_calendar_event_id):
-            calendar = frappe.get_doc("Calendar Hubspot", doc.custom_calendar)
+            config = get_provider_config("Calendar Hubspot", doc.custom_calendar)
             event = frappe.get_doc("Event", doc.name)
-            access_token = calendar.get_access_token()
+            access_token = config["access_token"]
             headers = get_headers(access_token)
 
             success, message = delete_hubspot_meeting(event, access_token, headers)
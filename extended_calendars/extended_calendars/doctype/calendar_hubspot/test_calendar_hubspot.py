@@ -1,9 +1,76 @@
 # Copyright (c) 2025, Yeifer and Contributors
 # See license.txt
 
-# import frappe
+from datetime import timedelta
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import now_datetime
+
+from extended_calendars.extended_calendars.doctype.calendar_hubspot.calendar_hubspot import (
+	get_headers,
+	push_hubspot_meeting,
+)
+from extended_calendars.sync.push import get_events_to_push
+from extended_calendars.tests.simulator import ProviderSimulator
+
+MEETINGS_ROUTE = "POST /hubspot/crm/v3/objects/meetings"
 
 
 class TestCalendarHubspot(FrappeTestCase):
-	pass
+	def setUp(self):
+		self.simulator = ProviderSimulator(events=0).start().install()
+		self.addCleanup(self.simulator.stop)
+		self.contact = contact = frappe.get_doc({"doctype": "Contact", "first_name": "Contacto Hubspot", "mobile_no": "3001234567"}).insert(ignore_permissions=True)
+		starts_on = now_datetime()
+		self.event = frappe.get_doc({
+			"doctype": "Event",
+			"subject": "Reunión movida",
+			"event_type": "Private",
+			"starts_on": starts_on,
+			"ends_on": starts_on + timedelta(minutes=30),
+			"event_participants": [{"reference_doctype": "Contact", "reference_docname": contact.name}],
+		})
+		# Sin proveedor: los hooks de Event no envían nada por su cuenta
+		self.event.insert(ignore_permissions=True)
+
+	def push(self, calendar):
+		success, _message, meeting_id = push_hubspot_meeting(self.event, "sim-token", get_headers("sim-token"), calendar=calendar)
+		self.assertTrue(success)
+		return meeting_id
+
+	def test_create_key_includes_calendar(self):
+		meeting_id = self.push("Hubspot A")
+		# Reintento en el mismo calendario: se devuelve la reunión ya creada
+		self.assertEqual(self.push("Hubspot A"), meeting_id)
+		self.assertEqual(self.simulator.calls[MEETINGS_ROUTE], 1)
+
+		# El Event pasó a otro calendario: se crea una reunión nueva
+		self.assertNotEqual(self.push("Hubspot B"), meeting_id)
+		self.assertEqual(self.simulator.calls[MEETINGS_ROUTE], 2)
+
+	def test_insert_hook_marks_event_pushed(self):
+		name = frappe.db.get_value("Calendar Hubspot", {"calendar_name": "Hook HubSpot"})
+		calendar = frappe.get_doc("Calendar Hubspot", name) if name else frappe.new_doc("Calendar Hubspot")
+		calendar.update({"calendar_name": "Hook HubSpot", "usser": "hook@simulator.test", "access_token": "sim-token", "calendar_id": "sim-hubspot-calendar"})
+		calendar.save(ignore_permissions=True)
+
+		starts_on = now_datetime()
+		event = frappe.get_doc({
+			"doctype": "Event",
+			"subject": "Reunión desde el hook",
+			"event_type": "Private",
+			"starts_on": starts_on,
+			"ends_on": starts_on + timedelta(minutes=30),
+			"custom_sync_with_calendar_provider": 1,
+			"custom_calendar_provider": "Calendar Hubspot",
+			"custom_calendar": calendar.name,
+			"event_participants": [{"reference_doctype": "Contact", "reference_docname": self.contact.name}],
+		}).insert(ignore_permissions=True)
+
+		self.assertEqual(self.simulator.calls[MEETINGS_ROUTE], 1)
+		row = frappe.db.get_value("Event", event.name, ["modified", "custom_last_pushed_modified"], as_dict=True)
+		self.assertEqual(row.custom_last_pushed_modified, row.modified)
+		# Ya enviado por el hook: el push por lotes no lo vuelve a mandar
+		pending = get_events_to_push("Calendar Hubspot", calendar.name, ["name"])
+		self.assertNotIn(event.name, [pending_event.name for pending_event in pending])
@@ -0,0 +1,12 @@
+// Copyright (c) 2025, Yeifer and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on('Calendar Sync Run', {
+    refresh: function(frm) {
+        if (frm.doc.calendar) {
+            frm.add_custom_button(__('Open Calendar'), function() {
+                frappe.set_route('Form', frm.doc.provider, frm.doc.calendar);
+            });
+        }
+    }
+});
@@ -0,0 +1,15 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+
+
+class CalendarSyncRun(Document):
+	@staticmethod
+	def clear_old_logs(days=30):
+		"""Borra las ejecuciones más antiguas que `days` días (default_log_clearing_doctypes)."""
+		table = frappe.qb.DocType("Calendar Sync Run")
+		frappe.db.delete(table, filters=(table.creation < (Now() - Interval(days=days))))
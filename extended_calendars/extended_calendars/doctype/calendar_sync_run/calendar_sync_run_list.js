@@ -0,0 +1,11 @@
+// Copyright (c) 2025, Yeifer and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings['Calendar Sync Run'] = {
+    get_indicator: function(doc) {
+        if (doc.status === 'Failed') {
+            return [__('Failed'), 'red', 'status,=,Failed'];
+        }
+        return [__('Success'), 'green', 'status,=,Success'];
+    }
+};
@@ -0,0 +1,33 @@
+# Copyright (c) 2025, Yeifer and Contributors
+# See license.txt
+
+# import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from extended_calendars.sync.metrics import SyncMetrics, normalize_endpoint
+
+
+class TestCalendarSyncRun(FrappeTestCase):
+	def test_normalize_endpoint(self):
+		self.assertEqual(
+			normalize_endpoint("https://api.hubapi.com/crm/v3/objects/meetings/48213077211?archived=false"),
+			"api.hubapi.com/crm/v3/objects/meetings/{id}",
+		)
+		self.assertEqual(
+			normalize_endpoint("https://services.leadconnectorhq.com/calendars/aB3dE5fG7hJ9/free-slots"),
+			"services.leadconnectorhq.com/calendars/{id}/free-slots",
+		)
+
+	def test_add_pull_result(self):
+		metrics = SyncMetrics("GHL Calendar", "GHL-0001", "Sync")
+		metrics.add_pull_result({
+			"success": True,
+			"stats": {"total_records": 5, "created_count": 2, "unchanged_count": 3, "timings": {"fetch": 1.5}},
+		})
+		metrics.add_push_result({"success": False, "message": "timeout", "stats": {"successful": 1, "timings": {"push": 0.5}}})
+		self.assertEqual(metrics.rows["fetched"], 5)
+		self.assertEqual(metrics.rows["created"], 2)
+		self.assertEqual(metrics.rows["pushed"], 1)
+		self.assertEqual(metrics.timings, {"fetch": 1.5, "push": 0.5})
+		self.assertFalse(metrics.success)
+		self.assertEqual(metrics.errors, ["timeout"])
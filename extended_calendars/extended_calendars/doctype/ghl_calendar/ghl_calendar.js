@@ -2,6 +2,14 @@
 // For license information, please see license.txt
 
 frappe.ui.form.on("GHL Calendar", {
+    setup: function(frm) {
+        frappe.realtime.on("calendar_sync_progress", function(data) {
+            if (data.doctype === frm.doctype && data.calendar === frm.doc.name) {
+                show_ghl_sync_progress(data);
+            }
+        });
+    },
+
     refresh: function(frm) {
         // Botón Sync Calendar
         frm.add_custom_button(__("Sync Calendar"), function() {
@@ -16,73 +24,22 @@ frappe.ui.form.on("GHL Calendar", {
             frappe.confirm(
                 __('Are you sure you want to synchronize Calendar with GoHighLevel? This will fetch and push events for the specified calendar.'),
                 function() {
-                    let current_progress = 0;
-                    let maximum_progress = 100;
-                    let yield_progress = 90;
-                    let time_interval = 200;
-                    let finish_time_interval = 1000;
-                    let title = __("Synchronizing Calendar");
-                    frappe.show_alert({indicator: "green", message: __(title)});
-                    frappe.show_progress(title, current_progress, maximum_progress, __("Please wait"));
-                    let progress_interval = setInterval(function() {
-                        if (current_progress < yield_progress) {
-                            current_progress += 1;
-                            frappe.show_progress(title, current_progress, maximum_progress, __("Processing: ") + current_progress + "%");
-                        }
-                    }, time_interval);
                     frappe.call({
                         method: "extended_calendars.extended_calendars.doctype.ghl_calendar.ghl_calendar.sync_ghl_data",
                         args: {
                             doc_name: frm.doc.name
                         },
                         callback: function(r) {
-                            clearInterval(progress_interval);
-                            frappe.show_progress(title, maximum_progress, maximum_progress, __("Synchronization complete!"));
-                            setTimeout(function() {
-                                frappe.hide_progress();
-                                if (r.message && r.message.message) {
-                                    let message = r.message.message;
-                                    let indicator = r.message.success ? "green" : "orange";
-                                    let title = r.message.success ? __("Synchronization Completed") : __("Synchronization Completed with Issues");
-                                    
-                                    // Detalles adicionales de las estadísticas
-                                    let details = "";
-                                    if (r.message.pull_result && r.message.pull_result.stats) {
-                                        let pull_stats = r.message.pull_result.stats;
-                                        details += __("Pull: {0} events processed ({1} created, {2} updated, {3} skipped)\n", 
-                                            [pull_stats.total_events || 0, pull_stats.created_count || 0, pull_stats.updated_count || 0, pull_stats.skipped_count || 0]);
-                                    }
-                                    if (r.message.push_result && r.message.push_result.stats) {
-                                        let push_stats = r.message.push_result.stats;
-                                        details += __("Push: {0} events processed ({1} successful, {2} skipped)", 
-                                            [push_stats.total || 0, push_stats.success || 0, push_stats.skipped || 0]);
-                                    }
-                                    
-                                    frappe.msgprint({
-                                        title: title,
-                                        indicator: indicator,
-                                        message: message + (details ? "\n\n" + details : "")
-                                    });
-                                } else {
-                                    frappe.msgprint({
-                                        title: __("Error"),
-                                        indicator: "red",
-                                        message: __("No valid response received from the API.")
-                                    });
-                                }
-                            }, finish_time_interval);
+                            // El avance llega por realtime desde el trabajo en segundo plano
+                            frappe.show_alert({indicator: r.message.queued ? "green" : "orange", message: r.message.message});
+                            frappe.show_progress(__("Synchronizing Calendar"), 0, 100, __("Waiting for a background worker"));
                         },
                         error: function(r) {
-                            clearInterval(progress_interval);
-                            frappe.show_progress(title, yield_progress, maximum_progress, __("Error occurred during synchronization."));
-                            setTimeout(function() {
-                                frappe.hide_progress();
-                                frappe.msgprint({
-                                    title: __("Error"),
-                                    indicator: "red",
-                                    message: __("Failed to synchronize Calendar. Please check the error logs.")
-                                });
-                            }, finish_time_interval);
+                            frappe.msgprint({
+                                title: __("Error"),
+                                indicator: "red",
+                                message: __("Failed to start the Calendar synchronization. Please check the error logs.")
+                            });
                         }
                     });
                 },
@@ -112,4 +69,40 @@ frappe.ui.form.on("GHL Calendar", {
             frappe.msgprint(__("Calendar ID entered. Use the Sync Calendar button to proceed."));
         }
     }
-});
\ No newline at end of file
+});
+
+function show_ghl_sync_progress(data) {
+    let title = __("Synchronizing Calendar");
+    if (data.stage === "started") {
+        frappe.show_progress(title, 5, 100, __("Please wait"));
+    } else if (data.stage === "pull") {
+        frappe.show_progress(title, Math.min(60, 5 + data.pages * 5), 100,
+            __("Pull: {0} events processed ({1} created, {2} updated)", [data.records, data.created, data.updated]));
+    } else if (data.stage === "push") {
+        frappe.show_progress(title, 70, 100, __("Pushing events"));
+    } else if (data.stage === "finished") {
+        frappe.hide_progress();
+        let result = data.result || {};
+        let indicator = result.success ? "green" : "orange";
+        let message_title = result.success ? __("Synchronization Completed") : __("Synchronization Completed with Issues");
+
+        // Detalles adicionales de las estadísticas
+        let details = "";
+        if (result.pull_result && result.pull_result.stats) {
+            let pull_stats = result.pull_result.stats;
+            details += __("Pull: {0} events processed ({1} created, {2} updated, {3} skipped)\n",
+                [pull_stats.total_records || 0, pull_stats.created_count || 0, pull_stats.updated_count || 0, pull_stats.skipped_count || 0]);
+        }
+        if (result.push_result && result.push_result.stats) {
+            let push_stats = result.push_result.stats;
+            details += __("Push: {0} events processed ({1} successful, {2} skipped)",
+                [push_stats.total || 0, push_stats.success || 0, push_stats.skipped || 0]);
+        }
+
+        frappe.msgprint({
+            title: message_title,
+            indicator: indicator,
+            message: (result.message || __("No valid response received from the API.")) + (details ? "\n\n" + details : "")
+        });
+    }
+}
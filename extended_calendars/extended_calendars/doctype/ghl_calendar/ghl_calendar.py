@@ -3,29 +3,87 @@
 
 import frappe
 import requests
+import hashlib
 import json
 import time
 import logging
-import pytz
 import re
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import get_datetime, now_datetime
+from frappe.utils import add_months, get_datetime, now_datetime
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+from zoneinfo import ZoneInfo
 from functools import wraps
-
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+from redis.exceptions import LockError
+from extended_calendars.sync.cache import delete_hash, get_hash, set_hash, update_hash
+from extended_calendars.sync.config import get_provider_config, invalidate_provider_config
+from extended_calendars.sync.concurrency import map_concurrently, submit_with_context
+from extended_calendars.sync import rate_limit
+from extended_calendars.sync.adapter import ProviderAdapter
+from extended_calendars.sync.http import get_session
+from extended_calendars.sync.jobs import enqueue_sync
+from extended_calendars.sync.metrics import track_sync_run
+from extended_calendars.sync.engine import PullInterrupted, run_pull, run_push
+from extended_calendars.sync.push import get_events_to_push, mark_event_pushed, mark_events_pushed
+from extended_calendars.sync.resilience import IDEMPOTENCY_HEADER, expire_create_key, get_create_key
+
+# El nivel y los handlers los define el proceso (web o worker), no la importación
 logger = logging.getLogger(__name__)
 
+# Vigencia de la caché de contactos por location y usuario
+CONTACT_CACHE_TTL = 30 * 60
+
+# Tamaño de página al recorrer contactos (máximo permitido por GHL)
+CONTACTS_PAGE_SIZE = 100
+
+# Eventos por página en el pull (una consulta de existentes y una escritura por página)
+PULL_PAGE_SIZE = 200
+
+# Contactos por lote (y por commit) al sincronizar hacia el doctype Contact
+CONTACT_SYNC_CHUNK_SIZE = 1000
+
+# Tramos en los que se divide la ventana de eventos y reintentos por tramo
+EVENT_WINDOW_SLICE_DAYS = 7
+EVENT_SLICE_RETRIES = 2
+
+# Límite de solicitudes de GHL por token (100 solicitudes cada 10 segundos)
+GHL_RATE_LIMIT = 100
+GHL_RATE_PERIOD = 10
+
+# Vigencia de los metadatos del calendario en caché
+CALENDAR_METADATA_TTL = 10 * 60
+
+# Código de país de la location con el que se indexan, buscan y crean los teléfonos sin
+# prefijo; probar varios códigos haría coincidir números distintos (p. ej. de EE. UU. y
+# de Colombia)
+DEFAULT_COUNTRY_CODE = "+57"
+
 # Clase GHLCalendar
 class GHLCalendar(Document):
     def get_config(self):
         """Obtiene configuración del doctype GHL Calendar."""
         if not all([self.location_id, self.access_token, self.calendar_id]):
             frappe.throw(_("Los campos location_id, access_token y calendar_id son requeridos"))
-        return {"location_id": self.location_id, "access_token": self.access_token, "calendar_id": self.calendar_id}
+        return {
+            "location_id": self.location_id,
+            "access_token": self.access_token,
+            "calendar_id": self.calendar_id,
+            "slice_days": self.event_window_slice_days or EVENT_WINDOW_SLICE_DAYS,
+            "pull": self.pull,
+            "push": self.push
+        }
+
+    def on_update(self):
+        """Descarta la configuración y los metadatos en caché del calendario."""
+        invalidate_provider_config(self.doctype, self.name)
+        previous = self.get_doc_before_save()
+        for calendar_id in {self.calendar_id, previous.calendar_id if previous else None}:
+            if calendar_id:
+                invalidate_calendar_metadata(calendar_id)
+
+    def on_trash(self):
+        invalidate_provider_config(self.doctype, self.name)
 
 #TODO: Check if is really needed
 def with_ghl_config(func):
@@ -37,162 +95,136 @@ def with_ghl_config(func):
         return func(config, doc_name=doc_name, *args, **kwargs)
     return wrapper
 
-@frappe.whitelist()
-def pull_ghl_data(doc_name=None):
-    """Fetch event data from GoHighLevel and create/update events in Frappe's Event Doctype."""
-    logger.info(f"Iniciando pull_ghl_data para GHL Calendar: {doc_name}")
-    doc = frappe.get_doc("GHL Calendar", doc_name)
-    if not doc.pull:
-        logger.warning("Pull está deshabilitado")
-        return {"success": False, "message": "Pull is disabled."}
-    
-    # Sincronizar contactos y obtener caché
-    logger.info("Sincronizando contactos y generando caché antes de obtener eventos")
-    contacts_cache = fetch_contacts(doc_name=doc_name)  # Obtener todos los contactos
-    # Crear un diccionario para búsqueda rápida por contactId
-    contacts_cache_by_id = {contact["id"]: contact for contact in contacts_cache if contact["id"]}
-    logger.info(f"Caché de contactos generado con {len(contacts_cache_by_id)} entradas")
-    # Log para contactos sin teléfono
-    logger.info(f"Contactos sin teléfono en caché: {sum(1 for c in contacts_cache if not c.get('phone'))}")
-    
-    config = doc.get_config()
-    calendar_id = config["calendar_id"]
+class GHLAdapter(ProviderAdapter):
+    """Adaptador de GoHighLevel para el motor de sincronización."""
     
-    # Obtener eventos
-    start_date, end_date = get_default_date_range()
-    events_data = fetch_calendar_events(doc_name=doc_name, start_date=start_date, end_date=end_date)
-    events = events_data.get("events", [])
+    doctype = "GHL Calendar"
+    sync_method = "extended_calendars.extended_calendars.doctype.ghl_calendar.ghl_calendar.run_ghl_sync"
+    event_fields = ("subject", "starts_on", "ends_on", "description", "custom_client_name", "custom_contact_phone")
+    # El límite de tasa de GHL ya se aplica en make_api_request
+    rate_limit = None
     
-    stats = {"total_events": 0, "created_count": 0, "updated_count": 0, "skipped_count": 0}
+    def __init__(self, calendar):
+        super().__init__(calendar)
+        self.contacts = {}
     
-    try:
-        stats["total_events"] = len(events)
-        logger.info(f"Procesando {stats['total_events']} eventos")
-        
-        for event in events:
-            event_id = event.get("id")
-            if not event_id:
-                stats["skipped_count"] += 1
-                logger.warning("Omitiendo evento sin ID")
-                continue
-                
-            # Verificar si el evento ya existe
-            event_info = frappe.db.get_value(
-                "Event",
-                {"custom_calendar_event_id": event_id},
-                ["name", "custom_sync_with_calendar_provider", "custom_client_name", "custom_contact_phone"],
-                as_dict=True
-            )
-            if event_info and event_info.get("custom_sync_with_calendar_provider") != 1:
-                stats["skipped_count"] += 1
-                logger.warning(f"Omitiendo evento {event_id}: sincronización deshabilitada")
-                continue
-                
-            # Mapear datos del evento
-            start_time_raw = event.get("startTime", "1970-01-01T00:00:00+00:00")
-            end_time_raw = event.get("endTime", "1970-01-01T00:00:00+00:00")
-            logger.info(f"Evento {event_id}: startTime original={start_time_raw}, endTime original={end_time_raw}")
+    def fetch_pages(self):
+        """Metadatos y tramos de la ventana en paralelo; cada tramo se entrega por páginas.
 
-            bogota_tz = pytz.timezone("America/Bogota")
-            try:
-                start_time = datetime.fromisoformat(start_time_raw.replace("Z", "+00:00")).astimezone(bogota_tz)
-                end_time = datetime.fromisoformat(end_time_raw.replace("Z", "+00:00")).astimezone(bogota_tz)
-            except ValueError as e:
-                stats["skipped_count"] += 1
-                logger.error(f"Error al convertir fechas para evento {event_id}: {str(e)}")
-                continue
-            logger.info(f"Evento {event_id}: startTime convertido a Bogota={start_time.isoformat()}, endTime convertido a Bogota={end_time.isoformat()}")
-
-            # Inicializar event_data con los datos de GHL
-            event_data = {
-                "subject": event.get("title", "Evento GHL"),
-                "starts_on": start_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "ends_on": end_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "description": event.get("notes", ""),
-                "custom_pulled_from_calendar_provider": 1  # Siempre establecer este campo
-            }
-            
-            # Campos personalizados (solo para creación)
-            custom_data = {
-                "custom_calendar_event_id": event_id,
-                "custom_calendar_provider": "GHL Calendar",
-                "custom_ghl_calendar_id": calendar_id,
-                "custom_pulled_from_calendar_provider": 1,
-                "custom_calendar": doc_name,
-                "custom_sync_with_calendar_provider": 1
-            }
-            
-            # Manejar participantes
-            contact_id = event.get("contactId")
-            if contact_id:
-                logger.info(f"Buscando contacto {contact_id} en caché para evento {event_id}")
-                contact_data = contacts_cache_by_id.get(contact_id)
-                
-                if not contact_data:
-                    logger.warning(f"Contacto {contact_id} no encontrado en caché para evento {event_id}")
-                    # Preservar valores existentes en Frappe si el evento ya existe
-                    event_data["custom_client_name"] = event_info.get("custom_client_name", "") if event_info else ""
-                    event_data["custom_contact_phone"] = event_info.get("custom_contact_phone", "") if event_info else ""
-                else:
-                    # Asignar datos del contacto desde GHL
-                    event_data["custom_client_name"] = contact_data.get("firstName", "") or ""
-                    event_data["custom_contact_phone"] = str(contact_data.get("phone", "")) or ""
-                    logger.info(f"Evento {event_id}: asignado nombre={event_data['custom_client_name']}, teléfono={event_data['custom_contact_phone']}")
-            else:
-                logger.info(f"Evento {event_id} sin contactId asociado")
-                # Preservar valores existentes en Frappe si el evento ya existe
-                event_data["custom_client_name"] = event_info.get("custom_client_name", "") if event_info else ""
-                event_data["custom_contact_phone"] = event_info.get("custom_contact_phone", "") if event_info else ""
-            
-            # Crear o actualizar evento
-            if event_info:
-                logger.info(f"Actualizando evento existente: {event_id}")
-                event = frappe.get_doc("Event", event_info["name"])
-                event.update(event_data)  # Sobrescribir con datos de GHL, preservando custom_client_name y custom_contact_phone si no hay contacto
-                event.save(ignore_permissions=True)
-                stats["updated_count"] += 1
-            else:
-                logger.info(f"Creando nuevo evento: {event_id}")
-                event_data.update(custom_data)  # Agregar campos personalizados para nuevos eventos
-                event = frappe.get_doc({"doctype": "Event", **event_data})
-                event.insert(ignore_permissions=True)
-                stats["created_count"] += 1
-            
-            time.sleep(0.1)
+        El cursor es el fin (ms) del último tramo entregado completo: al reanudar, la
+        ventana empieza ahí. Un tramo que no se pudo obtener detiene el pull sin avanzar
+        el cursor, para que el siguiente empiece por ese tramo.
+        """
+        start_date, end_date = get_default_date_range()
+        if self.resume_from:
+            start_date = str(max(int(start_date), int(self.resume_from)))
+        slices = get_window_slices(start_date, end_date, self.config.get("slice_days") or EVENT_WINDOW_SLICE_DAYS)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            metadata_future = submit_with_context(executor, get_calendar_metadata, self.config)
+            slices_future = submit_with_context(executor, map_concurrently, lambda window: fetch_events_slice(self.config, *window), slices)
+            slice_events = slices_future.result()
+            if not metadata_future.result()["valid"]:
+                logger.error(f"calendarId {self.config['calendar_id']} no válido o no encontrado")
+                frappe.throw(_("El calendarId {0} no es válido o no está disponible").format(self.config["calendar_id"]))
         
-        frappe.db.commit()
-        message = f"Procesados {stats['total_events']} eventos: {stats['created_count']} creados, {stats['updated_count']} actualizados, {stats['skipped_count']} omitidos"
-        logger.info(message)
-        return {"success": True, "message": message, "stats": stats}
+        # Las citas que cruzan el límite de un tramo llegan en ambos: se entregan una vez
+        seen = set()
+        for window in slices:
+            if slice_events[window] is None:
+                raise PullInterrupted(f"tramo {window[0]}-{window[1]} no disponible en GHL")
+            events = [event for event in slice_events[window] if (event.get("id") or id(event)) not in seen]
+            seen.update(event.get("id") or id(event) for event in events)
+            logger.info(f"Procesando {len(events)} eventos del tramo {window[0]}-{window[1]}")
+            for start in range(0, len(events), PULL_PAGE_SIZE):
+                if start + PULL_PAGE_SIZE >= len(events):
+                    self.cursor = window[1]
+                yield events[start:start + PULL_PAGE_SIZE]
+            # Tramo completo, también si no tenía eventos
+            self.cursor = window[1]
     
-    except Exception as e:
-        logger.error(f"Error en pull_ghl_data: {str(e)}")
-        frappe.log_error(f"Error en pull: {str(e)}", "GHL Pull Error")
-        return {"success": False, "message": f"Error en pull: {str(e)}"}
+    def prepare_page(self, records):
+        """Resuelve solo los contactos referenciados por la página (caché o consulta por ID)."""
+        contact_ids = {event.get("contactId") for event in records if event.get("contactId")}
+        self.contacts.update(resolve_contacts(self.config, contact_ids))
+        logger.info(f"Contactos resueltos: {len(self.contacts)} acumulados, {len(contact_ids)} referenciados en la página")
+    
+    def map_record(self, record, existing):
+        event_id = record.get("id")
+        bogota_tz = ZoneInfo("America/Bogota")
+        try:
+            start_time = datetime.fromisoformat(record.get("startTime", "1970-01-01T00:00:00+00:00").replace("Z", "+00:00")).astimezone(bogota_tz)
+            end_time = datetime.fromisoformat(record.get("endTime", "1970-01-01T00:00:00+00:00").replace("Z", "+00:00")).astimezone(bogota_tz)
+        except ValueError as e:
+            logger.error(f"Error al convertir fechas para evento {event_id}: {str(e)}")
+            return None
+        
+        event_data = {
+            "subject": record.get("title", "Evento GHL"),
+            "starts_on": start_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "ends_on": end_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "description": record.get("notes", ""),
+            "custom_pulled_from_calendar_provider": 1,
+            # Sin contacto en GHL se preservan los valores existentes en Frappe
+            "custom_client_name": existing.get("custom_client_name", "") if existing else "",
+            "custom_contact_phone": existing.get("custom_contact_phone", "") if existing else ""
+        }
+        
+        contact_data = self.contacts.get(record.get("contactId"))
+        if contact_data:
+            event_data["custom_client_name"] = contact_data.get("firstName", "") or ""
+            event_data["custom_contact_phone"] = str(contact_data.get("phone", "")) or ""
+        elif record.get("contactId"):
+            logger.warning(f"Contacto {record.get('contactId')} no encontrado en caché para evento {event_id}")
+        
+        # Campos personalizados (solo para creación)
+        if not existing:
+            event_data.update({
+                "custom_calendar_provider": self.doctype,
+                "custom_ghl_calendar_id": self.config["calendar_id"],
+                "custom_calendar": self.calendar,
+                "custom_sync_with_calendar_provider": 1
+            })
+        return event_data
+    
+    def push_batch(self):
+        return push_ghl_data(self.calendar)
+    
+    @classmethod
+    def insert_event(cls, doc, method=None):
+        insert_event_in_ghl_calendar(doc, method)
+    
+    @classmethod
+    def update_event(cls, doc, method=None):
+        update_event_in_ghl_calendar(doc, method)
+    
+    @classmethod
+    def delete_event(cls, doc, method=None):
+        delete_event_in_ghl_calendar(doc, method)
+
+@frappe.whitelist()
+def pull_ghl_data(doc_name=None):
+    """Fetch event data from GoHighLevel and create/update events in Frappe's Event Doctype."""
+    logger.info(f"Iniciando pull_ghl_data para GHL Calendar: {doc_name}")
+    result = run_pull(GHLAdapter(get_ghl_config_name(doc_name)))
+    logger.info(result["message"])
+    return result
 
 @frappe.whitelist()
 @with_ghl_config
 def push_ghl_data(config, doc_name=None):
     """Push events to GoHighLevel."""
-    doc = frappe.get_doc("GHL Calendar", doc_name)
-    if not doc.push:
+    if not config["push"]:
         return {"success": False, "message": "Push está deshabilitado", "stats": {}}
 
-    # Obtener contactos
-    try:
-        contacts_cache = fetch_contacts(doc_name=doc_name)
-    except Exception as e:
-        return {"success": False, "message": f"Error obteniendo contactos: {str(e)}", "stats": {}}
-
-    # Obtener eventos de Frappe
-    events = frappe.get_all(
-        "Event",
-        filters={
-            "custom_calendar_provider": "GHL Calendar",
-            "custom_sync_with_calendar_provider": 1,
-            "custom_calendar": doc_name
-        },
-        fields=["name", "subject", "description", "starts_on", "ends_on", "custom_calendar_event_id", "custom_client_name", "custom_contact_phone"]
+    # Obtener user_id para el calendario
+    user_id = get_user_id_from_calendar(config)
+    logger.info(f"User ID para el calendario {config['calendar_id']}: {user_id}")
+
+    # Obtener eventos de Frappe modificados desde el último push
+    events = get_events_to_push(
+        "GHL Calendar",
+        doc_name,
+        ["name", "subject", "description", "starts_on", "ends_on", "custom_calendar_event_id", "custom_client_name", "custom_contact_phone"]
     )
 
     # Obtener eventos existentes en GHL para caché
@@ -206,10 +238,13 @@ def push_ghl_data(config, doc_name=None):
         return {"success": False, "message": f"Error obteniendo eventos de GHL: {str(e)}", "stats": {}}
 
     stats = {"total": len(events), "success": 0, "skipped": 0}
+    pushed_events = []
 
-    # Obtener user_id para el calendario
-    user_id = get_user_id_from_calendar(config)
-    logger.info(f"User ID para el calendario {config['calendar_id']}: {user_id}")
+    # Un solo upsert por contacto distinto (teléfono normalizado) antes de enviar eventos
+    try:
+        contact_ids_by_phone = upsert_event_contacts(config, user_id, events)
+    except Exception as e:
+        return {"success": False, "message": f"Error sincronizando contactos: {str(e)}", "stats": {}}
 
     for event in events:
         event_name = event["name"]
@@ -222,67 +257,18 @@ def push_ghl_data(config, doc_name=None):
             start_time_ghl = f"{starts_on.replace(' ', 'T')}-05:00"
             end_time_ghl = f"{ends_on.replace(' ', 'T')}-05:00"
 
-            contact_id = None
-            # Crear o buscar contacto en GHL usando custom_client_name y custom_contact_phone
-            if event.get("custom_client_name") and event.get("custom_contact_phone"):
-                contact_data = {
-                    "firstName": event["custom_client_name"],
-                    "phone": event["custom_contact_phone"],
-                    "locationId": config["location_id"],
-                    "assignedTo": user_id  # Asignar el user_id al contacto
-                }
-                headers = {
-                    "Content-Type": "application/json",
-                    "Accept": "application/json",
-                    "Version": "2021-07-28"
-                }
-                # Validar datos del contacto
-                if not contact_data["firstName"].strip() or not contact_data["phone"].strip():
-                    logger.warning(f"Datos de contacto inválidos para evento {event_name}: nombre={contact_data['firstName']}, teléfono={contact_data['phone']}")
-                    stats["skipped"] += 1
-                    continue
-
-                # Buscar contacto existente por teléfono
-                response = make_api_request(
-                    "/contacts/",
-                    config["access_token"],
-                    method="GET",
-                    params={"query": event["custom_contact_phone"], "locationId": config["location_id"]},
-                    headers=headers
-                )
-                contacts = response.get("contacts", [])
-                if contacts:
-                    contact_id = contacts[0].get("id")
-                    # Actualizar contacto existente
-                    response = make_api_request(
-                        f"/contacts/{contact_id}",
-                        config["access_token"],
-                        method="PUT",
-                        json_data=contact_data,
-                        headers=headers
-                    )
-                    logger.info(f"Contacto actualizado para evento {event_name}: ID={contact_id}, assignedTo={user_id}")
-                else:
-                    # Crear nuevo contacto
-                    response = make_api_request(
-                        "/contacts/",
-                        config["access_token"],
-                        method="POST",
-                        json_data=contact_data,
-                        headers=headers
-                    )
-                    contact_id = response.get("contact", {}).get("id")
-                    if contact_id:
-                        logger.info(f"Contacto creado para evento {event_name}: ID={contact_id}, assignedTo={user_id}")
-                    else:
-                        logger.error(f"No se pudo crear contacto para evento {event_name}")
-                        stats["skipped"] += 1
-                        continue
-            else:
+            # Reutilizar el contacto resuelto en el upsert de esta ejecución
+            if not (event.get("custom_client_name") or "").strip() or not (event.get("custom_contact_phone") or "").strip():
                 logger.warning(f"Evento {event_name} sin custom_client_name o custom_contact_phone")
                 stats["skipped"] += 1
                 continue
 
+            contact_id = contact_ids_by_phone.get(get_contact_phone_key(event["custom_contact_phone"]))
+            if not contact_id:
+                logger.error(f"No se pudo obtener contacto para evento {event_name}")
+                stats["skipped"] += 1
+                continue
+
             event_data = {
                 "title": event.get("subject", "Evento GHL"),
                 "appointmentStatus": "new",
@@ -303,12 +289,16 @@ def push_ghl_data(config, doc_name=None):
             }
 
             event_id = event.get("custom_calendar_event_id")
+            create_key = None
             if event_id and event_id in existing_event_ids:
                 endpoint = f"/calendars/events/appointments/{event_id}"
                 method = "PUT"
             else:
                 endpoint = "/calendars/events/appointments"
                 method = "POST"
+                # Un reintento de la misma creación devuelve la cita ya creada
+                create_key = get_create_key("GHL Calendar", config["calendar_id"], event_name, event_data)
+                headers[IDEMPOTENCY_HEADER] = create_key
 
             response = make_api_request(
                 endpoint,
@@ -332,8 +322,10 @@ def push_ghl_data(config, doc_name=None):
                         {
                             "custom_calendar_event_id": new_event_id,
                             "custom_pulled_from_calendar_provider": 0
-                        }
+                        },
+                        update_modified=False
                     )
+                    expire_create_key(create_key)
                     logger.info(f"Evento {event_name} actualizado con ID GHL: {new_event_id}")
                 else:
                     logger.error(f"No se pudo obtener ID del evento creado en GHL para {event_name}")
@@ -341,11 +333,13 @@ def push_ghl_data(config, doc_name=None):
                     continue
 
             stats["success"] += 1
+            pushed_events.append(event)
 
         except Exception as e:
             stats["skipped"] += 1
             logger.error(f"Error en evento {event_name}: {str(e)}", exc_info=True)
 
+    mark_events_pushed(pushed_events)
     frappe.db.commit()
     return {
         "success": stats["success"] > 0,
@@ -357,65 +351,20 @@ def push_ghl_data(config, doc_name=None):
 def update_ghl_calendar(doc_name=None, event_id=None, title=None, start_time=None, end_time=None, notes=None, contact_id=None, custom_client_name=None, custom_contact_phone=None):
     """Update a specific event in GoHighLevel."""
     logger.info(f"Iniciando update_ghl_calendar para evento {event_id} en GHL Calendar: {doc_name}")
-    doc = frappe.get_doc("GHL Calendar", doc_name)
-    config = doc.get_config()
+    config = get_ghl_config(doc_name)
     access_token = config["access_token"]
     calendar_id = config["calendar_id"]
     location_id = config["location_id"]
     
     try:
-        # Obtener eventos existentes en GHL para caché
-        start_date, end_date = get_default_date_range()
-        events_data = fetch_calendar_events(doc_name=doc_name, start_date=start_date, end_date=end_date)
-        existing_event_ids = {event.get("id") for event in events_data.get("events", []) if event.get("id")}
-        logger.info(f"Caché de eventos existentes en GHL generado con {len(existing_event_ids)} IDs")
-
-        # Verificar si el evento existe usando el caché
-        if event_id not in existing_event_ids:
+        # Verificar si el evento existe con una consulta directa a la cita
+        if not ghl_appointment_exists(config, event_id, doc_name=doc_name):
             logger.error(f"Evento {event_id} no existe en GHL")
             return {"success": False, "message": f"Evento {event_id} no existe en GHL"}
         
         # Manejar contacto si se proporcionan custom_client_name y custom_contact_phone
         if custom_client_name and custom_contact_phone:
-            contact_data = {
-                "firstName": custom_client_name,
-                "phone": custom_contact_phone,
-                "locationId": location_id
-            }
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-                "Version": "2021-07-28"
-            }
-            # Buscar contacto existente por teléfono
-            response = make_api_request(
-                "/contacts/",
-                access_token,
-                method="GET",
-                params={"query": custom_contact_phone, "locationId": location_id},
-                headers=headers
-            )
-            contacts = response.get("contacts", [])
-            if contacts:
-                contact_id = contacts[0].get("id")
-                # Actualizar contacto
-                make_api_request(
-                    f"/contacts/{contact_id}",
-                    access_token,
-                    method="PUT",
-                    json_data=contact_data,
-                    headers=headers
-                )
-            else:
-                # Crear nuevo contacto
-                response = make_api_request(
-                    "/contacts/",
-                    access_token,
-                    method="POST",
-                    json_data=contact_data,
-                    headers=headers
-                )
-                contact_id = response.get("contact", {}).get("id")
+            contact_id = upsert_ghl_contact(config, None, custom_client_name, custom_contact_phone)
             logger.info(f"Contacto para evento {event_id}: ID={contact_id}")
 
         # Preparar datos para actualización
@@ -461,29 +410,55 @@ def update_ghl_calendar(doc_name=None, event_id=None, title=None, start_time=Non
         frappe.log_error(f"Error al actualizar evento {event_id}: {str(e)}", "GHL Update Error")
         return {"success": False, "message": f"Error al actualizar evento {event_id}: {str(e)}"}
 
+def ghl_appointment_exists(config, event_id, doc_name=None):
+    """Comprueba si una cita existe en GHL con GET /calendars/events/appointments/{id}.
+
+    Solo si la consulta directa falla por un motivo distinto a "no encontrada" se recurre
+    a descargar la ventana completa de eventos del calendario.
+    """
+    if not event_id:
+        return False
+    
+    response = make_api_request(f"/calendars/events/appointments/{event_id}", config["access_token"])
+    if response.get("appointment") or response.get("event"):
+        return True
+    if response.get("status") in (400, 404):
+        return False
+    
+    logger.warning(f"Consulta directa de la cita {event_id} falló ({response.get('error')}), usando la ventana completa")
+    start_date, end_date = get_default_date_range()
+    events_data = fetch_calendar_events(doc_name=doc_name, start_date=start_date, end_date=end_date)
+    return any(event.get("id") == event_id for event in events_data.get("events", []))
+
 # Funciones de sincronización
 @frappe.whitelist()
 def sync_ghl_data(doc_name=None):
+    """Encola la sincronización completa; el avance llega al formulario por realtime."""
+    return enqueue_sync("GHL Calendar", get_ghl_config_name(doc_name))
+
+def run_ghl_sync(doc_name=None):
     """Sincronización completa con manejo mejorado de errores."""
     try:
-        doc = frappe.get_doc("GHL Calendar", doc_name)
+        adapter = GHLAdapter(get_ghl_config_name(doc_name))
+        config = adapter.config
         pull_result = {"success": False, "message": "Pull skipped (disabled)", "stats": {}}
         push_result = {"success": False, "message": "Push skipped (disabled)", "stats": {}}
 
-        if doc.pull:
-            pull_result = pull_ghl_data(doc_name)
-            if not pull_result.get("success"):
-                frappe.log_error(f"Pull failed: {pull_result.get('message')}", "GHL Sync Error")
+        with track_sync_run("GHL Calendar", adapter.calendar):
+            if config["pull"]:
+                pull_result = run_pull(adapter)
+                if not pull_result.get("success"):
+                    frappe.log_error(f"Pull failed: {pull_result.get('message')}", "GHL Sync Error")
 
-        if doc.push:
-            push_result = push_ghl_data(doc_name)
-            if not push_result.get("success") and push_result["stats"].get("total", 0) > 0:
-                frappe.log_error(f"Push failed: {push_result.get('message')}", "GHL Sync Error")
+            if config["push"]:
+                push_result = run_push(adapter)
+                if not push_result.get("success") and push_result["stats"].get("total", 0) > 0:
+                    frappe.log_error(f"Push failed: {push_result.get('message')}", "GHL Sync Error")
 
         combined_message = format_sync_results(pull_result, push_result)
         success = (
-            (pull_result.get("success", False) or not doc.pull) and
-            (push_result.get("success", False) or not doc.push)
+            (pull_result.get("success", False) or not config["pull"]) and
+            (push_result.get("success", False) or not config["push"])
         )
         return {
             "success": success,
@@ -493,7 +468,7 @@ def sync_ghl_data(doc_name=None):
         }
 
     except Exception as e:
-        error_msg = f"Error en sync_ghl_data: {str(e)}"
+        error_msg = f"Error en run_ghl_sync: {str(e)}"
         frappe.log_error(error_msg, "GHL Sync Error")
         return {"success": False, "message": error_msg}
     
@@ -505,126 +480,300 @@ def format_sync_results(pull_result, push_result):
 
 # Otras funciones utilitarias
 def get_ghl_config(doc_name=None):
-    """Obtiene configuración de GHL Calendar desde un documento."""
+    """Obtiene configuración de GHL Calendar desde la caché de la solicitud."""
     logger.info(f"Obteniendo configuración para GHL Calendar: {doc_name or 'primer documento'}")
-    doc = frappe.get_doc("GHL Calendar", doc_name or frappe.get_all("GHL Calendar", limit=1)[0].name)
-    return doc.get_config()
+    return get_provider_config("GHL Calendar", get_ghl_config_name(doc_name))
+
+def get_ghl_config_name(doc_name=None):
+    """Nombre del GHL Calendar indicado o, si no se indica, del primero registrado."""
+    return doc_name or frappe.get_all("GHL Calendar", limit=1)[0].name
 
 def get_default_date_range(timezone="America/New_York"):
     """Calcula fechas por defecto: 3 días antes, 6 meses después."""
-    tz = pytz.timezone(timezone)
+    tz = ZoneInfo(timezone)
     start = datetime.now(tz) - timedelta(days=3)
-    end = datetime.now(tz) + relativedelta(months=6)
+    end = add_months(datetime.now(tz), 6)
     return str(int(start.timestamp() * 1000)), str(int(end.timestamp() * 1000))
 
 def build_api_params(config, **kwargs):
     """Construye parámetros para solicitudes API."""
     return {"locationId": config["location_id"], **kwargs}
 
-def fetch_paginated_data(config, endpoint, params, headers=None):
-    """Obtiene datos paginados de un endpoint."""
-    results = []
+def iter_paginated_data(config, endpoint, params, headers=None, max_records=None):
+    """Recorre un endpoint paginado devolviendo, página por página, los contactos compactos.
+
+    Avanza con el cursor `startAfterId`/`startAfter` que GHL envía en `meta` y, si no
+    viene, con el número de página. Solo se mantiene una página en memoria; el consumidor
+    puede cortar en cualquier momento dejando de iterar o limitar con `max_records`.
+    Un error de la API lanza una excepción: el consumidor nunca confunde una lista
+    truncada con la completa.
+    """
+    params = {**params, "page": 1}
+    limit = int(params.setdefault("limit", CONTACTS_PAGE_SIZE))
     page = 1
-    limit = params.get("limit", 100)
+    total = 0
     
     logger.info(f"Iniciando paginación para endpoint: {endpoint}")
     while True:
-        params["page"] = page
         response = make_api_request(endpoint, config["access_token"], params=params, headers=headers)
+        if response.get("error"):
+            logger.error(f"Paginación de {endpoint} interrumpida en la página {page}: {response['error']}")
+            frappe.throw(_("Paginación de {0} interrumpida en la página {1}: {2}").format(endpoint, page, response["error"]))
         
         contacts = response.get("contacts") or []
-        results.extend({
-            "id": c.get("id", ""),
-            "firstName": c.get("firstName", ""),
-            "phone": c.get("phone", "")
-        } for c in contacts if c.get("phone"))
-        
+        records = [compact_contact(c) for c in contacts if c.get("phone")]
+        if max_records is not None:
+            records = records[:max_records - total]
+        total += len(records)
         logger.info(f"Página {page}: {len(contacts)} contactos obtenidos")
-        if len(contacts) < limit:
+        if records:
+            yield records
+        
+        if len(contacts) < limit or (max_records is not None and total >= max_records):
             break
+        
         page += 1
-    
-    logger.info(f"Total contactos obtenidos: {len(results)}")
-    return results
+        meta = response.get("meta") or {}
+        if meta.get("startAfterId"):
+            params.pop("page", None)
+            params.update(startAfterId=meta["startAfterId"], startAfter=meta.get("startAfter"))
+        else:
+            params["page"] = page
+
+def iter_contacts(config, user_id, max_records=None):
+    """Genera uno a uno los contactos compactos asignados al usuario, en memoria constante."""
+    params = build_api_params(config, assignedTo=user_id)
+    for page in iter_paginated_data(config, "/contacts/", params, headers={"Version": "2021-07-28"}, max_records=max_records):
+        yield from page
+
+def compact_contact(contact):
+    """Reduce un contacto de GHL a los campos que usa la sincronización."""
+    return {
+        "id": contact.get("id", ""),
+        "firstName": contact.get("firstName", "") or "",
+        "phone": contact.get("phone", "") or ""
+    }
 
 @frappe.whitelist()
 @with_ghl_config
 def fetch_calendar_events(config, doc_name=None, start_date=None, end_date=None):
-    """Obtiene eventos de calendario sin paginación."""
+    """Obtiene eventos de calendario en tramos paralelos."""
+    return get_calendar_events(config, start_date, end_date)
+
+def get_calendar_events(config, start_date=None, end_date=None, validate=True):
+    """Obtiene eventos del calendario; no usa la base de datos, por lo que puede correr en un hilo."""
     logger.info("Iniciando obtención de eventos de calendario")
     start_date, end_date = start_date or get_default_date_range()[0], end_date or get_default_date_range()[1]
     
-    # Validar calendarId
-    logger.info(f"Validando calendarId: {config['calendar_id']}")
-    try:
-        calendar_response = make_api_request(f"/calendars/{config['calendar_id']}", config["access_token"])
-        if not calendar_response.get("calendar"):
+    # Validar calendarId con los metadatos en caché
+    if validate:
+        logger.info(f"Validando calendarId: {config['calendar_id']}")
+        if not get_calendar_metadata(config)["valid"]:
             logger.error(f"calendarId {config['calendar_id']} no válido o no encontrado")
             frappe.throw(_("El calendarId {0} no es válido o no está disponible").format(config["calendar_id"]))
-    except requests.RequestException as e:
-        logger.error(f"Error al validar calendarId {config['calendar_id']}: {str(e)}")
-        frappe.throw(_("Error al validar calendarId {0}: {1}").format(config["calendar_id"], str(e)))
     
+    # Dividir la ventana en tramos que se piden en paralelo bajo el rate limiter
+    slices = get_window_slices(start_date, end_date, config.get("slice_days") or EVENT_WINDOW_SLICE_DAYS)
+    slice_events = map_concurrently(lambda window: fetch_events_slice(config, *window), slices)
+    
+    # Una ventana parcial haría pasar por nuevas las citas del tramo que falló
+    failed = [window for window in slices if slice_events[window] is None]
+    if failed:
+        frappe.throw(_("No se pudieron obtener {0} de {1} tramos de eventos de GHL, el primero {2}-{3}").format(len(failed), len(slices), *failed[0]))
+    
+    # Unir los tramos eliminando duplicados (citas que cruzan el límite de un tramo)
+    events = {}
+    for window in slices:
+        for event in slice_events[window]:
+            events.setdefault(event.get("id") or id(event), event)
+    events = list(events.values())
+    logger.info(f"Total eventos obtenidos: {len(events)} en {len(slices)} tramos")
+    return {"events": events}
+
+def get_window_slices(start_date, end_date, slice_days):
+    """Divide una ventana [inicio, fin) en milisegundos en tramos de `slice_days` días."""
+    start, end = int(start_date), int(end_date)
+    step = max(int(slice_days), 1) * 24 * 60 * 60 * 1000
+    return [(str(slice_start), str(min(slice_start + step, end))) for slice_start in range(start, end, step)]
+
+def fetch_events_slice(config, start_date, end_date):
+    """Obtiene los eventos de un tramo, reintentándolo por separado si falla.
+
+    Devuelve None si el tramo sigue fallando tras los reintentos, para distinguirlo de un
+    tramo sin eventos.
+    """
     params = build_api_params(config, calendarId=config["calendar_id"], startTime=start_date, endTime=end_date)
-    try:
+    for attempt in range(EVENT_SLICE_RETRIES + 1):
         response = make_api_request("/calendars/events", config["access_token"], params=params)
-        events = response.get("events", [])
-        logger.info(f"Total eventos obtenidos: {len(events)}")
-        return {"events": events}
-    except requests.RequestException as e:
-        if hasattr(e, 'response') and e.response:
-            logger.error(f"Error al obtener eventos: Código {e.response.status_code}, Detalle: {e.response.text}")
-            frappe.throw(_("Error al obtener eventos: Código {0}, Detalle: {1}").format(e.response.status_code, e.response.text))
-        raise
+        if not response.get("error"):
+            return response.get("events", [])
+        if response.get("status") in (401, 404):
+            # Token revocado o calendario eliminado: los metadatos en caché ya no son válidos
+            invalidate_calendar_metadata(config["calendar_id"])
+            config.pop("metadata", None)
+            break
+        if attempt < EVENT_SLICE_RETRIES:
+            time.sleep(2 ** attempt)
+    logger.error(f"No se pudieron obtener eventos del tramo {start_date}-{end_date}: {response.get('error')}")
+    return None
 
 @frappe.whitelist()
 @with_ghl_config
 def fetch_contacts(config, doc_name=None, limit=100):
-    """Obtiene contactos filtrados por userId."""
+    """Obtiene contactos filtrados por userId y renueva la caché de la location."""
     user_id = get_user_id_from_calendar(config)
+    fill_contact_cache(config, user_id)
+    return list(get_hash(get_contact_cache_key(config["location_id"], user_id)).values())
+
+# Caché de contactos compartida por location y usuario
+def get_contact_cache_key(location_id, user_id):
+    return f"ghl_contacts|{location_id}|{user_id}"
+
+def fill_contact_cache(config, user_id):
+    """Descarga los contactos asignados al usuario y los guarda en Redis página por página.
+
+    No acumula los contactos en memoria; devuelve cuántos se guardaron. Si la paginación
+    falla, la excepción llega al llamador en lugar de una caché a medias presentada como
+    completa.
+    """
+    key = get_contact_cache_key(config["location_id"], user_id)
+    delete_hash(key)
+    total = 0
     params = build_api_params(config, assignedTo=user_id)
-    return fetch_paginated_data(config, "/contacts/", params, headers={"Version": "2021-07-28"})
+    for page in iter_paginated_data(config, "/contacts/", params, headers={"Version": "2021-07-28"}):
+        set_hash(key, {contact["id"]: contact for contact in page if contact["id"]}, ttl=CONTACT_CACHE_TTL)
+        index_contact_phones(config["location_id"], page)
+        total += len(page)
+    logger.info(f"Caché de contactos generada con {total} entradas")
+    return total
+
+def get_location_contact_cache_key(location_id):
+    return f"ghl_contacts|{location_id}"
+
+def resolve_contacts(config, contact_ids, user_id=None):
+    """Devuelve {contactId: contacto} solo para los IDs indicados.
+
+    Busca primero en la caché del usuario y en la de la location; los que falten se
+    consultan en paralelo con GET /contacts/{id} y se guardan en la caché de la location.
+    """
+    contact_ids = [contact_id for contact_id in contact_ids if contact_id]
+    if not contact_ids:
+        return {}
+    
+    user_id = user_id or get_user_id_from_calendar(config)
+    location_key = get_location_contact_cache_key(config["location_id"])
+    contacts = get_hash(get_contact_cache_key(config["location_id"], user_id), contact_ids)
+    missing = [contact_id for contact_id in contact_ids if contact_id not in contacts]
+    contacts.update(get_hash(location_key, missing))
+    missing = [contact_id for contact_id in missing if contact_id not in contacts]
+    
+    if missing:
+        logger.info(f"Consultando {len(missing)} contactos por ID en GHL")
+        fetched = map_concurrently(lambda contact_id: fetch_contact(config, contact_id), missing)
+        fetched = {contact_id: contact for contact_id, contact in fetched.items() if contact}
+        set_hash(location_key, fetched, ttl=CONTACT_CACHE_TTL)
+        index_contact_phones(config["location_id"], fetched.values())
+        contacts.update(fetched)
+    
+    # Igual que la caché completa, solo se consideran contactos con teléfono
+    return {contact_id: contact for contact_id, contact in contacts.items() if contact.get("phone")}
+
+def fetch_contact(config, contact_id):
+    """Obtiene un contacto de GHL por ID y lo devuelve compacto, o None si no existe."""
+    response = make_api_request(f"/contacts/{contact_id}", config["access_token"], headers={"Version": "2021-07-28"})
+    contact = response.get("contact")
+    if not contact:
+        logger.warning(f"Contacto {contact_id} no encontrado en GHL: {response.get('error', 'sin datos')}")
+        return None
+    return compact_contact(contact)
+
+def update_cached_contact(config, user_id, contact):
+    """Refleja en la caché un contacto creado o actualizado en GHL."""
+    contact = compact_contact(contact)
+    if contact["id"]:
+        update_hash(get_contact_cache_key(config["location_id"], user_id), {contact["id"]: contact})
+        index_contact_phones(config["location_id"], [contact])
+    return contact
 
 @frappe.whitelist()
 def sync_contacts(doc_name=None):
-    """Sincroniza contactos desde GHL a doctype Contact."""
+    """Sincroniza contactos desde GHL a doctype Contact.
+
+    Carga en una sola consulta el mapa teléfono -> Contact, inserta los contactos nuevos
+    (con su fila de teléfono) en bloque, actualiza solo los nombres que cambiaron y hace
+    commit por lotes de CONTACT_SYNC_CHUNK_SIZE contactos.
+    """
     logger.info(f"Iniciando sincronización de contactos para GHL Calendar: {doc_name}")
-    contacts = fetch_contacts(doc_name=doc_name)
-    created, updated, skipped = 0, 0, 0
+    config = get_ghl_config(doc_name)
+    contacts = iter_contacts(config, get_user_id_from_calendar(config))
+    stats = {"created": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+    
+    existing = {
+        row.phone: row
+        for row in frappe.get_all("Contact", filters={"phone": ["is", "set"]}, fields=["name", "phone", "first_name"])
+    }
+    logger.info(f"Contactos existentes con teléfono: {len(existing)}")
     
+    chunk = []
     for contact in contacts:
         if not contact["phone"]:
             logger.warning(f"Omitiendo contacto sin teléfono: {contact['firstName']}")
-            skipped += 1
+            stats["skipped"] += 1
+            continue
+        chunk.append(contact)
+        if len(chunk) >= CONTACT_SYNC_CHUNK_SIZE:
+            apply_contacts_chunk(chunk, existing, stats)
+            chunk = []
+    apply_contacts_chunk(chunk, existing, stats)
+    
+    logger.info(f"Sincronización de contactos completada: {stats}")
+    return stats
+
+def apply_contacts_chunk(contacts, existing, stats):
+    """Inserta y actualiza en bloque un lote de contactos de GHL y hace commit."""
+    if not contacts:
+        return
+    
+    now = now_datetime()
+    user = frappe.session.user
+    new_contacts, new_phones, name_updates = [], [], {}
+    
+    for contact in contacts:
+        phone = contact["phone"]
+        first_name = contact["firstName"] or phone
+        current = existing.get(phone)
+        if current:
+            if current.first_name != first_name:
+                name_updates[current.name] = {"first_name": first_name, "full_name": first_name}
+                current.first_name = first_name
+            else:
+                stats["unchanged"] += 1
             continue
         
-        # Buscar contacto existente en Frappe por teléfono
-        contact_exists = frappe.db.exists("Contact", {"phone": contact["phone"]})
-        
-        contact_data = {
-            "first_name": contact["firstName"],
-            "phone": contact["phone"]
-        }
-        
-        if contact_exists:
-            # Actualizar contacto existente
-            frappe.db.set_value("Contact", {"phone": contact["phone"]}, contact_data)
-            updated += 1
-            logger.info(f"Contacto actualizado: {contact['phone']}")
-        else:
-            # Crear nuevo contacto
-            new_contact = frappe.get_doc({
-                "doctype": "Contact",
-                **contact_data
-            })
-            new_contact.insert(ignore_permissions=True)
-            created += 1
-            logger.info(f"Contacto creado: {contact['phone']}")
+        name = frappe.generate_hash(length=10)
+        new_contacts.append((name, first_name, first_name, phone, "Passive", now, now, user, user, 0, 0))
+        new_phones.append((frappe.generate_hash(length=10), name, "Contact", "phone_nos", 1, phone, 1, now, now, user, user, 0))
+        # Registrar el nuevo contacto para no duplicar teléfonos repetidos en GHL
+        existing[phone] = frappe._dict(name=name, phone=phone, first_name=first_name)
+    
+    if new_contacts:
+        frappe.db.bulk_insert(
+            "Contact",
+            ["name", "first_name", "full_name", "phone", "status", "creation", "modified", "owner", "modified_by", "docstatus", "idx"],
+            new_contacts
+        )
+        frappe.db.bulk_insert(
+            "Contact Phone",
+            ["name", "parent", "parenttype", "parentfield", "idx", "phone", "is_primary_phone", "creation", "modified", "owner", "modified_by", "docstatus"],
+            new_phones
+        )
+    if name_updates:
+        frappe.db.bulk_update("Contact", name_updates)
     
     frappe.db.commit()
-    result = {"created": created, "updated": updated, "skipped": skipped}
-    logger.info(f"Sincronización de contactos completada: {result}")
-    return result
+    stats["created"] += len(new_contacts)
+    stats["updated"] += len(name_updates)
+    logger.info(f"Lote de contactos aplicado: {len(new_contacts)} creados, {len(name_updates)} actualizados")
 
 def get_headers(access_token):
     """Devuelve las cabeceras estándar para solicitudes a GHL."""
@@ -638,12 +787,12 @@ def get_headers(access_token):
 def get_user_id_from_calendar(config):
     """Obtiene userId desde un calendarId."""
     logger.info(f"Obteniendo userId para calendarId: {config['calendar_id']}")
-    response = make_api_request(f"/calendars/{config['calendar_id']}", config["access_token"])
-    if "calendar" not in response or not response["calendar"].get("teamMembers"):
+    metadata = get_calendar_metadata(config)
+    if not metadata["team_members"]:
         logger.error(f"No se encontraron teamMembers para el calendario {config['calendar_id']}")
         frappe.throw(_("No se encontraron teamMembers para el calendario {0}").format(config['calendar_id']))
     
-    user_id = response["calendar"]["teamMembers"][0].get("userId")
+    user_id = metadata["user_id"]
     if not user_id:
         logger.error(f"No se encontró userId para el calendario {config['calendar_id']}")
         frappe.throw(_("No se encontró userId para el calendario {0}").format(config['calendar_id']))
@@ -651,6 +800,58 @@ def get_user_id_from_calendar(config):
     logger.info(f"userId encontrado: {user_id}")
     return user_id
 
+# Caché de metadatos del calendario (validez, teamMembers y userId)
+def get_calendar_metadata_key(calendar_id):
+    return f"ghl_calendar_metadata|{calendar_id}"
+
+def get_calendar_metadata(config, refresh=False):
+    """Devuelve {valid, team_members, user_id} del calendario desde frappe.cache.
+
+    El llenado es single-flight: un lock en Redis garantiza que un solo proceso o hilo
+    consulte /calendars/{id}; el resto espera y lee el valor que éste deja en caché. Los
+    metadatos válidos se guardan además en `config`, que se comparte en la solicitud.
+    """
+    if not refresh and config.get("metadata"):
+        return config["metadata"]
+    
+    key = get_calendar_metadata_key(config["calendar_id"])
+    metadata = None if refresh else frappe.cache.get_value(key, expires=True)
+    if not metadata:
+        try:
+            with frappe.cache.lock(frappe.cache.make_key(f"{key}|lock"), timeout=30, blocking_timeout=15):
+                metadata = None if refresh else frappe.cache.get_value(key, expires=True)
+                metadata = metadata or fill_calendar_metadata(config)
+        except LockError:
+            logger.warning(f"No se obtuvo el lock de metadatos para {config['calendar_id']}, consultando directamente")
+            metadata = fill_calendar_metadata(config)
+    
+    if metadata["valid"]:
+        config["metadata"] = metadata
+    return metadata
+
+def fill_calendar_metadata(config):
+    """Consulta /calendars/{id} y guarda los metadatos; los errores no se guardan en caché."""
+    response = make_api_request(f"/calendars/{config['calendar_id']}", config["access_token"])
+    calendar = response.get("calendar") or {}
+    team_members = [member.get("userId") for member in calendar.get("teamMembers") or []]
+    metadata = {
+        "valid": bool(calendar),
+        "team_members": team_members,
+        "user_id": team_members[0] if team_members else None
+    }
+    if calendar:
+        frappe.cache.set_value(
+            get_calendar_metadata_key(config["calendar_id"]),
+            metadata,
+            expires_in_sec=CALENDAR_METADATA_TTL
+        )
+    else:
+        logger.error(f"No se pudieron obtener metadatos del calendario {config['calendar_id']}: {response.get('error', 'sin datos')}")
+    return metadata
+
+def invalidate_calendar_metadata(calendar_id):
+    frappe.cache.delete_value(get_calendar_metadata_key(calendar_id))
+
 def make_api_request(endpoint, access_token, method="GET", json_data=None, params=None, headers=None):
     """Realiza una solicitud a la API de GoHighLevel."""
     default_headers = {
@@ -663,9 +864,10 @@ def make_api_request(endpoint, access_token, method="GET", json_data=None, param
         default_headers.update(headers)
     
     url = f"https://services.leadconnectorhq.com{endpoint}"
+    rate_limit.acquire(f"ghl|{hashlib.sha1(access_token.encode()).hexdigest()[:16]}", GHL_RATE_LIMIT, GHL_RATE_PERIOD)
     try:
         logger.info(f"Solicitando {method} {url}")
-        response = requests.request(
+        response = get_session("GHL Calendar").request(
             method,
             url,
             headers=default_headers,
@@ -675,7 +877,8 @@ def make_api_request(endpoint, access_token, method="GET", json_data=None, param
         )
         response.raise_for_status()
         content = response.json()
-        logger.info(f"Respuesta: {response.status_code}, Contenido: {content}")
+        logger.info(f"Respuesta: {response.status_code}, {len(response.content)} bytes")
+        logger.debug(f"Contenido: {content}")
         return content
     except requests.exceptions.RequestException as e:
         # Inicializar valores por defecto
@@ -696,6 +899,100 @@ def make_api_request(endpoint, access_token, method="GET", json_data=None, param
         logger.error(f"Error en API: {{'error': '{error_msg}', 'url': '{url}', 'status_code': {status_code}, 'response': {json.dumps(content)}}}")
         return {"error": error_msg, "status": status_code}
 
+def get_contact_phone_key(phone):
+    """Teléfono normalizado con el que se agrupan los contactos de un push."""
+    keys = phone_index_keys(phone)
+    return keys[0] if keys else ""
+
+def upsert_event_contacts(config, user_id, events):
+    """Hace upsert una sola vez por cada contacto distinto de los eventos.
+
+    Los contactos se agrupan por teléfono normalizado y se envían en paralelo al endpoint
+    /contacts/upsert. Devuelve {teléfono normalizado: contactId}.
+    """
+    contacts = {}
+    for event in events:
+        first_name = (event.get("custom_client_name") or "").strip()
+        candidates = phone_index_keys(event.get("custom_contact_phone"))
+        if first_name and candidates:
+            contacts.setdefault(candidates[0], {"firstName": first_name, "candidates": candidates})
+    if not contacts:
+        return {}
+
+    # Preferir el teléfono con el que el contacto ya existe en GHL para que el upsert lo encuentre
+    indexed = get_hash(
+        get_phone_index_key(config["location_id"]),
+        {phone for contact in contacts.values() for phone in contact["candidates"]}
+    )
+    for phone_key, contact in contacts.items():
+        contact["phone"] = next((phone for phone in contact["candidates"] if phone in indexed), phone_key)
+
+    logger.info(f"Upsert de {len(contacts)} contactos distintos para {len(events)} eventos")
+    contact_ids = map_concurrently(
+        lambda phone_key: upsert_ghl_contact(config, user_id, contacts[phone_key]["firstName"], contacts[phone_key]["phone"]),
+        contacts
+    )
+    return {phone_key: contact_id for phone_key, contact_id in contact_ids.items() if contact_id}
+
+def upsert_ghl_contact(config, user_id, first_name, phone):
+    """Crea o actualiza un contacto con /contacts/upsert y devuelve su ID.
+
+    Sin `user_id` el contacto no se reasigna ni se guarda en la caché del usuario.
+    """
+    contact_data = {
+        "firstName": first_name,
+        "phone": phone,
+        "locationId": config["location_id"]
+    }
+    if user_id:
+        contact_data["assignedTo"] = user_id
+    response = make_api_request(
+        "/contacts/upsert",
+        config["access_token"],
+        method="POST",
+        json_data=contact_data,
+        headers={"Version": "2021-07-28"}
+    )
+    contact_id = (response.get("contact") or {}).get("id")
+    if not contact_id:
+        logger.error(f"No se pudo hacer upsert del contacto {phone}: {response.get('error', 'Sin ID')}")
+        return None
+    if user_id:
+        update_cached_contact(config, user_id, {"id": contact_id, **contact_data})
+    else:
+        index_contact_phones(config["location_id"], [{"id": contact_id, "phone": phone}])
+    return contact_id
+
+# Índice de teléfonos E.164 -> contactId por location
+def get_phone_index_key(location_id):
+    return f"ghl_phone_index|{location_id}"
+
+def phone_index_keys(phone):
+    """Claves E.164 bajo las que se indexa un teléfono; sin prefijo se usa el código de la location."""
+    cleaned = re.sub(r'[^\d+]', '', (phone or "").strip())
+    if not cleaned:
+        return []
+    if cleaned.startswith('+'):
+        return [cleaned]
+    return [f"{DEFAULT_COUNTRY_CODE}{cleaned}"]
+
+def index_contact_phones(location_id, contacts):
+    """Agrega al índice de teléfonos de la location los contactos indicados."""
+    mapping = {
+        phone: contact["id"]
+        for contact in contacts if contact.get("id")
+        for phone in phone_index_keys(contact.get("phone"))
+    }
+    set_hash(get_phone_index_key(location_id), mapping, ttl=CONTACT_CACHE_TTL)
+
+def lookup_contact_by_phone(location_id, phones):
+    """Devuelve (teléfono, contactId) del primer teléfono presente en el índice, o (None, None)."""
+    found = get_hash(get_phone_index_key(location_id), phones)
+    for phone in phones:
+        if phone in found:
+            return phone, found[phone]
+    return None, None
+
 def normalize_phone(phone, country_code=None):
     """Normaliza un número de teléfono, opcionalmente añadiendo un código de país."""
     if not phone:
@@ -717,7 +1014,11 @@ def normalize_phone(phone, country_code=None):
     return cleaned_phone
 
 def create_or_update_ghl_contact(event, access_token, location_id, user_id, headers):
-    """Crea o actualiza un contacto en GHL, buscando primero con +1 y luego con +57."""
+    """Crea o actualiza un contacto en GHL buscándolo por su teléfono E.164.
+
+    El teléfono se normaliza con la misma regla que el índice (`phone_index_keys`): un
+    número sin prefijo se toma con el código de país de la location.
+    """
     if not event.custom_client_name or not event.custom_contact_phone:
         logger.warning(f"Evento {event.name} sin custom_client_name o custom_contact_phone válidos")
         return None
@@ -735,13 +1036,38 @@ def create_or_update_ghl_contact(event, access_token, location_id, user_id, head
         "assignedTo": user_id
     }
 
-    country_codes = ["+1", "+57"]
+    candidate_phones = phone_index_keys(raw_phone)
+
+    # Búsqueda O(1) en el índice local de teléfonos; la búsqueda remota queda como respaldo
+    matched_phone, contact_id = lookup_contact_by_phone(location_id, candidate_phones)
+    if contact_id:
+        update_data = {
+            "firstName": contact_data["firstName"],
+            "phone": matched_phone,
+            "assignedTo": user_id
+        }
+        response = make_api_request(
+            f"/contacts/{contact_id}",
+            access_token,
+            method="PUT",
+            json_data=update_data,
+            headers={"Version": "2021-07-28"}
+        )
+        if not response.get("error"):
+            logger.info(f"Contacto actualizado para evento {event.name}: ID={contact_id}, teléfono={matched_phone}, assignedTo={user_id}")
+            update_cached_contact({"location_id": location_id}, user_id, {"id": contact_id, **update_data})
+            return contact_id
+        if response.get("status") not in (400, 404):
+            logger.error(f"Error actualizando contacto {contact_id} para evento {event.name}: {response['error']}")
+            return None
+        # El contacto indexado ya no existe en GHL: descartar la entrada y buscar en remoto
+        logger.warning(f"Contacto indexado {contact_id} no válido para teléfono {matched_phone}, buscando en GHL")
+        delete_hash(get_phone_index_key(location_id), [matched_phone])
 
     contact_id = None
     matched_phone = None
 
-    for code in country_codes:
-        search_phone = normalize_phone(base_phone, code)
+    for search_phone in candidate_phones:
         logger.info(f"Buscando contacto con teléfono: {search_phone}")
 
         response = make_api_request(
@@ -755,13 +1081,14 @@ def create_or_update_ghl_contact(event, access_token, location_id, user_id, head
 
         matching_contacts = [
             contact for contact in contacts
-            if normalize_phone(contact.get("phone", ""), code) == search_phone
+            if search_phone in phone_index_keys(contact.get("phone"))
         ]
 
         if matching_contacts:
             contact = matching_contacts[0]
             contact_id = contact.get("id")
             matched_phone = search_phone
+            index_contact_phones(location_id, [{"id": contact_id, "phone": matched_phone}])
             current_assigned_to = contact.get("assignedTo", "")
 
             if current_assigned_to and current_assigned_to != user_id:
@@ -783,11 +1110,12 @@ def create_or_update_ghl_contact(event, access_token, location_id, user_id, head
                 logger.error(f"Error actualizando contacto {contact_id} para evento {event.name}: {response['error']}")
                 return None
             logger.info(f"Contacto actualizado para evento {event.name}: ID={contact_id}, teléfono={matched_phone}, assignedTo={user_id}")
+            update_cached_contact({"location_id": location_id}, user_id, {"id": contact_id, **update_data})
             return contact_id
         else:
             logger.info(f"No se encontraron contactos con teléfono: {search_phone}")
 
-    new_phone = normalize_phone(base_phone, "+1")
+    new_phone = candidate_phones[0]
     contact_data["phone"] = new_phone
 
     response = make_api_request(
@@ -800,6 +1128,7 @@ def create_or_update_ghl_contact(event, access_token, location_id, user_id, head
     contact_id = response.get("contact", {}).get("id")
     if contact_id:
         logger.info(f"Contacto creado para evento {event.name}: ID={contact_id}, teléfono={new_phone}, assignedTo={user_id}")
+        update_cached_contact({"location_id": location_id}, user_id, {"id": contact_id, **contact_data})
         return contact_id
     else:
         logger.error(f"No se pudo crear contacto para evento {event.name}: {response.get('error', 'Sin ID')}")
@@ -815,12 +1144,8 @@ def insert_event_in_ghl_calendar(doc, method=None):
             logger.info(f"Evento {doc.name} no cumple criterios para inserción en GHL")
             return
 
-        calendar = frappe.get_doc("GHL Calendar", doc.custom_calendar)
-        config = {"access_token": calendar.access_token, "calendar_id": calendar.calendar_id, "location_id": calendar.location_id}
-        
-        # Validar configuración
-        if not all([config["access_token"], config["calendar_id"], config["location_id"]]):
-            frappe.throw(_("Los campos access_token, calendar_id y location_id son requeridos en GHL Calendar"))
+        # get_config ya valida access_token, calendar_id y location_id
+        config = get_ghl_config(doc.custom_calendar)
 
         # Obtener user_id
         user_id = get_user_id_from_calendar(config)
@@ -857,12 +1182,13 @@ def insert_event_in_ghl_calendar(doc, method=None):
         }
 
         # Insertar evento en GHL
+        create_key = get_create_key("GHL Calendar", config["calendar_id"], doc.name, event_data)
         response = make_api_request(
             "/calendars/events/appointments",
             config["access_token"],
             method="POST",
             json_data=event_data,
-            headers=get_headers(config["access_token"])
+            headers={**get_headers(config["access_token"]), IDEMPOTENCY_HEADER: create_key}
         )
 
         if response.get("error"):
@@ -875,7 +1201,9 @@ def insert_event_in_ghl_calendar(doc, method=None):
             doc.custom_calendar_event_id = meeting_id
             doc.custom_pulled_from_calendar_provider = 0
             doc.db_update()
+            mark_event_pushed(doc)
             frappe.db.commit()
+            expire_create_key(create_key)
             logger.info(f"Evento {doc.name} insertado en GHL con ID: {meeting_id}")
             frappe.msgprint(_("Evento insertado exitosamente en GHL con ID: {0}").format(meeting_id))
         else:
@@ -899,12 +1227,8 @@ def update_event_in_ghl_calendar(doc, method=None):
             logger.info(f"Evento {doc.name} no cumple criterios para actualización en GHL")
             return
 
-        calendar = frappe.get_doc("GHL Calendar", doc.custom_calendar)
-        config = {"access_token": calendar.access_token, "calendar_id": calendar.calendar_id, "location_id": calendar.location_id}
-        
-        # Validar configuración
-        if not all([config["access_token"], config["calendar_id"], config["location_id"]]):
-            frappe.throw(_("Los campos access_token, calendar_id y location_id son requeridos en GHL Calendar"))
+        # get_config ya valida access_token, calendar_id y location_id
+        config = get_ghl_config(doc.custom_calendar)
 
         # Obtener user_id
         user_id = get_user_id_from_calendar(config)
@@ -954,6 +1278,7 @@ def update_event_in_ghl_calendar(doc, method=None):
             frappe.msgprint(_("Error actualizando evento en GHL: {0}").format(response["error"]))
             return
 
+        mark_event_pushed(doc)
         logger.info(f"Evento {doc.name} actualizado en GHL con ID: {doc.custom_calendar_event_id}")
 
     except frappe.DoesNotExistError:
@@ -973,12 +1298,8 @@ def delete_event_in_ghl_calendar(doc, method=None):
             logger.info(f"Evento {doc.name} no cumple criterios para eliminación en GHL")
             return
 
-        calendar = frappe.get_doc("GHL Calendar", doc.custom_calendar)
-        config = {"access_token": calendar.access_token, "calendar_id": calendar.calendar_id}
-        
-        # Validar configuración
-        if not all([config["access_token"], config["calendar_id"]]):
-            frappe.throw(_("Los campos access_token y calendar_id son requeridos en GHL Calendar"))
+        # get_config ya valida access_token y calendar_id
+        config = get_ghl_config(doc.custom_calendar)
 
         # Eliminar evento en GHL
         response = make_api_request(
@@ -2,8 +2,34 @@
 # See license.txt
 
 # import frappe
+from datetime import datetime
+
 from frappe.tests.utils import FrappeTestCase
 
+from extended_calendars.extended_calendars.doctype.ghl_calendar.ghl_calendar import (
+	get_window_slices,
+	phone_index_keys,
+)
+from extended_calendars.sync.adapter import normalize_value
+
 
 class TestGHLCalendar(FrappeTestCase):
-	pass
\ No newline at end of file
+	def test_phone_index_keys(self):
+		self.assertEqual(phone_index_keys("+57 300 123 4567"), ["+573001234567"])
+		self.assertEqual(phone_index_keys("(305) 555-1234"), ["+573055551234"])
+		self.assertEqual(phone_index_keys(""), [])
+
+	def test_get_window_slices(self):
+		day = 24 * 60 * 60 * 1000
+		slices = get_window_slices("0", str(10 * day), 7)
+		self.assertEqual(slices, [("0", str(7 * day)), (str(7 * day), str(10 * day))])
+		self.assertEqual(get_window_slices("0", "0", 7), [])
+
+	def test_normalize_value(self):
+		# Las fechas mapeadas desde GHL deben coincidir con las leídas de la base
+		self.assertEqual(
+			normalize_value("starts_on", "2025-01-01 10:00:00"),
+			normalize_value("starts_on", datetime(2025, 1, 1, 10, 0)),
+		)
+		self.assertEqual(normalize_value("custom_sync_with_calendar_provider", True), "1")
+		self.assertEqual(normalize_value("description", None), "")
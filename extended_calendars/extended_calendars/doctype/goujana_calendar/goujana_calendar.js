@@ -2,6 +2,14 @@
 // For license information, please see license.txt
 
 frappe.ui.form.on("Goujana Calendar", {
+	setup(frm) {
+        frappe.realtime.on("calendar_sync_progress", function(data) {
+            if (data.doctype === frm.doctype && data.calendar === frm.doc.name) {
+                show_goujana_sync_progress(data);
+            }
+        });
+	},
+
 	refresh(frm) {
         frm.add_custom_button(__("Sync Calendar"), function() {
             if (!frm.doc.access_token) {
@@ -15,60 +23,22 @@ frappe.ui.form.on("Goujana Calendar", {
             frappe.confirm(
                 __('Are you sure you want to synchronize Calendar with GoHighLevel? This will fetch and push events for the specified calendar.'),
                 function() {
-                    let current_progress = 0;
-                    let maximum_progress = 100;
-                    let yield_progress = 90;
-                    let time_interval = 200;
-                    let finish_time_interval = 1000;
-                    let title = __("Synchronizing Calendar");
-                    frappe.show_alert({indicator: "green", message: __(title)});
-                    frappe.show_progress(title, current_progress, maximum_progress, __("Please wait"));
-                    let progress_interval = setInterval(function() {
-                        if (current_progress < yield_progress) {
-                            current_progress += 1;
-                            frappe.show_progress(title, current_progress, maximum_progress, __("Processing: ") + current_progress + "%");
-                        }
-                    }, time_interval);
                     frappe.call({
                         method: "extended_calendars.extended_calendars.doctype.goujana_calendar.goujana_calendar.sync",
                         args: {
                             doc_name: frm.doc.name
                         },
                         callback: function(r) {
-                            clearInterval(progress_interval);
-                            frappe.show_progress(title, maximum_progress, maximum_progress, __("Synchronization complete!"));
-                            setTimeout(function() {
-                                frappe.hide_progress();
-                                if (r.message && r.message.message) {
-                                    let message = r.message.message;
-                                    let indicator = r.message.success ? "green" : "orange";
-                                    let title = r.message.success ? __("Synchronization Completed") : __("Synchronization Completed with Issues");
-                                    
-                                    frappe.msgprint({
-                                        title: title,
-                                        indicator: indicator,
-                                        message: message
-                                    });
-                                } else {
-                                    frappe.msgprint({
-                                        title: __("Error"),
-                                        indicator: "red",
-                                        message: __("No valid response received from the API.")
-                                    });
-                                }
-                            }, finish_time_interval);
+                            // El avance llega por realtime desde el trabajo en segundo plano
+                            frappe.show_alert({indicator: r.message.queued ? "green" : "orange", message: r.message.message});
+                            frappe.show_progress(__("Synchronizing Calendar"), 0, 100, __("Waiting for a background worker"));
                         },
                         error: function(r) {
-                            clearInterval(progress_interval);
-                            frappe.show_progress(title, yield_progress, maximum_progress, __("Error occurred during synchronization."));
-                            setTimeout(function() {
-                                frappe.hide_progress();
-                                frappe.msgprint({
-                                    title: __("Error"),
-                                    indicator: "red",
-                                    message: __("Failed to synchronize Calendar. Please check the error logs.")
-                                    });
-                            }, finish_time_interval);
+                            frappe.msgprint({
+                                title: __("Error"),
+                                indicator: "red",
+                                message: __("Failed to start the Calendar synchronization. Please check the error logs.")
+                            });
                         }
                     });
                 },
@@ -79,3 +49,23 @@ frappe.ui.form.on("Goujana Calendar", {
         });
 	},
 });
+
+function show_goujana_sync_progress(data) {
+    let title = __("Synchronizing Calendar");
+    if (data.stage === "started") {
+        frappe.show_progress(title, 5, 100, __("Please wait"));
+    } else if (data.stage === "pull") {
+        frappe.show_progress(title, Math.min(60, 5 + data.pages * 5), 100,
+            __("Pull: {0} events processed ({1} created, {2} updated)", [data.records, data.created, data.updated]));
+    } else if (data.stage === "push") {
+        frappe.show_progress(title, 70, 100, __("Pushing events"));
+    } else if (data.stage === "finished") {
+        frappe.hide_progress();
+        let result = data.result || {};
+        frappe.msgprint({
+            title: result.success ? __("Synchronization Completed") : __("Synchronization Completed with Issues"),
+            indicator: result.success ? "green" : "orange",
+            message: result.message || __("No valid response received from the API.")
+        });
+    }
+}
@@ -3,11 +3,49 @@
 
 import frappe
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from frappe.model.document import Document
+from frappe.utils.caching import request_cache
+from extended_calendars.sync.adapter import ProviderAdapter
+from extended_calendars.sync.concurrency import submit_with_context
+from extended_calendars.sync.config import get_provider_config, invalidate_provider_config
+from extended_calendars.sync.engine import run_pull, run_push
+from extended_calendars.sync.fleet import queue_fleet_sync
+from extended_calendars.sync.http import get_session
+from extended_calendars.sync.jobs import enqueue_sync
+from extended_calendars.sync.metrics import track_sync_run
+from extended_calendars.sync.push import mark_event_pushed
+from extended_calendars.sync.resilience import IDEMPOTENCY_HEADER, expire_create_key, get_create_key
+
+GOUJANA_BASE_URL = "https://goujana.co"
+APPOINTMENT_ENDPOINT = "/api/v1/schedule/appointment/"
+
+# Ancho máximo de envíos concurrentes y timeout por solicitud
+PUSH_MAX_WORKERS = 8
+PUSH_TIMEOUT = 10
+
+# Citas por página en el pull (una consulta de existentes y una escritura por página)
+PULL_PAGE_SIZE = 200
 
 class GoujanaCalendar(Document):
     
+    def get_config(self):
+        """Credenciales y banderas usadas por los hooks y la sincronización."""
+        return {
+            "access_token": self.access_token,
+            "cookie_value": self.cookie_value,
+            "calendar_id": self.calendar_id,
+            "pull": self.pull,
+            "push": self.push
+        }
+
+    def on_update(self):
+        invalidate_provider_config(self.doctype, self.name)
+
+    def on_trash(self):
+        invalidate_provider_config(self.doctype, self.name)
+
     def pull_events_from_provider(self):
         """Método para obtener datos del proveedor."""
         # Get auth data
@@ -28,7 +66,7 @@ class GoujanaCalendar(Document):
         api_url = f"{base_url}{endpoint}"
   
         try:
-            response = requests.request(
+            response = get_session("Goujana Calendar").request(
                 "GET",
                 api_url,
                 headers=headers,
@@ -40,7 +78,8 @@ class GoujanaCalendar(Document):
         except Exception as e:
             raise frappe.ValidationError(f"Error al realizar la solicitud: {str(e)}")
    
-    def map_data_to_push(self, data):
+    @staticmethod
+    def map_data_to_push(data):
         """Map data to the structure required by the provider."""
         fields_to_map = {
             "subject": "text",
@@ -61,7 +100,8 @@ class GoujanaCalendar(Document):
         
         return mapped_data
     
-    def map_data_from_pull(self, data):
+    @staticmethod
+    def map_data_from_pull(data):
         fields_to_map = {
             "text": "subject",
             "observations": "description",
@@ -87,7 +127,7 @@ class GoujanaCalendar(Document):
         
         calendar_label = data.get("calendar", {}).get("label", "")
         calendar_name = (calendar_label.split("|")[0]).strip() if calendar_label else ""
-        calendar_doc_name = frappe.db.get_value("Goujana Calendar", {"calendar_name": calendar_name}, "name")
+        calendar_doc_name = get_calendar_by_name(calendar_name)
         
         mapped_data["custom_calendar"] = calendar_doc_name
         mapped_data["custom_calendar_provider"] = "Goujana Calendar"
@@ -95,40 +135,13 @@ class GoujanaCalendar(Document):
         
         return mapped_data
 	
-    def create_bulk_events(self, data_bulk):
-        """Create events in bulk from mapped data."""
-        if not data_bulk:
-            frappe.throw("No hay datos para crear eventos.")
-        
-        try:
-            for event_data in data_bulk:
-                event_doc = None
-                custom_calendar_event_id = event_data.get("custom_calendar_event_id")
-                
-                existing_event = frappe.db.exists("Event", {"custom_calendar_event_id": custom_calendar_event_id})
-                if existing_event:
-                    event_doc = frappe.get_doc("Event", existing_event)
-                
-                if not event_doc:
-                    event_doc = frappe.new_doc("Event")
-                
-                event_doc.update(event_data)
-            
-                event_doc.save()
-            
-            frappe.db.commit()
-            
-        except Exception as e:
-            error_msg = f"Error al crear eventos en bloque: {str(e)}"
-            frappe.log_error(
-                title="Goujana Calendar Bulk Event Creation Error",
-                message=error_msg,
-                doctype="Goujana Calendar",
-                docname=self.name
-            )
-    
     def push_bulk_events(self, data_bulk):
-        """Push events in bulk to the provider."""
+        """Push events in bulk to the provider.
+
+        `data_bulk` es un diccionario {nombre del Event: datos mapeados}. Los eventos se
+        envían en paralelo sobre una sesión compartida y los IDs devueltos por Goujana se
+        guardan en `custom_calendar_event_id` con una sola actualización masiva.
+        """
         if not data_bulk:
             frappe.throw("No hay datos para enviar eventos al proveedor.")
         
@@ -144,28 +157,62 @@ class GoujanaCalendar(Document):
             "Content-Type": "application/json"
         }
         
-        base_url = "https://goujana.co"
-        endpoint = "/api/v1/schedule/appointment/"
+        api_url = f"{GOUJANA_BASE_URL}{APPOINTMENT_ENDPOINT}"
+        session = get_session("Goujana Calendar", pool_size=PUSH_MAX_WORKERS)
+        create_keys = {
+            event_name: get_create_key("Goujana Calendar", self.name, event_name, event_data)
+            for event_name, event_data in data_bulk.items()
+        }
         
-        api_url = f"{base_url}{endpoint}"
+        def post_event(event_name, event_data):
+            # Un reintento de la misma creación devuelve la cita ya creada
+            event_headers = {**headers, IDEMPOTENCY_HEADER: create_keys[event_name]}
+            response = session.post(api_url, headers=event_headers, json=event_data, timeout=PUSH_TIMEOUT)
+            response.raise_for_status()
+            return response.json().get("id")
+        
+        pushed_ids = {}
+        errors = {}
         
-        for event_data in data_bulk:
-            try:
-                response = requests.post(
-                    api_url,
-                    headers=headers,
-                    json=event_data,
-                    timeout=10
-                )
-                response.raise_for_status()
-            except Exception as e:
-                error_msg = f"Error al enviar evento: {str(e)}"
-                frappe.log_error(
-                    title="Goujana Calendar Bulk Event Push Error",
-                    message=error_msg,
-                    doctype="Goujana Calendar",
-                    docname=self.name
-                )
+        # Solo HTTP dentro de los hilos; la escritura en base de datos ocurre al final
+        with ThreadPoolExecutor(max_workers=min(PUSH_MAX_WORKERS, len(data_bulk))) as executor:
+            futures = {
+                submit_with_context(executor, post_event, event_name, event_data): event_name
+                for event_name, event_data in data_bulk.items()
+            }
+            for future in as_completed(futures):
+                event_name = futures[future]
+                try:
+                    event_id = future.result()
+                except Exception as e:
+                    errors[event_name] = str(e)
+                    continue
+                
+                if event_id:
+                    pushed_ids[event_name] = str(event_id)
+                else:
+                    errors[event_name] = "La respuesta no contiene el id del evento"
+        
+        if pushed_ids:
+            frappe.db.bulk_update(
+                "Event",
+                {event_name: {"custom_calendar_event_id": event_id} for event_name, event_id in pushed_ids.items()},
+                update_modified=False
+            )
+            frappe.db.commit()
+            for event_name in pushed_ids:
+                expire_create_key(create_keys[event_name])
+        
+        if errors:
+            error_msg = "\n".join(f"{event_name}: {error}" for event_name, error in errors.items())
+            frappe.log_error(
+                title="Goujana Calendar Bulk Event Push Error",
+                message=f"Error al enviar eventos:\n{error_msg}",
+                doctype="Goujana Calendar",
+                docname=self.name
+            )
+        
+        return {"total": len(data_bulk), "pushed": len(pushed_ids), "failed": len(errors)}
             
     def retrive_bulk_events(self):
         """Recupera eventos en bloque desde el proveedor."""
@@ -173,6 +220,7 @@ class GoujanaCalendar(Document):
         related_events = frappe.get_all("Event", filters=[
             ["custom_sync_with_calendar_provider", "=", True],
             ["custom_calendar_provider", "=", "Goujana Calendar"],
+            ["custom_calendar", "=", self.name],
             ["custom_calendar_event_id", "in", ["", None]]
         ], fields=[
             "name",
@@ -188,47 +236,102 @@ class GoujanaCalendar(Document):
     
     def process_pull(self):
         """Procesa la sincronización de eventos desde el proveedor."""
-        pull_result = self.pull_events_from_provider()
-        mapped_bulk_data = []
-        
-        if pull_result:
-            mapped_bulk_data = [self.map_data_from_pull(event) for event in pull_result.get("results", [])]
-        
-        if mapped_bulk_data:
-            self.create_bulk_events(mapped_bulk_data)
-        
-        return {"success": True, "message": "Eventos sincronizados correctamente desde Goujana Calendar."}
+        return run_pull(GoujanaAdapter(self.name, doc=self))
     
     def process_push(self):
         """Procesa la sincronización de eventos hacia el proveedor."""
         push_data = self.retrive_bulk_events()
-        mapped_bulk_data = []
+        mapped_bulk_data = {}
         
         if push_data:
-            mapped_bulk_data = [self.map_data_to_push(event) for event in push_data]
+            mapped_bulk_data = {event.name: self.map_data_to_push(event) for event in push_data}
            
-        if mapped_bulk_data:
-            self.push_bulk_events(mapped_bulk_data)
+        if not mapped_bulk_data:
+            return {"success": True, "message": "No hay eventos pendientes para Goujana Calendar."}
         
-        return {"success": True, "message": "Eventos sincronizados correctamente hacia Goujana Calendar."}
+        stats = self.push_bulk_events(mapped_bulk_data)
+        
+        return {
+            "success": not stats["failed"],
+            "message": f"Eventos enviados a Goujana Calendar: {stats['pushed']} de {stats['total']}.",
+            "stats": stats
+        }
+
+class GoujanaAdapter(ProviderAdapter):
+    """Adaptador de Goujana para el motor de sincronización."""
+    
+    doctype = "Goujana Calendar"
+    sync_method = "extended_calendars.extended_calendars.doctype.goujana_calendar.goujana_calendar.sync_calendar"
+    event_fields = ("subject", "description", "starts_on", "ends_on", "custom_goujana_customer_id", "custom_calendar_id")
+    
+    def __init__(self, calendar, doc=None):
+        super().__init__(calendar)
+        self.doc = doc
+    
+    def get_doc(self):
+        if not self.doc:
+            self.doc = frappe.get_doc(self.doctype, self.calendar)
+        return self.doc
+    
+    def fetch_pages(self):
+        """Goujana devuelve todas las citas en una sola respuesta; se aplican por páginas.
+
+        Las citas se ordenan por ID (numérico y creciente) y el cursor es el ID de la última
+        entregada: al reanudar se aplican solo las posteriores, aunque entre ejecuciones se
+        hayan creado, borrado o reordenado citas en la respuesta.
+        """
+        self.throttle()
+        results = (self.get_doc().pull_events_from_provider() or {}).get("results", [])
+        results = sorted(results, key=get_appointment_order)
+        if self.resume_from is not None:
+            results = [record for record in results if get_appointment_order(record) > int(self.resume_from)]
+        for start in range(0, len(results), PULL_PAGE_SIZE):
+            page = results[start:start + PULL_PAGE_SIZE]
+            self.cursor = get_appointment_order(page[-1])
+            yield page
+    
+    def map_record(self, record, existing):
+        return GoujanaCalendar.map_data_from_pull(record)
+    
+    def push_batch(self):
+        return self.get_doc().process_push()
+    
+    @classmethod
+    def insert_event(cls, doc, method=None):
+        insert_event_in_goujana_calendar(doc, method)
+
+def get_appointment_order(record):
+    """Posición estable de una cita de Goujana: su ID numérico (las citas sin ID van primero)."""
+    return int(record.get("id") or 0)
+
+@request_cache
+def get_calendar_by_name(calendar_name):
+    """Goujana Calendar con el `calendar_name` dado, memorizado durante la solicitud."""
+    return frappe.db.get_value("Goujana Calendar", {"calendar_name": calendar_name}, "name")
 
 @frappe.whitelist()
 def sync(doc_name=None):
+    """Encola la sincronización con el proveedor; el avance llega al formulario por realtime."""
+    return enqueue_sync("Goujana Calendar", doc_name)
+
+def sync_calendar(doc_name=None):
     """Sincronización con proveedor.""" 
     try:
         doc = frappe.get_doc("Goujana Calendar", doc_name)
+        adapter = GoujanaAdapter(doc.name, doc=doc)
 
-        if doc.pull:
-            pull_result = doc.process_pull()
-        
-        #if doc.push:
-        #    push_result = doc.process_push()
+        with track_sync_run("Goujana Calendar", doc.name):
+            if doc.pull:
+                pull_result = run_pull(adapter)
+
+            if doc.push:
+                push_result = run_push(adapter)
         
         return {
             "success": True,
             "message": "Sincronización completada correctamente.", 
             "pull_result": pull_result if doc.pull else None,
-            #"push_result": push_result if doc.push else None
+            "push_result": push_result if doc.push else None
         }
     
     except Exception as e:
@@ -238,16 +341,9 @@ def sync(doc_name=None):
 
 @frappe.whitelist()
 def sync_all_goujana_calendars():
-    """Sincronización de todos los calendarios de Goujana Calendar."""
+    """Sincronización de todos los calendarios de Goujana Calendar, repartidos entre workers."""
     try:
-        calendars = frappe.get_all("Goujana Calendar", fields=["name"])
-        results = []
-        
-        for calendar in calendars:
-            result = sync(doc_name=calendar.name)
-            results.append(result)
-        
-        return {"success": True, "results": results}
+        return queue_fleet_sync(["Goujana Calendar"])
     
     except Exception as e:
         error_msg = f"Error en sync_all_calendars: {str(e)}"
@@ -274,9 +370,7 @@ def insert_event_in_goujana_calendar(doc, method=None):
                 and not doc.custom_calendar_event_id):
         return
     
-    calendar_doc = frappe.get_doc("Goujana Calendar", doc.custom_calendar)
-    if not calendar_doc:
-        frappe.throw(f"Goujana Calendar '{doc.custom_calendar}' not found.")
+    config = get_provider_config("Goujana Calendar", doc.custom_calendar)
         
     fmt = "%Y-%m-%dT%H:%M:%SZ"
     
@@ -297,10 +391,10 @@ def insert_event_in_goujana_calendar(doc, method=None):
         "custom_calendar_id": doc.custom_calendar_id,
     }
 
-    mapped_data = calendar_doc.map_data_to_push(event_data)
+    mapped_data = GoujanaCalendar.map_data_to_push(event_data)
     
-    access_token = calendar_doc.access_token
-    cookie_value = calendar_doc.cookie_value
+    access_token = config["access_token"]
+    cookie_value = config["cookie_value"]
     
     if not access_token or not cookie_value:
         frappe.throw("Access Token and Cookie Value are required to push data to Goujana Calendar.")
@@ -315,10 +409,11 @@ def insert_event_in_goujana_calendar(doc, method=None):
     endpoint = "/api/v1/schedule/appointment/"
     api_url = f"{base_url}{endpoint}"
     
+    create_key = get_create_key("Goujana Calendar", doc.custom_calendar, doc.name, mapped_data)
     try:
-        response = requests.post(
+        response = get_session("Goujana Calendar").post(
             api_url,
-            headers=headers,
+            headers={**headers, IDEMPOTENCY_HEADER: create_key},
             json=mapped_data,
             timeout=10
         )
@@ -327,9 +422,12 @@ def insert_event_in_goujana_calendar(doc, method=None):
         content = response.json()
         
         # Update doc with the custom_calendar_event_id, in the response is the id field
-        # Use direct database update to avoid reloading the document
-        frappe.db.set_value("Event", doc.name, "custom_calendar_event_id", content.get("id"))
+        # Use direct database update to avoid reloading the document; `modified` is kept so
+        # the Event is not pending again for the batch push
+        frappe.db.set_value("Event", doc.name, "custom_calendar_event_id", content.get("id"), update_modified=False)
+        mark_event_pushed(doc)
         frappe.db.commit()
+        expire_create_key(create_key)
         
     except requests.RequestException as e:
         error_msg = f"Error al enviar evento a Goujana Calendar: {str(e)}"
@@ -1,9 +1,28 @@
 # Copyright (c) 2025, Yeifer and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from extended_calendars.extended_calendars.doctype.goujana_calendar.goujana_calendar import GoujanaAdapter
+
 
 class TestGoujanaCalendar(FrappeTestCase):
-	pass
+	def fetch_ids(self, ids, resume_from=None):
+		# Adaptador sin calendario real: solo se ejercita la paginación de la respuesta
+		adapter = GoujanaAdapter.__new__(GoujanaAdapter)
+		adapter.doc = frappe._dict(pull_events_from_provider=lambda: {"results": [{"id": record_id} for record_id in ids]})
+		adapter.resume_from = resume_from
+		adapter.cursor = None
+		pages = [[record["id"] for record in page] for page in adapter.fetch_pages()]
+		return pages, adapter.cursor
+
+	def test_resume_after_last_applied_id(self):
+		pages, cursor = self.fetch_ids([30, 10, 20])
+		self.assertEqual(pages, [[10, 20, 30]])
+		self.assertEqual(cursor, 30)
+
+		# Entre ejecuciones se borró la 10 y se creó la 40: se reanuda tras la 20
+		pages, cursor = self.fetch_ids([40, 30, 20], resume_from=20)
+		self.assertEqual(pages, [[30, 40]])
+		self.assertEqual(cursor, 40)
@@ -0,0 +1,25 @@
+// Copyright (c) 2025, Yeifer and contributors
+// For license information, please see license.txt
+
+frappe.query_reports['Calendar Sync Performance'] = {
+    filters: [
+        {
+            fieldname: 'from_date',
+            label: __('From Date'),
+            fieldtype: 'Date',
+            default: frappe.datetime.add_days(frappe.datetime.get_today(), -7)
+        },
+        {
+            fieldname: 'to_date',
+            label: __('To Date'),
+            fieldtype: 'Date',
+            default: frappe.datetime.get_today()
+        },
+        {
+            fieldname: 'provider',
+            label: __('Provider'),
+            fieldtype: 'Select',
+            options: ['', 'Calendar Hubspot', 'GHL Calendar', 'Goujana Calendar']
+        }
+    ]
+};
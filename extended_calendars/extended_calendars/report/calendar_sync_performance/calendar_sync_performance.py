@@ -0,0 +1,67 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Avg, Count, Max, Sum
+from frappe.utils import add_days, getdate
+
+from extended_calendars.sync.metrics import PHASE_FIELDS
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    return get_columns(), get_data(filters)
+
+
+def get_columns():
+    columns = [
+        {"fieldname": "provider", "label": _("Provider"), "fieldtype": "Link", "options": "DocType", "width": 140},
+        {"fieldname": "calendar", "label": _("Calendar"), "fieldtype": "Dynamic Link", "options": "provider", "width": 160},
+        {"fieldname": "runs", "label": _("Runs"), "fieldtype": "Int", "width": 70},
+        {"fieldname": "failed_runs", "label": _("Failed"), "fieldtype": "Int", "width": 70},
+        {"fieldname": "avg_duration", "label": _("Avg Duration (s)"), "fieldtype": "Float", "precision": 3, "width": 120},
+        {"fieldname": "max_duration", "label": _("Max Duration (s)"), "fieldtype": "Float", "precision": 3, "width": 120},
+    ]
+    columns += [
+        {"fieldname": f"avg_{field}", "label": _("Avg {0} (s)").format(_(phase.title())), "fieldtype": "Float", "precision": 3, "width": 110}
+        for phase, field in PHASE_FIELDS.items()
+    ]
+    columns += [
+        {"fieldname": "avg_rate_limit_wait", "label": _("Avg Rate Limit Wait (s)"), "fieldtype": "Float", "precision": 3, "width": 140},
+        {"fieldname": "http_calls", "label": _("HTTP Calls"), "fieldtype": "Int", "width": 100},
+        {"fieldname": "rows_fetched", "label": _("Rows Fetched"), "fieldtype": "Int", "width": 110},
+        {"fieldname": "last_run", "label": _("Last Run"), "fieldtype": "Datetime", "width": 160},
+    ]
+    return columns
+
+
+def get_data(filters):
+    """Agrega los Calendar Sync Run por calendario, del más lento al más rápido."""
+    run = frappe.qb.DocType("Calendar Sync Run")
+    query = (
+        frappe.qb.from_(run)
+        .select(
+            run.provider,
+            run.calendar,
+            Count(run.name).as_("runs"),
+            Sum(Case().when(run.status == "Failed", 1).else_(0)).as_("failed_runs"),
+            Avg(run.duration).as_("avg_duration"),
+            Max(run.duration).as_("max_duration"),
+            *[Avg(run[field]).as_(f"avg_{field}") for field in PHASE_FIELDS.values()],
+            Avg(run.rate_limit_wait).as_("avg_rate_limit_wait"),
+            Sum(run.http_calls).as_("http_calls"),
+            Sum(run.rows_fetched).as_("rows_fetched"),
+            Max(run.started_at).as_("last_run"),
+        )
+        .groupby(run.provider, run.calendar)
+        .orderby("avg_duration", order=frappe.qb.desc)
+    )
+    if filters.from_date:
+        query = query.where(run.started_at >= getdate(filters.from_date))
+    if filters.to_date:
+        query = query.where(run.started_at < add_days(getdate(filters.to_date), 1))
+    if filters.provider:
+        query = query.where(run.provider == filters.provider)
+    return query.run(as_dict=True)
@@ -164,6 +164,17 @@ doc_events = {
 }
 
 # /workspace/development/frappe-bench/apps/extended_calendars/extended_calendars/extended_calendars/doctype/calendar_hubspot/calendar_hubspot.py
+
+# Calendar Provider Adapters
+# --------------------------
+# Sync adapter per provider doctype; provider modules are imported on first use
+
+calendar_provider_adapters = {
+    "Calendar Hubspot": "extended_calendars.extended_calendars.doctype.calendar_hubspot.calendar_hubspot.HubspotAdapter",
+    "GHL Calendar": "extended_calendars.extended_calendars.doctype.ghl_calendar.ghl_calendar.GHLAdapter",
+    "Goujana Calendar": "extended_calendars.extended_calendars.doctype.goujana_calendar.goujana_calendar.GoujanaAdapter",
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -188,7 +199,8 @@ doc_events = {
 scheduler_events = {
     "cron": {
         "* * * * *": [
-            "extended_calendars.extended_calendars.doctype.goujana_calendar.goujana_calendar.sync_all_goujana_calendars"
+            "extended_calendars.extended_calendars.doctype.goujana_calendar.goujana_calendar.sync_all_goujana_calendars",
+            "extended_calendars.sync.resilience.run_deferred_event_hooks"
         ]
     }
 }
@@ -273,3 +285,6 @@ override_whitelisted_methods = {
 # 	"Logging DocType Name": 30  # days to retain logs
 # }
 
+default_log_clearing_doctypes = {
+    "Calendar Sync Run": 30
+}
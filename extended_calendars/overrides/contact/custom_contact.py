@@ -1,87 +1,184 @@
 # Copyright (c) 2025, Yeifer and contributors
 # For license information, please see license.txt
 
+import logging
+
 import frappe
 from frappe import _
 from frappe.contacts.doctype.contact.contact import Contact
-import requests
+from extended_calendars.sync.config import get_provider_config
+from extended_calendars.sync.http import get_session
+
+# El módulo de HubSpot se importa dentro del job: cargar Contact no debe importar proveedores
+HUBSPOT_MODULE = "extended_calendars.extended_calendars.doctype.calendar_hubspot.calendar_hubspot"
+
+# Contactos por lote: cada uno aporta dos variantes de teléfono al filtro IN de la
+# búsqueda, que admite hasta 100 valores (batch/create admite hasta 100 entradas)
+HUBSPOT_BATCH_SIZE = 50
+HUBSPOT_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
 
 class CustomContact(Contact):
     def after_insert(self):
         if self.custom_calendar_provider == "Calendar Hubspot":
-            try:
-                if not self.custom_calendar:
-                    frappe.log_error("Custom calendar no especificado", "CustomContact.after_insert")
-                    return
-                hubspot = frappe.get_doc("Calendar Hubspot", self.custom_calendar)
-                access_token = hubspot.get("access_token")
-                calendar_id = hubspot.get("calendar_id")
-
-                # Check if the contact already exists in HubSpot
-                contact_exists = validate_contact_in_hubspot(self, access_token, calendar_id)
-                if contact_exists:
-                    frappe.log_error("El contacto ya existe en HubSpot", "CustomContact.after_insert")
-                    return
-                # Create the contact in HubSpot
-                create_hubspot_contact(
-                    firstname = self.first_name,
-                    calendar_id = calendar_id,
-                    access_token = access_token,
-                    phone = self.mobile_no,
-                )
-                print("\n\n")
-                print("Contact created in HubSpot")
-                print("\n\n")
-
-            except frappe.ValidationError as ve:
-                frappe.log_error(f"Error de validación: {str(ve)}", "CustomContact.after_insert")
-            except frappe.PermissionError as pe:
-                frappe.log_error(f"Error de permisos: {str(pe)}", "CustomContact.after_insert")
-            except Exception as e:
-                frappe.log_error(f"Error al crear contacto en Hubspot: {str(e)}", "CustomContact.after_insert")
-                raise
-
-
-def create_hubspot_contact(firstname, phone, calendar_id, access_token):
-    url = "https://api.hubapi.com/crm/v3/objects/CONTACTS"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "properties": {
-            "firstname": firstname,
-            "phone": f"+57{phone}",
-            "hubspot_owner_id": calendar_id,
-        }
-    }
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": f"Failed to create contact: {str(e)}"}
-    
-def validate_contact_in_hubspot(self, access_token, calendar_id):
-    url = "https://api.hubapi.com/crm/v3/objects/CONTACTS"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    params = {
-        "properties": ["firstname", "phone"],
-        "hubspot_owner_id": calendar_id,
-        "archived": False
-    }
-    try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
+            if not self.custom_calendar:
+                frappe.log_error("Custom calendar no especificado", "CustomContact.after_insert")
+                return
+            queue_hubspot_contact(self.custom_calendar, self.name)
+
+
+def get_hubspot_contact_queue_key(calendar):
+    return f"hubspot_contact_queue|{calendar}"
+
+def queue_hubspot_contact(calendar, contact_name):
+    """Encola un Contact para crearlo en HubSpot en el siguiente lote del calendario.
+
+    Los nombres se acumulan en un set de Redis y un único job por calendario (deduplicado
+    por job_id y encolado tras el commit) los procesa en bloque, de modo que una
+    importación masiva de Contacts no hace solicitudes HTTP dentro de cada inserción.
+    El job se programa una sola vez por calendario y transacción: la deduplicación por
+    job_id solo ocurre al dispararse cada encolado diferido.
+    """
+    frappe.cache.sadd(get_hubspot_contact_queue_key(calendar), contact_name)
+
+    scheduled = frappe.flags.setdefault("hubspot_contact_queue_scheduled", set())
+    if calendar in scheduled:
+        return
+    scheduled.add(calendar)
+    # Tras el commit (o el rollback) la siguiente transacción vuelve a programar el job
+    frappe.db.after_commit.add(lambda: scheduled.discard(calendar))
+    frappe.db.after_rollback.add(lambda: scheduled.discard(calendar))
+    frappe.enqueue(
+        "extended_calendars.overrides.contact.custom_contact.create_queued_hubspot_contacts",
+        queue="short",
+        job_id=f"hubspot_contact_queue|{calendar}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        calendar=calendar,
+    )
+
+def create_queued_hubspot_contacts(calendar):
+    """Job: crea en HubSpot los Contacts encolados que aún no existen allí.
+
+    Solo salen de la cola los Contacts que ya existen en HubSpot, los creados y los que ya
+    no existen en Frappe; si la búsqueda o la creación fallan quedan en la cola para el
+    siguiente job del calendario.
+    """
+    key = get_hubspot_contact_queue_key(calendar)
+    config = get_provider_config("Calendar Hubspot", calendar)
+    headers = frappe.get_module(HUBSPOT_MODULE).get_headers(config["access_token"])
+    stats = {"queued": 0, "existing": 0, "created": 0, "failed": 0}
+    attempted = set()
+
+    # Repetir mientras lleguen nombres nuevos durante el procesamiento
+    while names := sorted(set(_decode(name) for name in frappe.cache.smembers(key)) - attempted):
+        attempted.update(names)
+        for start in range(0, len(names), HUBSPOT_BATCH_SIZE):
+            batch = names[start:start + HUBSPOT_BATCH_SIZE]
+            contacts = frappe.get_all(
+                "Contact",
+                filters={"name": ["in", batch]},
+                fields=["name", "first_name", "mobile_no", "email_id"]
+            )
+            stats["queued"] += len(contacts)
+            missing = find_missing_hubspot_contacts(contacts, headers)
+            if missing is None:
+                stats["failed"] += len(contacts)
+                continue
+            created = batch_create_hubspot_contacts(missing, config["calendar_id"], headers)
+            stats["existing"] += len(contacts) - len(missing)
+            stats["created"] += len(created)
+            stats["failed"] += len(missing) - len(created)
+            pending = {contact.name for contact in missing} - created
+            done = [name for name in batch if name not in pending]
+            if done:
+                frappe.cache.srem(key, *done)
+
+    logger.info(f"HubSpot contact queue for {calendar}: {stats}")
+    if stats["failed"]:
+        frappe.log_error(f"{stats['failed']} HubSpot contacts for {calendar} remain queued: {stats}", "HubSpot Contact Creation Error")
+    return stats
+
+def find_missing_hubspot_contacts(contacts, headers):
+    """Devuelve los Contacts cuyo teléfono o email no aparece en HubSpot (búsqueda CRM).
+
+    Devuelve None si la búsqueda falla: sin ella no se puede saber qué existe.
+    """
+    hubspot = frappe.get_module(HUBSPOT_MODULE)
+    phones = {phone for contact in contacts for phone in get_phone_variants(contact.mobile_no)}
+    emails = {contact.email_id.lower() for contact in contacts if contact.email_id}
+    filter_groups = [
+        {"filters": [{"propertyName": name, "operator": "IN", "values": sorted(values)}]}
+        for name, values in (("phone", phones), ("email", emails)) if values
+    ]
+    if not filter_groups:
+        return []
+
+    existing_phones, existing_emails = set(), set()
+    payload = {"filterGroups": filter_groups, "properties": ["phone", "email"], "limit": 100}
+    while True:
+        response = get_session("Calendar Hubspot").post(hubspot.CONTACTS_SEARCH_URL, headers=headers, json=payload, timeout=HUBSPOT_TIMEOUT)
+        if response.status_code not in hubspot.SUCCESS_STATUS_CODES:
+            frappe.log_error(f"Error searching HubSpot contacts: {response.status_code} - {response.text}", "HubSpot Contact Search Error")
+            return None
         data = response.json()
-        if data.get("results"):
-            for contact in data["results"]:
-                if contact["properties"]["firstname"] == self.first_name and contact["properties"]["phone"] == f"+{self.mobile_no}":
-                    return True
-        return False
-    except requests.exceptions.RequestException as e:
-        return {"error": f"Failed to validate contact: {str(e)}"}
+        for result in data.get("results", []):
+            properties = result.get("properties") or {}
+            if properties.get("phone"):
+                existing_phones.add(properties["phone"])
+            if properties.get("email"):
+                existing_emails.add(properties["email"].lower())
+        after = data.get("paging", {}).get("next", {}).get("after")
+        if not after:
+            break
+        payload["after"] = after
+
+    return [
+        contact for contact in contacts
+        if (contact.mobile_no or contact.email_id)
+        and not existing_phones.intersection(get_phone_variants(contact.mobile_no))
+        and not (contact.email_id and contact.email_id.lower() in existing_emails)
+    ]
+
+def batch_create_hubspot_contacts(contacts, owner_id, headers):
+    """Crea los contactos con contacts/batch/create y devuelve los nombres de los creados."""
+    if not contacts:
+        return set()
+    hubspot = frappe.get_module(HUBSPOT_MODULE)
+    inputs = []
+    for contact in contacts:
+        properties = {"firstname": contact.first_name or "X", "hubspot_owner_id": owner_id}
+        if contact.mobile_no:
+            properties["phone"] = f"+57{contact.mobile_no}"
+        if contact.email_id:
+            properties["email"] = contact.email_id
+        inputs.append({"properties": properties})
+
+    response = get_session("Calendar Hubspot").post(f"{hubspot.CONTACTS_URL}/batch/create", headers=headers, json={"inputs": inputs}, timeout=HUBSPOT_TIMEOUT)
+    if response.status_code not in hubspot.SUCCESS_STATUS_CODES and response.status_code != 207:
+        frappe.log_error(f"Error creating HubSpot contacts: {response.status_code} - {response.text}", "HubSpot Contact Creation Error")
+        return set()
+
+    # 207: éxito parcial. Los resultados no conservan el orden de las entradas, así que se
+    # asocian por teléfono o email; los que no se reconozcan siguen en la cola y la
+    # próxima búsqueda los encontrará si sí se crearon
+    created_phones, created_emails = set(), set()
+    for result in response.json().get("results", []):
+        properties = result.get("properties") or {}
+        if properties.get("phone"):
+            created_phones.add(properties["phone"])
+        if properties.get("email"):
+            created_emails.add(properties["email"].lower())
+    return {
+        contact.name for contact in contacts
+        if created_phones.intersection(get_phone_variants(contact.mobile_no))
+        or (contact.email_id and contact.email_id.lower() in created_emails)
+    }
+
+def get_phone_variants(mobile_no):
+    """Formatos con los que el teléfono puede estar guardado en HubSpot."""
+    return [f"+57{mobile_no}", f"+{mobile_no}"] if mobile_no else []
 
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
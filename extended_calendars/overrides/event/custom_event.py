@@ -8,6 +8,8 @@ from frappe.utils import (
 	getdate,
 	now_datetime,
 )
+from frappe.utils.caching import request_cache
+from extended_calendars.sync.config import get_provider_config
 
 class CustomEvent(Event):
     
@@ -33,14 +35,18 @@ class CustomEvent(Event):
 
     def before_save(self):
         try:
-            
-            if (self.sync_with_google_calendar == 1 and frappe.db.exists("Google Calendar", self.google_calendar)):
+            # Conciliar los campos del proveedor antes de escribir: en una inserción todo
+            # queda en el INSERT original, sin un segundo UPDATE en after_insert
+            if self.is_new():
+                self.set_google_calendar_provider()
+
+            if (self.sync_with_google_calendar == 1 and google_calendar_exists(self.google_calendar)):
                 self.custom_sync_with_calendar_provider = 1
                 self.custom_calendar_provider = "Google Calendar"
                 self.custom_calendar = self.google_calendar
 
             if (self.sync_with_google_calendar == 1 and self.custom_sync_with_calendar_provider == 1):
-                if (self.custom_calendar_provider != "Google Calendar" or not frappe.db.exists("Google Calendar", self.custom_calendar)):
+                if (self.custom_calendar_provider != "Google Calendar" or not google_calendar_exists(self.custom_calendar)):
                     self.sync_with_google_calendar = 0
             else:
                 self.sync_with_google_calendar = 0 
@@ -48,7 +54,7 @@ class CustomEvent(Event):
             if (self.custom_sync_with_calendar_provider == 1):
                 self.sync_with_google_calendar = 0
                 if (self.custom_calendar_provider == "Google Calendar" and self.custom_calendar):
-                    if frappe.db.exists("Google Calendar", self.custom_calendar):
+                    if google_calendar_exists(self.custom_calendar):
                         self.sync_with_google_calendar = self.custom_sync_with_calendar_provider
                         self.google_calendar = self.custom_calendar
                 elif (self.custom_calendar_provider and self.custom_calendar):
@@ -58,37 +64,33 @@ class CustomEvent(Event):
         except Exception as e:
             frappe.log_error(f"Error in before_save {self.name}: {str(e)[:50]}")
 
-    def after_insert(self):
-        try:
-            calendar_exist = frappe.db.exists("Google Calendar", self.google_calendar)
-            if (not calendar_exist):
-                calendar_exist = frappe.db.exists("Google Calendar", self.custom_calendar)
-                self.google_calendar = self.custom_calendar
-
-            if (self.google_calendar and calendar_exist):
-                self.sync_with_google_calendar = 1
-                self.custom_sync_with_calendar_provider = self.sync_with_google_calendar
-                self.custom_calendar_provider = "Google Calendar"
-                self.custom_calendar = self.google_calendar
-                self.custom_calendar_id = self.google_calendar_id
-                self.custom_calendar_event_id = self.google_calendar_event_id
-                self.custom_meet_link = self.google_meet_link
-                self.custom_pulled_from_calendar_provider = self.pulled_from_google_calendar
+    def set_google_calendar_provider(self):
+        """Copia los datos de Google Calendar a los campos del proveedor en un Event nuevo."""
+        google_calendar = self.google_calendar if google_calendar_exists(self.google_calendar) else None
+        if not google_calendar and google_calendar_exists(self.custom_calendar):
+            google_calendar = self.custom_calendar
 
-                self.db_update()
-            
-        except Exception as e:
-            frappe.log_error(f"Error in after_insert {self.name}: {str(e)}")
+        if google_calendar:
+            self.google_calendar = google_calendar
+            self.sync_with_google_calendar = 1
+            self.custom_sync_with_calendar_provider = 1
+            self.custom_calendar_provider = "Google Calendar"
+            self.custom_calendar = google_calendar
+            self.custom_calendar_id = self.google_calendar_id
+            self.custom_calendar_event_id = self.google_calendar_event_id
+            self.custom_meet_link = self.google_meet_link
+            self.custom_pulled_from_calendar_provider = self.pulled_from_google_calendar
 
     def set_custom_calendar_id(self):
         try:
-            calendar_id = frappe.get_value(
-                self.custom_calendar_provider,
-                self.custom_calendar,
-                "calendar_id" 
-            )
+            calendar_id = get_provider_config(self.custom_calendar_provider, self.custom_calendar).get("calendar_id")
             self.custom_calendar_id = calendar_id if calendar_id else None
 
         except Exception as e:
             frappe.log_error(f"Error fetching calendar_id: {str(e)}")
             self.custom_calendar_id = None
+
+@request_cache
+def google_calendar_exists(name):
+    """`frappe.db.exists` de Google Calendar, memorizado durante la solicitud."""
+    return bool(name) and bool(frappe.db.exists("Google Calendar", name))
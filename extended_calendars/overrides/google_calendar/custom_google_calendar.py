@@ -3,23 +3,20 @@ import requests
 from frappe import _
 from urllib.parse import quote
 from frappe.integrations.google_oauth import GoogleOAuth
-from frappe.integrations.doctype.google_calendar.google_calendar import (
-    update_event_in_calendar as original_update_event_in_calendar,
-    get_google_calendar_object as original_get_google_calendar_object,
-)
 from frappe.utils import get_request_site_address
 from frappe.integrations.doctype.google_calendar.google_calendar import get_authentication_url
+from extended_calendars.overrides.google_calendar.patches import get_original
 
 def update_event_in_calendar(account, event, recurrence=None):
     event = frappe.get_doc("Event", {"google_calendar_event_id": event.get("id")})
     if (event and event.sync_with_google_calendar == 1):
-        original_update_event_in_calendar(account, event, recurrence)
+        get_original("update_event_in_calendar")(account, event, recurrence)
     else:
         return
     
 def get_google_calendar_object(g_calendar):
     try:
-        google_calendar, account = original_get_google_calendar_object(g_calendar)
+        google_calendar, account = get_original("get_google_calendar_object")(g_calendar)
     except Exception as e:
         account = frappe._dict()
         account.push_to_google_calendar = None
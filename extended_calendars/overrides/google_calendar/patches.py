@@ -0,0 +1,65 @@
+import importlib.abc
+import importlib.util
+import sys
+
+GOOGLE_CALENDAR_MODULE = "frappe.integrations.doctype.google_calendar.google_calendar"
+CUSTOM_MODULE = "extended_calendars.overrides.google_calendar.custom_google_calendar"
+
+# Funciones de Google Calendar que se reemplazan por las de custom_google_calendar
+PATCHED_FUNCTIONS = ("update_event_in_calendar", "get_google_calendar_object", "authorize_access")
+
+# Implementaciones originales, guardadas antes de aplicar los reemplazos
+originals = {}
+
+
+def get_original(name):
+    return originals[name]
+
+
+def apply_overrides(module):
+    """Reemplaza las funciones de Google Calendar en el módulo ya cargado."""
+    if originals:
+        return
+    for name in PATCHED_FUNCTIONS:
+        originals[name] = getattr(module, name)
+        setattr(module, name, _make_override(name))
+
+
+def _make_override(name):
+    # custom_google_calendar importa el módulo de Google Calendar: se carga al primer uso
+    # para no importarlo mientras ese módulo todavía se está ejecutando
+    def override(*args, **kwargs):
+        return getattr(importlib.import_module(CUSTOM_MODULE), name)(*args, **kwargs)
+
+    override.__name__ = name
+    return override
+
+
+class _PatchOnImport(importlib.abc.MetaPathFinder):
+    """Aplica los reemplazos cuando (y solo si) se importa el módulo de Google Calendar."""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != GOOGLE_CALENDAR_MODULE:
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or spec.loader is None:
+            return spec
+
+        exec_module = spec.loader.exec_module
+
+        def exec_and_patch(module):
+            exec_module(module)
+            apply_overrides(module)
+
+        spec.loader.exec_module = exec_and_patch
+        return spec
+
+
+def install():
+    """Instala los reemplazos sin importar Google Calendar (ni googleapiclient) por adelantado."""
+    module = sys.modules.get(GOOGLE_CALENDAR_MODULE)
+    if module is not None:
+        apply_overrides(module)
+    elif not any(isinstance(finder, _PatchOnImport) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _PatchOnImport())
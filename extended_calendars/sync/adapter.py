@@ -0,0 +1,125 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+from datetime import datetime
+
+from frappe.utils import get_datetime
+
+from extended_calendars.sync import rate_limit
+from extended_calendars.sync.config import get_provider_config
+
+# Campos de fecha que se comparan normalizados al calcular la huella de un Event
+DATETIME_FIELDS = ("starts_on", "ends_on")
+
+
+class ProviderAdapter:
+    """Interfaz de un proveedor de calendario para el motor de sincronización.
+
+    Cada proveedor implementa cómo obtener sus registros por páginas (`fetch_pages`), cómo
+    convertir un registro en campos de Event (`map_record`) y cómo enviar los cambios
+    locales (`push_batch`). Lotes, consultas y escrituras en bloque, límites de tasa y
+    métricas quedan a cargo de `extended_calendars.sync.engine`.
+    """
+
+    # Doctype del proveedor (p. ej. "GHL Calendar"); es también la clave en el registro
+    doctype = None
+
+    # Campos escalares de Event que `map_record` puede devolver; se leen de los Event
+    # existentes para detectar registros sin cambios
+    event_fields = ("subject", "starts_on", "ends_on", "description")
+
+    # (límite, periodo en segundos) de solicitudes por credencial, o None si el
+    # proveedor ya lo aplica en su propio cliente HTTP
+    rate_limit = None
+
+    # Ruta de la función que sincroniza un calendario completo (pull y push) a partir de
+    # su nombre; es la que ejecutan los trabajos en segundo plano
+    sync_method = None
+
+    def __init__(self, calendar):
+        self.calendar = calendar
+        self.config = get_provider_config(self.doctype, calendar)
+        self.rate_limit_wait = 0.0
+        # `cursor` es la posición tras la última página entregada; el motor la guarda como
+        # checkpoint en cada commit y, si el pull se interrumpe, la pasa en `resume_from`
+        self.cursor = None
+        self.resume_from = None
+
+    def fetch_pages(self):
+        """Genera listas de registros crudos del proveedor, una por página.
+
+        Si el proveedor puede reanudar, actualiza `cursor` antes de entregar cada página y
+        empieza desde `resume_from` cuando no es None.
+        """
+        raise NotImplementedError
+
+    def prepare_page(self, records):
+        """Resuelve datos auxiliares de una página (contactos, participantes...).
+
+        Corre en un hilo mientras el motor consulta los Event existentes, por lo que solo
+        puede hacer HTTP y usar la caché: nada de `frappe.db`.
+        """
+
+    def get_record_id(self, record):
+        record_id = record.get("id")
+        return str(record_id) if record_id else None
+
+    def map_record(self, record, existing):
+        """Devuelve los campos del Event para un registro, o None para omitirlo.
+
+        `existing` es la fila del Event ya sincronizado (con `event_fields`) o None.
+        """
+        raise NotImplementedError
+
+    def fingerprint(self, event_data):
+        """Huella de los campos escalares de un Event, para saltar escrituras sin cambios."""
+        values = {
+            field: normalize_value(field, event_data.get(field))
+            for field in self.event_fields
+            if field in event_data
+        }
+        return hashlib.sha1(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+    def push_batch(self):
+        """Envía al proveedor los Event pendientes y devuelve el resultado del push."""
+        raise NotImplementedError
+
+    def throttle(self):
+        """Espera turno en el límite de tasa del proveedor antes de una solicitud."""
+        if self.rate_limit:
+            self.rate_limit_wait += rate_limit.acquire(self.get_rate_limit_bucket(), *self.rate_limit)
+
+    def get_rate_limit_bucket(self):
+        return get_credential_key(self.doctype, self.config.get("access_token"), self.calendar)
+
+    # Hooks de Event (doc_events); por defecto el proveedor no reacciona
+    @classmethod
+    def insert_event(cls, doc, method=None):
+        pass
+
+    @classmethod
+    def update_event(cls, doc, method=None):
+        pass
+
+    @classmethod
+    def delete_event(cls, doc, method=None):
+        pass
+
+
+def get_credential_key(doctype, access_token, calendar):
+    """Identifica la credencial de un calendario sin exponer el token (límites por credencial)."""
+    token = access_token or calendar
+    return f"{doctype}|{hashlib.sha1(token.encode()).hexdigest()[:16]}"
+
+
+def normalize_value(field, value):
+    """Representación comparable de un valor tal como llega del proveedor o de la base."""
+    if value in (None, ""):
+        return ""
+    if field in DATETIME_FIELDS or isinstance(value, datetime):
+        return get_datetime(value).strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, bool):
+        value = int(value)
+    return str(value)
@@ -0,0 +1,120 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import logging
+
+import frappe
+from werkzeug.wrappers import Response
+
+from extended_calendars.sync.metrics import normalize_endpoint
+
+logger = logging.getLogger(__name__)
+
+# Hash de Redis con los contadores de todas las llamadas a proveedores del sitio
+METRICS_KEY = "calendar_api_metrics"
+
+# Límites superiores (segundos) del histograma de latencia
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Nombre, tipo, descripción y etiquetas de cada métrica expuesta
+METRICS = {
+    "calendar_api_requests_total": ("counter", "Solicitudes a la API del proveedor por código de estado.", ("provider", "method", "endpoint", "status")),
+    "calendar_api_retries_total": ("counter", "Reintentos hechos por la sesión HTTP.", ("provider", "method", "endpoint")),
+    "calendar_api_throttled_total": ("counter", "Respuestas 429, incluidas las que luego se reintentaron.", ("provider", "method", "endpoint")),
+    "calendar_api_response_bytes_total": ("counter", "Bytes recibidos en las respuestas.", ("provider", "method", "endpoint")),
+    "calendar_api_request_duration_seconds": ("histogram", "Latencia de las solicitudes, reintentos incluidos.", ("provider", "method", "endpoint")),
+}
+
+# Separador de etiquetas dentro del nombre de campo del hash
+SEPARATOR = "|"
+
+
+def record_api_call(provider, response, *args, **kwargs):
+    """Hook de `requests`: suma la respuesta a los contadores compartidos en Redis.
+
+    Los contadores se acumulan entre hilos, workers y procesos del sitio; un fallo de
+    Redis nunca interrumpe la solicitud.
+    """
+    labels = (provider, response.request.method, normalize_endpoint(response.url))
+    retries, throttled = get_retry_history(response)
+    seconds = response.elapsed.total_seconds()
+
+    try:
+        name = frappe.cache.make_key(METRICS_KEY)
+        pipe = frappe.cache.pipeline(transaction=False)
+        pipe.hincrby(name, field_name("calendar_api_requests_total", *labels, response.status_code), 1)
+        pipe.hincrby(name, field_name("calendar_api_response_bytes_total", *labels), len(response.content or b""))
+        if retries:
+            pipe.hincrby(name, field_name("calendar_api_retries_total", *labels), retries)
+        if throttled:
+            pipe.hincrby(name, field_name("calendar_api_throttled_total", *labels), throttled)
+        for bucket in (*LATENCY_BUCKETS, "+Inf"):
+            if bucket == "+Inf" or seconds <= bucket:
+                pipe.hincrby(name, field_name("calendar_api_request_duration_seconds_bucket", *labels, bucket), 1)
+        pipe.hincrbyfloat(name, field_name("calendar_api_request_duration_seconds_sum", *labels), seconds)
+        pipe.hincrby(name, field_name("calendar_api_request_duration_seconds_count", *labels), 1)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"No se pudieron registrar las métricas de {provider}: {str(e)}")
+
+
+def get_retry_history(response):
+    """Devuelve (reintentos, respuestas 429) de la solicitud, según el historial de urllib3."""
+    retry = getattr(response.raw, "retries", None)
+    history = getattr(retry, "history", None) or ()
+    throttled = sum(1 for attempt in history if attempt.status == 429)
+    if response.status_code == 429:
+        throttled += 1
+    return len(history), throttled
+
+
+def field_name(metric, *labels):
+    return SEPARATOR.join([metric, *(str(label) for label in labels)])
+
+
+def format_metrics(values):
+    """Convierte {campo del hash: valor} al formato de texto de Prometheus."""
+    samples = {}
+    for field, value in sorted(values.items()):
+        metric, *labels = field.split(SEPARATOR)
+        family = metric.rsplit("_", 1)[0] if metric not in METRICS else metric
+        if family not in METRICS:
+            continue
+        label_names = METRICS[family][2]
+        if metric.endswith("_bucket"):
+            label_names = (*label_names, "le")
+        rendered = ",".join(
+            f'{label}="{escape_label(label_value)}"' for label, label_value in zip(label_names, labels)
+        )
+        samples.setdefault(family, []).append(f"{metric}{{{rendered}}} {value}")
+
+    lines = []
+    for family, (metric_type, description, _labels) in METRICS.items():
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        lines.extend(samples.get(family, []))
+    return "\n".join(lines) + "\n"
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_values():
+    pipe = frappe.cache.pipeline(transaction=False)
+    pipe.hgetall(frappe.cache.make_key(METRICS_KEY))
+    (raw,) = pipe.execute()
+    return {
+        (field.decode() if isinstance(field, bytes) else field): (value.decode() if isinstance(value, bytes) else value)
+        for field, value in raw.items()
+    }
+
+
+@frappe.whitelist(methods=["GET"])
+def export():
+    """Métricas de las llamadas a los proveedores en formato de texto de Prometheus.
+
+    Pensado para un scraper autenticado con la API key de un System Manager.
+    """
+    frappe.only_for("System Manager")
+    return Response(format_metrics(get_values()), content_type="text/plain; version=0.0.4; charset=utf-8")
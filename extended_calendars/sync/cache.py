@@ -0,0 +1,68 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+
+def _pipeline():
+    return frappe.cache.pipeline(transaction=False)
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def get_hash(key, fields=None):
+    """Lee un hash de Redis con valores JSON; con `fields` solo devuelve esos campos."""
+    name = frappe.cache.make_key(key)
+    pipe = _pipeline()
+    if fields is None:
+        pipe.hgetall(name)
+        (raw,) = pipe.execute()
+        return {_decode(field): json.loads(value) for field, value in raw.items()}
+
+    fields = list(fields)
+    if not fields:
+        return {}
+    pipe.hmget(name, fields)
+    (values,) = pipe.execute()
+    return {field: json.loads(value) for field, value in zip(fields, values) if value is not None}
+
+
+def set_hash(key, mapping, ttl=None):
+    """Escribe varios campos de un hash en una sola ida a Redis y renueva su TTL."""
+    if not mapping:
+        return
+    name = frappe.cache.make_key(key)
+    pipe = _pipeline()
+    pipe.hset(name, mapping={field: json.dumps(value) for field, value in mapping.items()})
+    if ttl:
+        pipe.expire(name, ttl)
+    pipe.execute()
+
+
+def update_hash(key, mapping):
+    """Actualiza campos de un hash solo si ya existe, conservando su TTL."""
+    if not mapping:
+        return False
+    name = frappe.cache.make_key(key)
+    pipe = _pipeline()
+    pipe.exists(name)
+    (exists,) = pipe.execute()
+    if not exists:
+        return False
+    pipe.hset(name, mapping={field: json.dumps(value) for field, value in mapping.items()})
+    pipe.execute()
+    return True
+
+
+def delete_hash(key, fields=None):
+    """Elimina un hash completo o solo los campos indicados."""
+    name = frappe.cache.make_key(key)
+    pipe = _pipeline()
+    if fields:
+        pipe.hdel(name, *fields)
+    else:
+        pipe.delete(name)
+    pipe.execute()
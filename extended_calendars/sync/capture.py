@@ -0,0 +1,295 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import contextvars
+import cProfile
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import frappe
+import requests
+from frappe.utils import now_datetime
+from requests.adapters import BaseAdapter
+
+logger = logging.getLogger(__name__)
+
+# Grabación activa en el contexto actual; los hilos de submit_with_context la heredan
+_recorder = contextvars.ContextVar("calendar_sync_capture", default=None)
+
+# Durante una reproducción no se graba de nuevo lo que se está reproduciendo, ni se usan
+# el checkpoint ni el circuito del calendario real
+_replaying = contextvars.ContextVar("calendar_sync_replaying", default=False)
+
+# Si la reproducción en curso confirma sus escrituras (`replay_pull(commit=True)`)
+_replay_commit = contextvars.ContextVar("calendar_sync_replay_commit", default=False)
+
+CAPTURE_VERSION = 1
+
+# Cabeceras y claves (de query o JSON) cuyo valor nunca se guarda
+SECRET_HEADERS = {"authorization", "x-api-token", "cookie", "set-cookie", "proxy-authorization"}
+SECRET_KEY = re.compile(r"token|secret|password|authorization|cookie|api[_-]?key", re.IGNORECASE)
+SCRUBBED = "***"
+
+
+class Recorder:
+    """Escribe en un .jsonl.gz los pares solicitud/respuesta de una ejecución.
+
+    La primera línea describe la ejecución; cada línea siguiente es un intercambio. Se
+    escribe a medida que llegan las respuestas, por lo que la memoria no crece con la
+    cantidad de solicitudes.
+    """
+
+    def __init__(self, path, provider, calendar, operation):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._write({
+            "version": CAPTURE_VERSION,
+            "provider": provider,
+            "calendar": calendar,
+            "operation": operation,
+            "captured_at": str(now_datetime()),
+        })
+
+    def record(self, response):
+        request = response.request
+        self._write({
+            "method": request.method,
+            "url": scrub_url(request.url),
+            "request_headers": scrub_headers(request.headers),
+            "request_body": scrub_body(request.body),
+            "status": response.status_code,
+            "headers": scrub_headers(response.headers),
+            "body": scrub_response_body(response.text),
+        })
+        self.count += 1
+
+    def _write(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry, default=str) + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def scrub_headers(headers):
+    return {
+        header: SCRUBBED if header.lower() in SECRET_HEADERS else value
+        for header, value in (headers or {}).items()
+    }
+
+
+def scrub_url(url):
+    parts = urlsplit(url)
+    query = [(key, SCRUBBED if SECRET_KEY.search(key) else value) for key, value in parse_qsl(parts.query, keep_blank_values=True)]
+    return parts._replace(query=urlencode(query)).geturl()
+
+
+def scrub_body(body):
+    if not body:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        return scrub_value(json.loads(body))
+    except ValueError:
+        return body
+
+
+def scrub_response_body(body):
+    """Como `scrub_body`, pero devuelve texto: la reproducción entrega el cuerpo tal cual."""
+    body = scrub_body(body)
+    return body if body is None or isinstance(body, str) else json.dumps(body)
+
+
+def scrub_value(value):
+    if isinstance(value, dict):
+        return {key: SCRUBBED if SECRET_KEY.search(str(key)) else scrub_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [scrub_value(item) for item in value]
+    return value
+
+
+def record_exchange(response, *args, **kwargs):
+    """Hook de `requests`: guarda la respuesta en la grabación en curso, si la hay."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        try:
+            recorder.record(response)
+        except Exception as e:
+            logger.warning(f"No se pudo grabar {response.url}: {str(e)}")
+
+
+def is_replaying():
+    return _replaying.get()
+
+
+def should_commit():
+    """Si el motor debe confirmar la transacción: siempre, salvo al reproducir sin `commit`."""
+    return not _replaying.get() or _replay_commit.get()
+
+
+def is_capture_enabled():
+    return bool(frappe.conf.get("calendar_sync_capture"))
+
+
+def get_capture_dir():
+    """Carpeta de las grabaciones: `calendar_sync_capture_dir` o private/sync_captures del sitio."""
+    path = frappe.conf.get("calendar_sync_capture_dir") or frappe.get_site_path("private", "sync_captures")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextmanager
+def capture_sync_run(provider, calendar, operation, force=False):
+    """Graba las llamadas HTTP de una ejecución si `calendar_sync_capture` está activo.
+
+    Dentro de otra grabación no se abre un archivo nuevo: todo queda en la exterior.
+    """
+    if _recorder.get() is not None or _replaying.get() or not (force or is_capture_enabled()):
+        yield None
+        return
+
+    filename = f"{frappe.scrub(provider)}-{frappe.scrub(calendar)}-{operation.lower()}-{now_datetime():%Y%m%d%H%M%S%f}.jsonl.gz"
+    recorder = Recorder(os.path.join(get_capture_dir(), filename), provider, calendar, operation)
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+        recorder.close()
+
+
+def load_capture(path):
+    """Devuelve (encabezado, intercambios) de una grabación."""
+    with gzip.open(path, "rt", encoding="utf-8") as capture:
+        header = json.loads(capture.readline())
+        exchanges = [json.loads(line) for line in capture if line.strip()]
+    if header.get("version") != CAPTURE_VERSION:
+        frappe.throw(f"Versión de grabación no soportada: {header.get('version')}")
+    return header, exchanges
+
+
+class ReplayAdapter(BaseAdapter):
+    """Adaptador de `requests` que responde con los intercambios grabados, sin red.
+
+    Primero busca el mismo método, URL y cuerpo; si no lo hay, la siguiente respuesta
+    grabada para el mismo método y ruta. Así se reproducen también las solicitudes cuyos
+    parámetros dependen de la hora (p. ej. los tramos de fechas de GHL).
+    """
+
+    def __init__(self, exchanges):
+        super().__init__()
+        self._lock = threading.Lock()
+        self.exact = defaultdict(deque)
+        self.by_path = defaultdict(deque)
+        for exchange in exchanges:
+            entry = dict(exchange, served=False)
+            self.exact[self.exact_key(exchange["method"], exchange["url"], exchange.get("request_body"))].append(entry)
+            self.by_path[self.path_key(exchange["method"], exchange["url"])].append(entry)
+        self.unmatched = []
+
+    @staticmethod
+    def exact_key(method, url, body):
+        return method, scrub_url(url), json.dumps(body, sort_keys=True)
+
+    @staticmethod
+    def path_key(method, url):
+        parts = urlsplit(url)
+        return method, parts.netloc, parts.path.lower()
+
+    def next_entry(self, queue):
+        while queue:
+            entry = queue.popleft()
+            if not entry["served"]:
+                entry["served"] = True
+                return entry
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            entry = self.next_entry(self.exact[self.exact_key(request.method, request.url, scrub_body(request.body))])
+            entry = entry or self.next_entry(self.by_path[self.path_key(request.method, request.url)])
+            if entry is None:
+                self.unmatched.append(f"{request.method} {request.url}")
+        if entry is None:
+            raise requests.ConnectionError(f"Sin respuesta grabada para {request.method} {request.url}", request=request)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = requests.structures.CaseInsensitiveDict(entry["headers"])
+        response.headers.pop("Content-Encoding", None)
+        response._content = (entry["body"] or "").encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = ""
+        return response
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def replay(path):
+    """Sirve una grabación a la sesión del proveedor mientras dura el bloque."""
+    # http registra record_exchange de este módulo: se importa aquí para no crear un ciclo
+    from extended_calendars.sync.http import get_session
+
+    header, exchanges = load_capture(path)
+    session = get_session(header["provider"])
+    previous = dict(session.adapters)
+    adapter = ReplayAdapter(exchanges)
+    session.adapters.clear()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    token = _replaying.set(True)
+    try:
+        yield header, adapter
+    finally:
+        _replaying.reset(token)
+        session.adapters.clear()
+        session.adapters.update(previous)
+
+
+def replay_pull(path, calendar=None, profile=False, commit=False):
+    """Repite sin red el pull grabado en `path` sobre el calendario grabado (o `calendar`).
+
+    Es una herramienta de depuración y perfilado: no lee ni guarda el checkpoint del
+    calendario, ignora su circuito y, salvo con `commit=True`, deshace al final los Event
+    escritos. Con `profile` guarda un perfil de cProfile junto a la grabación (`.prof`).
+    Pensado para `bench --site <sitio> execute extended_calendars.sync.capture.replay_pull --kwargs ...`.
+    """
+    # El motor importa este módulo para grabar: se importa aquí para no crear un ciclo
+    from extended_calendars.sync.engine import run_pull
+    from extended_calendars.sync.registry import get_adapter
+
+    commit_token = _replay_commit.set(bool(commit))
+    try:
+        with replay(path) as (header, adapter):
+            pull_adapter = get_adapter(header["provider"], calendar or header["calendar"])
+            profiler = cProfile.Profile() if profile else None
+            if profiler:
+                profiler.enable()
+            try:
+                result = run_pull(pull_adapter)
+            finally:
+                if profiler:
+                    profiler.disable()
+                    profiler.dump_stats(f"{path}.prof")
+    finally:
+        _replay_commit.reset(commit_token)
+        if not commit:
+            frappe.db.rollback()
+
+    result["unmatched_requests"] = adapter.unmatched
+    result["committed"] = bool(commit)
+    return result
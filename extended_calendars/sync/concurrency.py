@@ -0,0 +1,31 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Ancho por defecto para llamadas HTTP concurrentes a un proveedor
+DEFAULT_MAX_WORKERS = 8
+
+
+def submit_with_context(executor, func, *args, **kwargs):
+    """Envía `func` al executor dentro de una copia del contexto actual.
+
+    Así los hilos ven `frappe.local` (sitio, configuración, caché) del hilo que los crea.
+    Los hilos no deben usar `frappe.db`: la conexión pertenece al hilo principal.
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, func, *args, **kwargs)
+
+
+def map_concurrently(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """Aplica `func` a cada elemento en paralelo y devuelve {elemento: resultado}."""
+    items = list(dict.fromkeys(items))
+    if not items:
+        return {}
+    if len(items) == 1:
+        return {items[0]: func(items[0])}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = {item: submit_with_context(executor, func, item) for item in items}
+        return {item: future.result() for item, future in futures.items()}
@@ -0,0 +1,33 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def _get_cache():
+    """Caché de la solicitud (o job) actual; `frappe.local` se reinicia en cada una."""
+    if not hasattr(frappe.local, "provider_config_cache"):
+        frappe.local.provider_config_cache = {}
+    return frappe.local.provider_config_cache
+
+
+def get_provider_config(doctype, name):
+    """Devuelve la configuración (`get_config()`) de un documento de proveedor.
+
+    El documento se carga una sola vez por solicitud y por (doctype, nombre); hooks y
+    sincronizaciones comparten el mismo diccionario, por lo que los metadatos que se
+    resuelvan sobre él (p. ej. el userId de GHL) también se reutilizan.
+    """
+    cache = _get_cache()
+    key = (doctype, name)
+    if key not in cache:
+        cache[key] = frappe.get_doc(doctype, name).get_config()
+    return cache[key]
+
+
+def invalidate_provider_config(doctype, name=None):
+    """Descarta la configuración en caché de un documento o, sin nombre, de todo el doctype."""
+    cache = _get_cache()
+    for key in list(cache):
+        if key[0] == doctype and (name is None or key[1] == name):
+            cache.pop(key, None)
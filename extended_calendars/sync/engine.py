@@ -0,0 +1,322 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from extended_calendars.sync.adapter import normalize_value
+from extended_calendars.sync.capture import capture_sync_run, is_replaying, should_commit
+from extended_calendars.sync.concurrency import submit_with_context
+from extended_calendars.sync.jobs import report_progress
+from extended_calendars.sync.metrics import get_current_metrics
+from extended_calendars.sync.push import mark_events_pushed
+from extended_calendars.sync.resilience import is_circuit_open
+
+# Tablas hijas de Event que un adaptador puede devolver en `map_record`
+CHILD_TABLE_FIELDS = ("event_participants",)
+# Campos que CustomEvent.validate/before_save normaliza o de los que deriva otros (fin igual
+# al inicio, orden de fechas, campos de Google Calendar, custom_calendar_id): si cambian, el
+# Event se guarda como documento en lugar de ir al bulk_update
+VALIDATED_FIELDS = ("starts_on", "ends_on", "repeat_on", "custom_calendar_provider", "custom_calendar", "custom_sync_with_calendar_provider")
+
+# Filas aplicadas entre commits (`calendar_sync_commit_rows` en site config). Cada commit
+# guarda un checkpoint para que un pull interrumpido se reanude desde ahí
+DEFAULT_COMMIT_ROWS = 500
+
+# Vigencia de un checkpoint: pasado este tiempo el siguiente pull vuelve a empezar
+CHECKPOINT_TTL = 6 * 60 * 60
+
+
+class PullInterrupted(Exception):
+    """El proveedor no pudo entregar una parte de los registros.
+
+    El adaptador la lanza desde `fetch_pages` sin avanzar `cursor`: lo aplicado hasta ahí
+    se confirma y el siguiente pull se reanuda desde la parte que falló.
+    """
+
+
+def new_stats():
+    return {
+        "total_records": 0,
+        "pages": 0,
+        "created_count": 0,
+        "updated_count": 0,
+        "unchanged_count": 0,
+        "skipped_count": 0,
+        "timings": {},
+        "rate_limit_wait": 0.0,
+    }
+
+
+@contextmanager
+def timed(stats, phase):
+    """Acumula en `stats["timings"][phase]` los segundos que tarda el bloque."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        timings = stats["timings"]
+        timings[phase] = round(timings.get(phase, 0.0) + time.monotonic() - start, 4)
+
+
+def run_pull(adapter):
+    """Trae los registros del proveedor y los aplica a Event página por página.
+
+    Por cada página: el adaptador resuelve sus datos auxiliares en un hilo mientras se
+    consultan los Event existentes en una sola consulta; luego se mapean los registros,
+    se descartan los que no cambiaron (por huella) y se escriben los demás en bloque.
+    """
+    if not adapter.config.get("pull"):
+        return {"success": False, "message": "Pull is disabled."}
+    if not is_replaying() and is_circuit_open(adapter.doctype):
+        return provider_unavailable(adapter)
+
+    stats = new_stats()
+    seen_ids = set()
+    checkpoint = get_checkpoint(adapter)
+    if checkpoint is not None:
+        adapter.resume_from = stats["resumed_from"] = checkpoint
+    with capture_sync_run(adapter.doctype, adapter.calendar, "Pull"):
+        result = run_pages(adapter, stats, seen_ids)
+    metrics = get_current_metrics()
+    if metrics:
+        metrics.add_pull_result(result)
+    return result
+
+
+def run_pages(adapter, stats, seen_ids):
+    commit_rows = cint(frappe.conf.get("calendar_sync_commit_rows")) or DEFAULT_COMMIT_ROWS
+    uncommitted = 0
+    try:
+        pages = iter(adapter.fetch_pages())
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while True:
+                with timed(stats, "fetch"):
+                    records = next(pages, None)
+                if records is None:
+                    break
+                stats["pages"] += 1
+                apply_page(adapter, records, stats, seen_ids, executor)
+                uncommitted += len(records)
+                if uncommitted >= commit_rows:
+                    with timed(stats, "write"):
+                        commit_checkpoint(adapter)
+                    uncommitted = 0
+                report_progress(
+                    "pull",
+                    pages=stats["pages"],
+                    records=stats["total_records"],
+                    created=stats["created_count"],
+                    updated=stats["updated_count"],
+                )
+        commit()
+        clear_checkpoint(adapter)
+    except PullInterrupted as e:
+        with timed(stats, "write"):
+            commit_checkpoint(adapter)
+        stats["interrupted"] = str(e)
+        error_msg = f"Pull de {adapter.doctype} {adapter.calendar} interrumpido: {str(e)}"
+        frappe.log_error(error_msg, f"{adapter.doctype} Pull Error")
+        return {"success": False, "message": error_msg, "stats": stats}
+    except Exception as e:
+        error_msg = f"Error en pull de {adapter.doctype} {adapter.calendar}: {str(e)}"
+        frappe.log_error(error_msg, f"{adapter.doctype} Pull Error")
+        return {"success": False, "message": error_msg, "stats": stats}
+    finally:
+        stats["rate_limit_wait"] = round(adapter.rate_limit_wait, 4)
+
+    message = (
+        f"Procesados {stats['total_records']} registros: {stats['created_count']} creados, "
+        f"{stats['updated_count']} actualizados, {stats['unchanged_count']} sin cambios, "
+        f"{stats['skipped_count']} omitidos"
+    )
+    return {"success": True, "message": message, "stats": stats}
+
+
+def get_checkpoint_key(adapter):
+    return f"calendar_sync_checkpoint|{adapter.doctype}|{adapter.calendar}"
+
+
+def get_checkpoint(adapter):
+    """Cursor guardado por un pull anterior que no terminó, o None.
+
+    Una reproducción (`capture.replay_pull`) no usa el checkpoint del calendario real.
+    """
+    if is_replaying():
+        return None
+    return frappe.cache.get_value(get_checkpoint_key(adapter))
+
+
+def commit_checkpoint(adapter):
+    """Confirma lo aplicado y guarda el cursor del adaptador para reanudar desde aquí.
+
+    El checkpoint se escribe después del commit: si el proceso muere entre ambos, el
+    siguiente pull repite páginas ya escritas, que se detectan como sin cambios.
+    """
+    commit()
+    if adapter.cursor is not None and not is_replaying():
+        frappe.cache.set_value(get_checkpoint_key(adapter), adapter.cursor, expires_in_sec=CHECKPOINT_TTL)
+
+
+def clear_checkpoint(adapter):
+    if not is_replaying():
+        frappe.cache.delete_value(get_checkpoint_key(adapter))
+
+
+def commit():
+    """Confirma la transacción; una reproducción sin `commit=True` no confirma nada."""
+    if should_commit():
+        frappe.db.commit()
+
+
+def run_push(adapter):
+    """Envía los Event pendientes del calendario y añade el tiempo de push al resultado."""
+    if is_circuit_open(adapter.doctype):
+        return provider_unavailable(adapter)
+    stats = {"timings": {}}
+    report_progress("push")
+    with capture_sync_run(adapter.doctype, adapter.calendar, "Push"), timed(stats, "push"):
+        result = adapter.push_batch()
+    result.setdefault("stats", {}).setdefault("timings", {}).update(stats["timings"])
+    metrics = get_current_metrics()
+    if metrics:
+        metrics.add_push_result(result)
+    return result
+
+
+def provider_unavailable(adapter):
+    """Resultado inmediato con el circuito del proveedor abierto; lo pendiente queda para la
+    siguiente sincronización (el checkpoint y las marcas de push se conservan)."""
+    return {"success": False, "message": f"{adapter.doctype} no disponible temporalmente (circuito abierto)", "stats": {}}
+
+
+def apply_page(adapter, records, stats, seen_ids, executor):
+    stats["total_records"] += len(records)
+    record_ids = [adapter.get_record_id(record) for record in records]
+
+    prepare_future = submit_with_context(executor, adapter.prepare_page, records)
+    with timed(stats, "lookup"):
+        existing = get_existing_events(adapter, [record_id for record_id in record_ids if record_id])
+    with timed(stats, "prepare"):
+        prepare_future.result()
+
+    inserts, updates, doc_updates = [], {}, {}
+    with timed(stats, "map"):
+        for record, record_id in zip(records, record_ids):
+            # Sin ID, repetido en la ventana o con la sincronización deshabilitada en Frappe
+            row = existing.get(record_id)
+            if not record_id or record_id in seen_ids or (row and row.custom_sync_with_calendar_provider != 1):
+                stats["skipped_count"] += 1
+                continue
+            seen_ids.add(record_id)
+
+            event_data = adapter.map_record(record, row)
+            if event_data is None:
+                stats["skipped_count"] += 1
+                continue
+            event_data["custom_calendar_event_id"] = record_id
+
+            if not row:
+                inserts.append(event_data)
+            elif is_unchanged(adapter, event_data, row):
+                stats["unchanged_count"] += 1
+            elif any(field in event_data for field in CHILD_TABLE_FIELDS) or has_validated_changes(event_data, row):
+                doc_updates[row.name] = event_data
+            else:
+                updates[row.name] = event_data
+
+    with timed(stats, "write"):
+        write_events(inserts, updates, doc_updates)
+    stats["created_count"] += len(inserts)
+    stats["updated_count"] += len(updates) + len(doc_updates)
+
+
+def get_existing_events(adapter, record_ids):
+    """Devuelve {custom_calendar_event_id: fila del Event} de una página con una consulta.
+
+    Si el adaptador devuelve tablas hijas, las filas incluyen además la lista ordenada de
+    participantes (`participants`), también obtenida con una sola consulta.
+    """
+    if not record_ids:
+        return {}
+    rows = frappe.get_all(
+        "Event",
+        filters={"custom_calendar_event_id": ["in", list(set(record_ids))]},
+        fields=["name", "custom_calendar_event_id", *dict.fromkeys((*VALIDATED_FIELDS, *adapter.event_fields))]
+    )
+    rows = {row.custom_calendar_event_id: row for row in rows}
+
+    if rows and getattr(adapter, "has_participants", False):
+        participants = frappe.get_all(
+            "Event Participants",
+            filters={"parenttype": "Event", "parent": ["in", [row.name for row in rows.values()]]},
+            fields=["parent", "reference_doctype", "reference_docname"]
+        )
+        by_event = {}
+        for participant in participants:
+            by_event.setdefault(participant.parent, []).append((participant.reference_doctype, participant.reference_docname))
+        for row in rows.values():
+            row.participants = sorted(by_event.get(row.name, []))
+    return rows
+
+
+def is_unchanged(adapter, event_data, row):
+    if adapter.fingerprint(event_data) != adapter.fingerprint({field: row.get(field) for field in event_data}):
+        return False
+    if "event_participants" in event_data:
+        participants = sorted(
+            (participant["reference_doctype"], participant["reference_docname"])
+            for participant in event_data["event_participants"]
+        )
+        return participants == row.get("participants", [])
+    return True
+
+
+def has_validated_changes(event_data, row):
+    return any(
+        normalize_value(field, event_data[field]) != normalize_value(field, row.get(field))
+        for field in VALIDATED_FIELDS
+        if field in event_data
+    )
+
+
+def write_events(inserts, updates, doc_updates):
+    """Escribe una página: inserta los nuevos, guarda por documento los que cambian tablas
+    hijas o campos validados (`VALIDATED_FIELDS`) y actualiza el resto en bloque.
+
+    Los documentos se marcan con `flags.pulled_from_provider` para que los hooks de Event
+    no los reenvíen al proveedor del que acaban de llegar, y todos quedan registrados como
+    ya enviados (`custom_last_pushed_modified`).
+    """
+    saved = []
+    for event_data in inserts:
+        event = frappe.get_doc({"doctype": "Event", **event_data})
+        event.flags.pulled_from_provider = True
+        event.insert(ignore_permissions=True)
+        saved.append(event)
+
+    for name, event_data in doc_updates.items():
+        event = frappe.get_doc("Event", name)
+        event.update(event_data)
+        event.flags.pulled_from_provider = True
+        event.save(ignore_permissions=True)
+        saved.append(event)
+
+    if updates:
+        # bulk_update no ejecuta validate, before_save ni doc_events, y aquí no hace falta:
+        # solo quedan cambios de campos de datos (asunto, descripción, datos del cliente);
+        # los hooks de extended_calendars ignoran los Event traídos del proveedor y los de
+        # Google Calendar no aplican, porque before_save ya dejó sync_with_google_calendar
+        # en 0 en los Event de otro proveedor
+        now = now_datetime()
+        frappe.db.bulk_update(
+            "Event",
+            {name: {**event_data, "custom_last_pushed_modified": now} for name, event_data in updates.items()},
+            modified=now
+        )
+
+    mark_events_pushed(saved)
@@ -0,0 +1,188 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import json
+import logging
+import time
+
+import frappe
+from frappe.utils import cint
+from redis.exceptions import LockError
+
+from extended_calendars.sync.adapter import get_credential_key
+from extended_calendars.sync.jobs import SYNC_TIMEOUT, enqueue_sync_job, run_sync_job
+
+logger = logging.getLogger(__name__)
+
+# Sincronizaciones simultáneas en todo el sitio y por credencial; se pueden cambiar con
+# `calendar_sync_concurrency` y `calendar_sync_credential_concurrency` en site config.
+# Varios calendarios con el mismo token comparten su límite de tasa: más de un par en
+# paralelo solo se esperan entre sí
+DEFAULT_CONCURRENCY = 8
+DEFAULT_CREDENTIAL_CONCURRENCY = 2
+
+# Calendarios por sincronizar (lista) y en curso (hash "proveedor|calendario" -> JSON)
+PENDING_KEY = "calendar_fleet|pending"
+RUNNING_KEY = "calendar_fleet|running"
+LOCK_KEY = "calendar_fleet|lock"
+
+
+def get_concurrency():
+    return cint(frappe.conf.get("calendar_sync_concurrency")) or DEFAULT_CONCURRENCY
+
+
+def get_credential_concurrency():
+    return cint(frappe.conf.get("calendar_sync_credential_concurrency")) or DEFAULT_CREDENTIAL_CONCURRENCY
+
+
+@frappe.whitelist()
+def sync_all_calendars(providers=None):
+    """Sincroniza todos los calendarios con pull o push activo, repartidos entre workers.
+
+    Para `bench --site <sitio> execute extended_calendars.sync.fleet.sync_all_calendars`;
+    `providers` limita el barrido a esos doctypes (lista o JSON). El paralelismo real es
+    el menor entre los cupos configurados y los workers de la cola de sincronización.
+    """
+    frappe.only_for("System Manager")
+    if isinstance(providers, str):
+        providers = frappe.parse_json(providers)
+    return queue_fleet_sync(providers)
+
+
+def queue_fleet_sync(providers=None):
+    """Agrega los calendarios a la cola de la flota y arranca tantos como permitan los cupos.
+
+    Los que ya están pendientes o en curso no se repiten, por lo que se puede llamar desde
+    el scheduler aunque el barrido anterior no haya terminado.
+    """
+    items = get_fleet_items(providers)
+    with fleet_lock():
+        pending, running = get_pending(), get_running()
+        queued = {item_key(item) for item in pending} | set(running)
+        new_items = [item for item in items if item_key(item) not in queued]
+        if new_items:
+            pipe = _pipeline()
+            pipe.rpush(_key(PENDING_KEY), *[json.dumps(item) for item in new_items])
+            pipe.execute()
+        started = dispatch(pending + new_items, running)
+
+    return {
+        "success": True,
+        "queued": len(new_items),
+        "skipped": len(items) - len(new_items),
+        "started": started,
+    }
+
+
+def get_fleet_items(providers=None):
+    providers = providers or list(frappe.get_hooks("calendar_provider_adapters"))
+    items = []
+    for provider in providers:
+        calendars = frappe.get_all(provider, or_filters={"pull": 1, "push": 1}, fields=["name", "access_token"])
+        items.extend(
+            {
+                "provider": provider,
+                "calendar": calendar.name,
+                "credential": get_credential_key(provider, calendar.access_token, calendar.name),
+            }
+            for calendar in calendars
+        )
+    return items
+
+
+def dispatch(pending, running):
+    """Encola los pendientes que caben en los cupos global y por credencial.
+
+    Debe llamarse con el lock de la flota. Devuelve cuántos calendarios se iniciaron.
+    """
+    concurrency, credential_concurrency = get_concurrency(), get_credential_concurrency()
+    per_credential = {}
+    for job in running.values():
+        per_credential[job["credential"]] = per_credential.get(job["credential"], 0) + 1
+
+    started, dropped = [], []
+    for item in pending:
+        if len(running) + len(started) >= concurrency:
+            break
+        if per_credential.get(item["credential"], 0) >= credential_concurrency:
+            continue
+        job = enqueue_sync_job("extended_calendars.sync.fleet.run_fleet_job", item["provider"], item["calendar"])
+        if job is None:
+            # El calendario ya tiene un trabajo (p. ej. lanzado desde su formulario)
+            dropped.append(item)
+            continue
+        per_credential[item["credential"]] = per_credential.get(item["credential"], 0) + 1
+        started.append(item)
+
+    pipe = _pipeline()
+    for item in started + dropped:
+        pipe.lrem(_key(PENDING_KEY), 1, json.dumps(item))
+    for item in started:
+        pipe.hset(_key(RUNNING_KEY), item_key(item), json.dumps({"credential": item["credential"], "started": time.time()}))
+    pipe.execute()
+    return len(started)
+
+
+def run_fleet_job(provider, calendar):
+    """Trabajo de la flota: sincroniza un calendario y libera su cupo para el siguiente."""
+    try:
+        return run_sync_job(provider, calendar)
+    finally:
+        release(provider, calendar)
+
+
+def release(provider, calendar):
+    """Libera el cupo del calendario y arranca los pendientes que quepan.
+
+    El HDEL es atómico y no necesita el lock: aunque éste no se obtenga, el cupo se libera
+    y el siguiente trabajo que termine (o el siguiente barrido) despacha los pendientes.
+    """
+    pipe = _pipeline()
+    pipe.hdel(_key(RUNNING_KEY), f"{provider}|{calendar}")
+    pipe.execute()
+    try:
+        with fleet_lock():
+            dispatch(get_pending(), get_running())
+    except LockError:
+        logger.warning(f"No se obtuvo el lock de la flota al terminar {provider} {calendar}")
+
+
+def get_pending():
+    pipe = _pipeline()
+    pipe.lrange(_key(PENDING_KEY), 0, -1)
+    (values,) = pipe.execute()
+    return [json.loads(value) for value in values]
+
+
+def get_running():
+    """Calendarios en curso; descarta los que superan el timeout (su worker murió)."""
+    pipe = _pipeline()
+    pipe.hgetall(_key(RUNNING_KEY))
+    (values,) = pipe.execute()
+    running, expired = {}, []
+    for field, value in values.items():
+        field, job = field.decode(), json.loads(value)
+        if time.time() - job["started"] > SYNC_TIMEOUT:
+            expired.append(field)
+        else:
+            running[field] = job
+    if expired:
+        pipe.hdel(_key(RUNNING_KEY), *expired)
+        pipe.execute()
+    return running
+
+
+def item_key(item):
+    return f"{item['provider']}|{item['calendar']}"
+
+
+def fleet_lock():
+    return frappe.cache.lock(_key(LOCK_KEY), timeout=30, blocking_timeout=15)
+
+
+def _key(key):
+    return frappe.cache.make_key(key)
+
+
+def _pipeline():
+    return frappe.cache.pipeline(transaction=False)
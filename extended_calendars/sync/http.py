@@ -0,0 +1,59 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import threading
+from functools import partial
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from extended_calendars.sync.api_metrics import record_api_call
+from extended_calendars.sync.capture import record_exchange
+from extended_calendars.sync.metrics import record_response
+from extended_calendars.sync.resilience import RETRY_STATUS_CODES, ProviderRetry, ResilientAdapter
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(provider, pool_size=10, retries=3):
+    """Devuelve una sesión HTTP con pool de conexiones, reintentos y circuito para un proveedor.
+
+    La sesión se comparte durante la vida del proceso (y entre hilos) para reutilizar
+    conexiones keep-alive en lugar de abrir una conexión TLS por solicitud. Cada
+    respuesta se contabiliza en las métricas de la sincronización en curso, si la hay, y
+    en los contadores por proveedor que expone `api_metrics.export`, y se graba si hay
+    una captura activa (`capture.capture_sync_run`). Reintentos, circuito e idempotencia
+    de creaciones: `resilience`.
+
+    El pool crece hasta el mayor `pool_size` pedido: los push concurrentes no quedan
+    limitados por el tamaño con el que otro llamador creó la sesión.
+    """
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is None:
+            retry = ProviderRetry(
+                total=retries,
+                connect=retries,
+                read=0,
+                status=retries,
+                backoff_factor=0.5,
+                status_forcelist=RETRY_STATUS_CODES,
+                allowed_methods=None,
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = ResilientAdapter(provider, pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.hooks["response"].append(record_response)
+            session.hooks["response"].append(partial(record_api_call, provider))
+            session.hooks["response"].append(record_exchange)
+            _sessions[provider] = session
+        else:
+            adapter = session.get_adapter("https://")
+            if isinstance(adapter, HTTPAdapter) and pool_size > adapter._pool_maxsize:
+                # Las conexiones en uso del pool anterior terminan normalmente y se descartan
+                adapter.init_poolmanager(pool_size, pool_size, block=adapter._pool_block)
+    return session
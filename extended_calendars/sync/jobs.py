@@ -0,0 +1,93 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import contextvars
+
+import frappe
+from frappe import _
+
+from extended_calendars.sync.registry import get_adapter_class
+
+# Cola propia para no competir con los trabajos cortos del sitio. Requiere workers en
+# common_site_config (`"workers": {"calendar_sync": {"timeout": 3600}}`); sin ellos se usa `long`
+SYNC_QUEUE = "calendar_sync"
+SYNC_TIMEOUT = 60 * 60
+
+# Evento realtime con el avance de una sincronización; se publica al documento del calendario
+SYNC_PROGRESS_EVENT = "calendar_sync_progress"
+
+# (proveedor, calendario) de la sincronización en segundo plano que corre en este contexto
+_current_job = contextvars.ContextVar("calendar_sync_job", default=None)
+
+
+def get_sync_queue():
+    return SYNC_QUEUE if SYNC_QUEUE in (frappe.conf.get("workers") or {}) else "long"
+
+
+def get_sync_job_id(provider, calendar):
+    return f"calendar_sync|{provider}|{calendar}"
+
+
+def enqueue_sync(provider, calendar):
+    """Encola la sincronización de un calendario y devuelve el ID del trabajo.
+
+    Si ya hay una sincronización del mismo calendario en cola o en curso no se encola otra:
+    se devuelve el mismo ID para que el formulario siga su avance.
+    """
+    frappe.has_permission(provider, "write", doc=calendar, throw=True)
+    job_id = get_sync_job_id(provider, calendar)
+    job = enqueue_sync_job("extended_calendars.sync.jobs.run_sync_job", provider, calendar)
+    return {
+        "job_id": job_id,
+        "queued": job is not None,
+        "message": _("Sincronización en cola") if job is not None else _("La sincronización ya está en curso"),
+    }
+
+
+def enqueue_sync_job(method, provider, calendar, **kwargs):
+    """Encola `method` para un calendario; devuelve None si ya tiene un trabajo en cola o en curso."""
+    return frappe.enqueue(
+        method,
+        queue=get_sync_queue(),
+        timeout=SYNC_TIMEOUT,
+        job_id=get_sync_job_id(provider, calendar),
+        deduplicate=True,
+        provider=provider,
+        calendar=calendar,
+        **kwargs,
+    )
+
+
+def run_sync_job(provider, calendar):
+    """Trabajo en segundo plano: ejecuta la sincronización y publica su avance y resultado.
+
+    La función de sincronización es el `sync_method` del adaptador del proveedor.
+    """
+    token = _current_job.set((provider, calendar))
+    try:
+        publish_sync_progress(provider, calendar, "started")
+        try:
+            result = frappe.get_attr(get_adapter_class(provider).sync_method)(calendar)
+        except Exception as e:
+            frappe.log_error(f"Error en la sincronización de {provider} {calendar}: {str(e)}", f"{provider} Sync Error")
+            result = {"success": False, "message": str(e)}
+        publish_sync_progress(provider, calendar, "finished", result=result)
+        return result
+    finally:
+        _current_job.reset(token)
+
+
+def report_progress(stage, **data):
+    """Publica el avance de la sincronización en segundo plano en curso, si la hay."""
+    job = _current_job.get()
+    if job:
+        publish_sync_progress(*job, stage, **data)
+
+
+def publish_sync_progress(provider, calendar, stage, **data):
+    frappe.publish_realtime(
+        SYNC_PROGRESS_EVENT,
+        {"doctype": provider, "calendar": calendar, "stage": stage, **data},
+        doctype=provider,
+        docname=calendar,
+    )
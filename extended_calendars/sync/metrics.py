@@ -0,0 +1,167 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import contextvars
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import frappe
+from frappe.utils import now_datetime
+
+# Métricas de la sincronización en curso; los hilos creados con submit_with_context
+# heredan el mismo objeto, por lo que sus llamadas HTTP también se contabilizan
+_current = contextvars.ContextVar("calendar_sync_metrics", default=None)
+
+# Fases medidas por el motor y su campo en Calendar Sync Run
+PHASE_FIELDS = {
+    "fetch": "fetch_time",
+    "prepare": "prepare_time",
+    "lookup": "lookup_time",
+    "map": "map_time",
+    "write": "write_time",
+    "push": "push_time",
+}
+
+# Segmentos de ruta que son identificadores (se agrupan como {id} por endpoint)
+ID_SEGMENT = re.compile(r"^(?=.*\d)[\w-]{6,}$|^\d+$")
+
+# Máximo de errores guardados por ejecución
+MAX_ERRORS = 20
+
+
+class SyncMetrics:
+    """Acumula tiempos, filas, llamadas HTTP y errores de una ejecución de sincronización."""
+
+    def __init__(self, provider, calendar, operation):
+        self.provider = provider
+        self.calendar = calendar
+        self.operation = operation
+        self.timings = {}
+        self.rows = {"fetched": 0, "created": 0, "updated": 0, "unchanged": 0, "skipped": 0, "pushed": 0}
+        self.endpoints = {}
+        self.rate_limit_wait = 0.0
+        self.errors = []
+        self.success = True
+        self._lock = threading.Lock()
+
+    def record_http(self, method, url, status_code, size, seconds):
+        endpoint = f"{method} {normalize_endpoint(url)}"
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {"calls": 0, "bytes": 0, "seconds": 0.0, "errors": 0})
+            stats["calls"] += 1
+            stats["bytes"] += size
+            stats["seconds"] = round(stats["seconds"] + seconds, 4)
+            if status_code >= 400:
+                stats["errors"] += 1
+
+    def record_rate_limit_wait(self, seconds):
+        with self._lock:
+            self.rate_limit_wait += seconds
+
+    def add_timings(self, timings):
+        for phase, seconds in (timings or {}).items():
+            self.timings[phase] = round(self.timings.get(phase, 0.0) + seconds, 4)
+
+    def add_pull_result(self, result):
+        stats = result.get("stats") or {}
+        self.rows["fetched"] += stats.get("total_records", 0)
+        for row in ("created", "updated", "unchanged", "skipped"):
+            self.rows[row] += stats.get(f"{row}_count", 0)
+        self.add_timings(stats.get("timings"))
+        self.add_result(result)
+
+    def add_push_result(self, result):
+        stats = result.get("stats") or {}
+        # Cada proveedor nombra distinto a los eventos enviados con éxito
+        self.rows["pushed"] += stats.get("successful", stats.get("pushed", stats.get("success", 0)))
+        self.add_timings(stats.get("timings"))
+        self.add_result(result)
+
+    def add_result(self, result):
+        if not result.get("success") and result.get("message") not in ("Pull is disabled.", "Push is disabled."):
+            self.add_error(result.get("message"))
+
+    def add_error(self, message):
+        self.success = False
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(str(message))
+
+
+def normalize_endpoint(url):
+    """host/ruta sin query y con los identificadores reemplazados por {id}."""
+    parts = urlsplit(url)
+    path = "/".join("{id}" if ID_SEGMENT.match(segment) else segment for segment in parts.path.split("/"))
+    return f"{parts.netloc}{path}"
+
+
+def get_current_metrics():
+    return _current.get()
+
+
+def record_response(response, *args, **kwargs):
+    """Hook de `requests`: contabiliza la respuesta en la sincronización en curso."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record_http(
+            response.request.method,
+            response.url,
+            response.status_code,
+            len(response.content or b""),
+            response.elapsed.total_seconds(),
+        )
+    return response
+
+
+def record_rate_limit_wait(seconds):
+    metrics = _current.get()
+    if metrics is not None and seconds:
+        metrics.record_rate_limit_wait(seconds)
+
+
+@contextmanager
+def track_sync_run(provider, calendar, operation="Sync"):
+    """Mide una ejecución de sincronización y la guarda como Calendar Sync Run al terminar."""
+    metrics = SyncMetrics(provider, calendar, operation)
+    token = _current.set(metrics)
+    started_at = now_datetime()
+    start = time.monotonic()
+    try:
+        yield metrics
+    except Exception as e:
+        metrics.add_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        save_sync_run(metrics, started_at, time.monotonic() - start)
+
+
+def save_sync_run(metrics, started_at, duration):
+    """Inserta el Calendar Sync Run; un fallo al registrar nunca interrumpe la sincronización."""
+    try:
+        run = frappe.new_doc("Calendar Sync Run")
+        run.update({
+            "provider": metrics.provider,
+            "calendar": metrics.calendar,
+            "operation": metrics.operation,
+            "status": "Success" if metrics.success else "Failed",
+            "started_at": started_at,
+            "finished_at": now_datetime(),
+            "duration": round(duration, 4),
+            "rate_limit_wait": round(metrics.rate_limit_wait, 4),
+            "http_calls": sum(stats["calls"] for stats in metrics.endpoints.values()),
+            "http_bytes": sum(stats["bytes"] for stats in metrics.endpoints.values()),
+            "http_errors": sum(stats["errors"] for stats in metrics.endpoints.values()),
+            "endpoint_stats": json.dumps(metrics.endpoints, indent=1, sort_keys=True),
+            "error_count": len(metrics.errors),
+            "errors": "\n".join(metrics.errors),
+            **{f"rows_{row}": count for row, count in metrics.rows.items()},
+            **{field: metrics.timings.get(phase, 0.0) for phase, field in PHASE_FIELDS.items()},
+        })
+        run.insert(ignore_permissions=True)
+        return run
+    except Exception as e:
+        frappe.log_error(f"Error guardando Calendar Sync Run de {metrics.calendar}: {str(e)}", "Calendar Sync Run Error")
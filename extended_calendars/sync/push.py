@@ -0,0 +1,44 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def get_events_to_push(provider, calendar, fields):
+    """Devuelve los Event con sincronización habilitada que cambiaron desde su último push.
+
+    Un Event se considera pendiente si nunca se ha enviado (`custom_last_pushed_modified`
+    vacío) o si su `modified` es más reciente que la marca guardada en el último envío.
+    """
+    Event = frappe.qb.DocType("Event")
+    fields = [field for field in fields if field != "modified"]
+    query = (
+        frappe.qb.from_(Event)
+        .select(*[Event[field] for field in fields], Event.modified)
+        .where(Event.custom_calendar_provider == provider)
+        .where(Event.custom_sync_with_calendar_provider == 1)
+        .where(Event.custom_calendar == calendar)
+        .where(
+            Event.custom_last_pushed_modified.isnull()
+            | (Event.modified > Event.custom_last_pushed_modified)
+        )
+    )
+    return query.run(as_dict=True)
+
+
+def mark_event_pushed(doc):
+    """Marca un Event enviado desde sus hooks (inserción o actualización) como ya enviado,
+    para que el push por lotes no lo vuelva a mandar."""
+    doc.custom_last_pushed_modified = doc.modified
+    frappe.db.set_value("Event", doc.name, "custom_last_pushed_modified", doc.modified, update_modified=False)
+
+
+def mark_events_pushed(events):
+    """Guarda el `modified` de cada Event como marca de su último push sin alterar `modified`."""
+    if not events:
+        return
+    frappe.db.bulk_update(
+        "Event",
+        {event.name: {"custom_last_pushed_modified": event.modified} for event in events},
+        update_modified=False,
+    )
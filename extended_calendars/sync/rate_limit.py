@@ -0,0 +1,41 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import logging
+import time
+
+import frappe
+
+from extended_calendars.sync.metrics import record_rate_limit_wait
+
+logger = logging.getLogger(__name__)
+
+
+def acquire(bucket, limit, period):
+    """Espera hasta que haya cupo para una solicitud más en la ventana actual de `bucket`.
+
+    El contador vive en Redis, por lo que el límite se comparte entre hilos, workers y
+    procesos del mismo sitio. Devuelve los segundos que fue necesario esperar.
+    """
+    waited = 0.0
+    while True:
+        now = time.time()
+        window = int(now // period)
+        key = frappe.cache.make_key(f"rate_limit|{bucket}|{window}")
+        try:
+            pipe = frappe.cache.pipeline(transaction=False)
+            pipe.incr(key)
+            pipe.expire(key, int(period) + 1)
+            count, _ = pipe.execute()
+        except Exception as e:
+            # Sin Redis no se limita: es preferible seguir a bloquear la sincronización
+            logger.warning(f"Rate limiter no disponible para {bucket}: {str(e)}")
+            return waited
+
+        if count <= limit:
+            record_rate_limit_wait(waited)
+            return waited
+
+        delay = (window + 1) * period - now
+        time.sleep(delay)
+        waited += delay
@@ -0,0 +1,28 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+# Clases de adaptador ya resueltas por doctype (None si el doctype no es un proveedor)
+_adapters = {}
+
+
+def get_adapter_class(doctype):
+    """Devuelve la clase del adaptador de un proveedor, o None si no hay uno registrado.
+
+    Los adaptadores se declaran en el hook `calendar_provider_adapters` como rutas; el
+    módulo del proveedor solo se importa la primera vez que se pide su adaptador.
+    """
+    if doctype not in _adapters:
+        paths = frappe.get_hooks("calendar_provider_adapters").get(doctype) if doctype else None
+        _adapters[doctype] = frappe.get_attr(paths[-1]) if paths else None
+    return _adapters[doctype]
+
+
+def get_adapter(doctype, calendar):
+    """Instancia el adaptador del proveedor para un calendario."""
+    adapter_class = get_adapter_class(doctype)
+    if not adapter_class:
+        frappe.throw(_("No hay un adaptador de sincronización para {0}").format(doctype))
+    return adapter_class(calendar)
@@ -0,0 +1,327 @@
+# Copyright (c) 2025, Yeifer and contributors
+# For license information, please see license.txt
+
+import contextvars
+import hashlib
+import json
+import logging
+import random
+import time
+
+import frappe
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, SSLError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Códigos que se reintentan con backoff; de ellos, 429 y 503 indican que el proveedor no
+# procesó la solicitud, por lo que solo esos son seguros para POST y PATCH
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+UNPROCESSED_STATUS_CODES = (429, 503)
+NON_IDEMPOTENT_METHODS = frozenset({"POST", "PATCH"})
+
+# Cabecera interna con la que un llamador marca una creación; no se envía al proveedor
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# Una creación en curso reserva su clave hasta que termina (timeout y reintentos incluidos);
+# la respuesta exitosa se recuerda IDEMPOTENCY_TTL y un resultado incierto (timeout, 5xx)
+# bloquea nuevos intentos durante UNKNOWN_TTL
+IN_FLIGHT_TTL = 2 * 60
+IDEMPOTENCY_TTL = 6 * 60 * 60
+UNKNOWN_TTL = 15 * 60
+
+# Circuito por proveedor: BREAKER_THRESHOLD fallos (conexión, timeout o 5xx) dentro de
+# BREAKER_WINDOW segundos lo abren durante BREAKER_COOLDOWN segundos
+BREAKER_THRESHOLD = 5
+BREAKER_WINDOW = 60
+BREAKER_COOLDOWN = 60
+
+# Hooks de Event pospuestos mientras el circuito de su proveedor está abierto. Un hook que
+# vuelve a encontrar el proveedor no disponible se repite sin límite; uno que falla por otro
+# motivo se descarta tras DEFERRED_HOOK_ATTEMPTS intentos
+DEFERRED_HOOKS_KEY = "calendar_sync_deferred_hooks"
+DEFERRED_HOOK_ATTEMPTS = 5
+
+# Solicitudes que el adaptador rechazó sin enviar (circuito abierto o clave en curso) en el
+# contexto actual; los hooks de los proveedores capturan sus propios errores, así que es la
+# forma de saber si un hook repetido llegó al proveedor
+_refused_requests = contextvars.ContextVar("provider_refused_requests", default=None)
+
+
+class ProviderUnavailable(requests.ConnectionError):
+    """El circuito del proveedor está abierto: la solicitud no se envía."""
+
+
+class DuplicateRequest(requests.ConnectionError):
+    """Otra creación con la misma clave está en curso o terminó con resultado incierto."""
+
+
+class ProviderRetry(Retry):
+    """Reintentos con backoff exponencial y jitter completo.
+
+    POST y PATCH solo se reintentan si el proveedor no procesó la solicitud (429, 503);
+    ante otros 5xx la creación pudo haber ocurrido y reintentarla la duplicaría.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method and method.upper() in NON_IDEMPOTENT_METHODS and status_code not in UNPROCESSED_STATUS_CODES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_backoff_time(self):
+        return random.uniform(0, super().get_backoff_time())
+
+
+class ResilientAdapter(HTTPAdapter):
+    """Adaptador de `requests` con circuito por proveedor y claves de idempotencia.
+
+    Con el circuito abierto falla de inmediato con `ProviderUnavailable`. Si la solicitud
+    lleva `Idempotency-Key`, la primera respuesta exitosa se recuerda y se devuelve a los
+    reintentos con la misma clave en lugar de crear el registro otra vez.
+    """
+
+    def __init__(self, provider, **kwargs):
+        self.provider = provider
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if is_circuit_open(self.provider):
+            raise refused(ProviderUnavailable(f"{self.provider} no disponible: circuito abierto", request=request))
+
+        key = request.headers.pop(IDEMPOTENCY_HEADER, None)
+        if key:
+            try:
+                previous = claim_idempotency_key(key)
+            except DuplicateRequest as e:
+                raise refused(e)
+            if previous is not None:
+                return build_response(request, previous)
+
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            record_failure(self.provider)
+            if key:
+                settle_idempotency_key(key, "unknown" if was_sent(e) else None)
+            raise
+
+        if response.status_code >= 500:
+            record_failure(self.provider)
+        if key:
+            settle_idempotency_key(key, get_outcome(response), response)
+        return response
+
+
+def refused(error):
+    """Anota una solicitud rechazada sin enviar en el contexto actual y devuelve el error."""
+    requests_refused = _refused_requests.get()
+    if requests_refused is not None:
+        requests_refused.append(error)
+    return error
+
+
+def was_sent(error):
+    """Si la solicitud pudo llegar al proveedor antes del error (timeout de lectura, conexión
+    cortada); sin conexión establecida es seguro volver a intentarla."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return not isinstance(reason, (ConnectTimeoutError, SSLError))
+
+
+def get_outcome(response):
+    if response.ok:
+        return "done"
+    if response.status_code >= 500 and response.status_code not in UNPROCESSED_STATUS_CODES:
+        return "unknown"
+    return None
+
+
+def get_create_key(provider, calendar, event_name, payload):
+    """Clave de idempotencia para crear en el proveedor el registro de un Event.
+
+    Incluye el calendario y una huella del cuerpo: un Event movido a otro calendario o
+    editado antes de volver a crearse no recibe la respuesta de la creación anterior.
+    """
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"create|{provider}|{calendar}|{event_name}|{digest}"
+
+
+def expire_create_key(key):
+    """Acorta la clave de una creación cuyo ID ya quedó guardado en el Event.
+
+    Desde ahí el Event se actualiza por su ID; la clave solo cubre durante IN_FLIGHT_TTL
+    los reintentos inmediatos, y si el registro se borra en el proveedor la siguiente
+    creación no recibe la respuesta con el ID borrado.
+    """
+    try:
+        pipe = _pipeline()
+        pipe.expire(_key(f"idempotency|{key}"), IN_FLIGHT_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"No se pudo acortar la clave de idempotencia {key}: {str(e)}")
+
+
+def claim_idempotency_key(key):
+    """Reserva `key`; devuelve la respuesta guardada si la creación ya se hizo.
+
+    Si otra creación con la clave está en curso o su resultado es incierto, lanza
+    `DuplicateRequest`. Sin Redis no hay reserva: se envía la solicitud.
+    """
+    name = _key(f"idempotency|{key}")
+    try:
+        pipe = _pipeline()
+        pipe.set(name, json.dumps({"state": "pending"}), nx=True, ex=IN_FLIGHT_TTL)
+        pipe.get(name)
+        claimed, value = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Idempotencia no disponible para {key}: {str(e)}")
+        return None
+
+    if claimed:
+        return None
+    entry = json.loads(value) if value else {}
+    if entry.get("state") == "done":
+        return entry
+    raise DuplicateRequest(f"La solicitud {key} ya está en curso o su resultado es incierto")
+
+
+def settle_idempotency_key(key, outcome, response=None):
+    """Cierra la reserva: guarda la respuesta exitosa, marca el resultado incierto o la libera."""
+    name = _key(f"idempotency|{key}")
+    try:
+        pipe = _pipeline()
+        if outcome == "done":
+            entry = {
+                "state": "done",
+                "status": response.status_code,
+                "headers": {"Content-Type": response.headers.get("Content-Type", "application/json")},
+                "body": response.text,
+            }
+            pipe.set(name, json.dumps(entry), ex=IDEMPOTENCY_TTL)
+        elif outcome == "unknown":
+            pipe.set(name, json.dumps({"state": "unknown"}), ex=UNKNOWN_TTL)
+        else:
+            pipe.delete(name)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"No se pudo cerrar la clave de idempotencia {key}: {str(e)}")
+
+
+def build_response(request, entry):
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = requests.structures.CaseInsensitiveDict(entry["headers"])
+    response._content = entry["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    response.reason = "OK"
+    return response
+
+
+def is_circuit_open(provider):
+    try:
+        pipe = _pipeline()
+        pipe.exists(_key(f"circuit|{provider}|open"))
+        (is_open,) = pipe.execute()
+        return bool(is_open)
+    except Exception:
+        # Sin Redis no hay circuito: es preferible intentar a bloquear la sincronización
+        return False
+
+
+def record_failure(provider):
+    """Cuenta un fallo del proveedor y abre su circuito al llegar al umbral."""
+    window = int(time.time() // BREAKER_WINDOW)
+    failures_key = _key(f"circuit|{provider}|failures|{window}")
+    try:
+        pipe = _pipeline()
+        pipe.incr(failures_key)
+        pipe.expire(failures_key, BREAKER_WINDOW + 1)
+        failures, _ = pipe.execute()
+        if failures == BREAKER_THRESHOLD:
+            pipe.set(_key(f"circuit|{provider}|open"), 1, ex=BREAKER_COOLDOWN)
+            pipe.execute()
+            logger.warning(f"Circuito de {provider} abierto por {BREAKER_COOLDOWN}s tras {failures} fallos")
+    except Exception as e:
+        logger.warning(f"No se pudo registrar el fallo de {provider}: {str(e)}")
+
+
+def defer_event_hook(provider, hook, doc):
+    """Pospone un hook de Event (insert/update/delete_event) hasta que el proveedor se recupere.
+
+    Insert y update se repiten con el Event vigente; delete guarda el documento, que ya no
+    existirá al repetirlo.
+    """
+    entry = {"provider": provider, "hook": hook, "event": doc.name}
+    if hook == "delete_event":
+        entry["doc"] = doc.as_dict()
+    push_deferred_hook(entry)
+
+
+def run_deferred_event_hooks():
+    """Scheduler: repite los hooks pospuestos de los proveedores con el circuito cerrado.
+
+    Si el hook vuelve a encontrar el proveedor no disponible o falla, la entrada vuelve a
+    la cola para el siguiente minuto.
+    """
+    # utils importa este módulo al cargar los hooks de Event: se importa aquí para no crear un ciclo
+    from extended_calendars.sync.registry import get_adapter_class
+
+    pipe = _pipeline()
+    pipe.lrange(_key(DEFERRED_HOOKS_KEY), 0, -1)
+    (values,) = pipe.execute()
+    for value in values:
+        entry = json.loads(value)
+        if is_circuit_open(entry["provider"]):
+            continue
+        pipe.lrem(_key(DEFERRED_HOOKS_KEY), 1, value)
+        pipe.execute()
+
+        if entry["hook"] == "delete_event":
+            doc = frappe._dict(entry["doc"])
+        elif frappe.db.exists("Event", entry["event"]):
+            doc = frappe.get_doc("Event", entry["event"])
+        else:
+            continue
+
+        token = _refused_requests.set([])
+        try:
+            getattr(get_adapter_class(entry["provider"]), entry["hook"])(doc)
+            frappe.db.commit()
+            error = None
+        except Exception as e:
+            frappe.db.rollback()
+            error = e
+        finally:
+            requests_refused = _refused_requests.get()
+            _refused_requests.reset(token)
+
+        if requests_refused:
+            # El proveedor sigue sin recibir la solicitud: no cuenta como intento
+            push_deferred_hook(entry)
+        elif error is not None:
+            entry["attempts"] = entry.get("attempts", 0) + 1
+            if entry["attempts"] < DEFERRED_HOOK_ATTEMPTS:
+                push_deferred_hook(entry)
+            frappe.log_error(
+                f"Error repitiendo {entry['hook']} de {entry['event']} (intento {entry['attempts']}): {str(error)}",
+                f"{entry['provider']} Sync Error",
+            )
+
+
+def push_deferred_hook(entry):
+    pipe = _pipeline()
+    pipe.rpush(_key(DEFERRED_HOOKS_KEY), json.dumps(entry, default=str))
+    pipe.execute()
+
+
+def _key(key):
+    return frappe.cache.make_key(key)
+
+
+def _pipeline():
+    return frappe.cache.pipeline(transaction=False)
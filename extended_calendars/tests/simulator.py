@@ -0,0 +1,399 @@
+# Copyright (c) 2025, Yeifer and Contributors
+# See license.txt
+
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from extended_calendars.sync.http import get_session
+from extended_calendars.sync.resilience import ResilientAdapter
+
+# Proveedor -> (prefijo de ruta en el simulador, URL base real que se intercepta)
+PROVIDERS = {
+	"GHL Calendar": ("ghl", "https://services.leadconnectorhq.com"),
+	"Calendar Hubspot": ("hubspot", "https://api.hubapi.com"),
+	"Goujana Calendar": ("goujana", "https://goujana.co"),
+}
+
+# Los eventos simulados se reparten en esta ventana a partir de ayer, dentro del rango
+# que piden los pulls (GHL consulta desde hace 3 días hasta dentro de 6 meses)
+EVENT_SPAN = timedelta(days=150)
+EVENT_DURATION = timedelta(minutes=30)
+
+GHL_CALENDAR_ID = "sim-ghl-calendar"
+GHL_USER_ID = "sim-ghl-user"
+
+
+def route_name(pattern):
+	"""Ruta legible para `calls`: /ghl/contacts/(?P<id>[^/]+) -> /ghl/contacts/{id}."""
+	return re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", pattern).replace("/?", "")
+
+
+class SimulatorAdapter(ResilientAdapter):
+	"""Adaptador de `requests` que reenvía las solicitudes de un proveedor al simulador.
+
+	Conserva el circuito y la idempotencia del adaptador real de la sesión.
+	"""
+
+	def __init__(self, provider, target, **kwargs):
+		self.target = target
+		super().__init__(provider, **kwargs)
+
+	def send(self, request, **kwargs):
+		# Se reenvía una copia: los hooks (métricas, grabación) ven la URL real del proveedor
+		parts = urlsplit(request.url)
+		forwarded = request.copy()
+		forwarded.url = f"{self.target}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+		response = super().send(forwarded, **kwargs)
+		response.request = request
+		response.url = request.url
+		return response
+
+
+class ProviderSimulator:
+	"""Servidor HTTP local que imita los endpoints de GHL, HubSpot y Goujana usados por la app.
+
+	Los registros se generan a partir de su índice, sin guardarlos, para que simular 100k
+	eventos no cueste memoria. Se puede configurar la latencia por solicitud, el tamaño de
+	página, un límite de solicitudes por segundo (responde 429) y una tasa de errores 503.
+	`calls` cuenta las solicitudes recibidas por método y ruta (con prefijo de proveedor).
+	"""
+
+	def __init__(self, events=100, contacts=None, page_size=100, latency=0.0, rate_limit=None, error_rate=0.0, goujana_calendar_name="Benchmark Goujana", seed=0):
+		self.server = None
+		self.calls = Counter()
+		self.created = Counter()
+		self._lock = threading.Lock()
+		self._window = None
+		self._window_calls = Counter()
+		self.rate_limit = None
+		self.goujana_calendar_name = goujana_calendar_name
+		self.configure(events=events, contacts=contacts, page_size=page_size, latency=latency, rate_limit=rate_limit, error_rate=error_rate, seed=seed)
+		self.routes = [
+			# GoHighLevel
+			("GET", r"/ghl/calendars/events", self.ghl_events),
+			("POST", r"/ghl/calendars/events/appointments", self.ghl_create_appointment),
+			("GET|PUT", r"/ghl/calendars/events/appointments/(?P<id>[^/]+)", self.ghl_appointment),
+			("DELETE", r"/ghl/calendars/events/(?P<id>[^/]+)", self.ok),
+			("GET", r"/ghl/calendars/(?P<id>[^/]+)", self.ghl_calendar),
+			("GET", r"/ghl/contacts/?", self.ghl_contacts),
+			("POST", r"/ghl/contacts/upsert", self.ghl_upsert_contact),
+			("POST", r"/ghl/contacts/?", self.ghl_upsert_contact),
+			("GET|PUT", r"/ghl/contacts/(?P<id>[^/]+)", self.ghl_contact),
+			# HubSpot (la app usa "contACTS": las rutas se comparan sin mayúsculas)
+			("GET", r"/hubspot/crm/v3/objects/meetings", self.hubspot_meetings),
+			("POST", r"/hubspot/crm/v3/objects/meetings", self.hubspot_create),
+			("GET", r"/hubspot/crm/v3/objects/meetings/(?P<id>[^/]+)/associations/contact", self.hubspot_associations),
+			("GET|PATCH", r"/hubspot/crm/v3/objects/meetings/(?P<id>[^/]+)", self.hubspot_object),
+			("DELETE", r"/hubspot/crm/v3/objects/meetings/(?P<id>[^/]+)", self.no_content),
+			("GET", r"/hubspot/crm/v3/objects/contacts", self.hubspot_contacts),
+			("POST", r"/hubspot/crm/v3/objects/contacts", self.hubspot_create),
+			("POST", r"/hubspot/crm/v3/objects/contacts/search", self.hubspot_search),
+			("POST", r"/hubspot/crm/v3/objects/contacts/batch/create", self.hubspot_batch_create),
+			("GET", r"/hubspot/crm/v3/objects/contacts/(?P<id>[^/]+)", self.hubspot_contact),
+			# Goujana
+			("GET", r"/goujana/api/v1/schedule/appointment/?", self.goujana_appointments),
+			("POST", r"/goujana/api/v1/schedule/appointment/?", self.goujana_create),
+		]
+		self.routes = [
+			(set(methods.split("|")), re.compile(f"^{pattern}$", re.IGNORECASE), route_name(pattern), handler)
+			for methods, pattern, handler in self.routes
+		]
+
+	def configure(self, events=None, contacts=None, page_size=None, latency=None, rate_limit=None, error_rate=None, seed=None):
+		"""Cambia el volumen y el comportamiento del simulador sin reiniciarlo."""
+		if events is not None:
+			self.events = events
+			self.contacts = contacts or max(1, min(events, 200))
+			self.base_time = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(days=1)
+			self.spacing = EVENT_SPAN / max(events, 1)
+		elif contacts is not None:
+			self.contacts = contacts
+		if page_size is not None:
+			self.page_size = page_size
+		if latency is not None:
+			self.latency = latency
+		if rate_limit is not None:
+			self.rate_limit = rate_limit or None
+		if error_rate is not None:
+			self.error_rate = error_rate
+		if seed is not None:
+			self.random = random.Random(seed)
+		return self
+
+	# Ciclo de vida
+	def start(self):
+		simulator = self
+
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = "HTTP/1.1"
+
+			def do_request(self):
+				simulator.handle(self)
+
+			do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_request
+
+			def log_message(self, format, *args):
+				pass
+
+		self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+		self.server.daemon_threads = True
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		return self
+
+	def stop(self):
+		self.uninstall()
+		if self.server:
+			self.server.shutdown()
+			self.server.server_close()
+			self.server = None
+
+	def __enter__(self):
+		return self.start().install()
+
+	def __exit__(self, *exc_info):
+		self.stop()
+
+	@property
+	def url(self):
+		host, port = self.server.server_address
+		return f"http://{host}:{port}"
+
+	def install(self):
+		"""Redirige las sesiones compartidas de los proveedores (sync.http) al simulador."""
+		for provider, (prefix, base_url) in PROVIDERS.items():
+			session = get_session(provider)
+			max_retries = session.get_adapter(base_url).max_retries
+			session.mount(base_url, SimulatorAdapter(provider, f"{self.url}/{prefix}", max_retries=max_retries))
+		return self
+
+	def uninstall(self):
+		for provider, (_prefix, base_url) in PROVIDERS.items():
+			get_session(provider).adapters.pop(base_url, None)
+
+	def reset_calls(self):
+		with self._lock:
+			self.calls.clear()
+
+	@property
+	def total_calls(self):
+		return sum(self.calls.values())
+
+	# Atención de solicitudes
+	def handle(self, request):
+		parts = urlsplit(request.path)
+		query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+		length = int(request.headers.get("Content-Length") or 0)
+		body = json.loads(request.rfile.read(length) or b"{}") if length else {}
+		provider = parts.path.strip("/").split("/", 1)[0]
+
+		status, payload, headers = self.dispatch(request.command, parts.path, query, body, provider)
+		data = json.dumps(payload).encode() if payload is not None else b""
+		request.send_response(status)
+		request.send_header("Content-Type", "application/json")
+		request.send_header("Content-Length", str(len(data)))
+		for header, value in headers.items():
+			request.send_header(header, value)
+		request.end_headers()
+		request.wfile.write(data)
+
+	def dispatch(self, method, path, query, body, provider):
+		for methods, pattern, name, handler in self.routes:
+			match = pattern.match(path)
+			if match and method in methods:
+				break
+		else:
+			return 404, {"message": f"Ruta no simulada: {method} {path}"}, {}
+
+		with self._lock:
+			self.calls[f"{method} {name}"] += 1
+			throttled = self.is_throttled(provider)
+			failed = not throttled and self.error_rate and self.random.random() < self.error_rate
+
+		if self.latency:
+			time.sleep(self.latency)
+		if throttled:
+			return 429, {"message": "Too many requests"}, {"Retry-After": "1"}
+		if failed:
+			return 503, {"message": "Service unavailable"}, {}
+		status, payload = handler(query=query, body=body, **match.groupdict())
+		return status, payload, {}
+
+	def is_throttled(self, provider):
+		if not self.rate_limit:
+			return False
+		window = int(time.monotonic())
+		if window != self._window:
+			self._window = window
+			self._window_calls.clear()
+		self._window_calls[provider] += 1
+		return self._window_calls[provider] > self.rate_limit
+
+	def next_id(self, prefix):
+		with self._lock:
+			self.created[prefix] += 1
+			return f"{prefix}-new-{self.created[prefix]:07d}"
+
+	# Generación de registros
+	def event_times(self, index):
+		start = self.base_time + self.spacing * index
+		return start, start + EVENT_DURATION
+
+	def indices_between(self, start, end):
+		"""Índices de los eventos que empiezan en [start, end)."""
+		first = max(0, math.ceil((start - self.base_time) / self.spacing))
+		last = min(self.events, math.ceil((end - self.base_time) / self.spacing))
+		return range(first, max(first, last))
+
+	def contact_index(self, index):
+		return index % self.contacts
+
+	def paginate(self, query, total):
+		limit = min(int(query.get("limit") or self.page_size), self.page_size)
+		start = int(query.get("after") or 0)
+		indices = range(start, min(start + limit, total))
+		paging = {"next": {"after": str(indices.stop)}} if indices.stop < total else None
+		return indices, paging
+
+	# Respuestas genéricas
+	def ok(self, query, body, **kwargs):
+		return 200, {"succeeded": True}
+
+	def no_content(self, query, body, **kwargs):
+		return 204, None
+
+	# GoHighLevel
+	def ghl_event(self, index):
+		start, end = self.event_times(index)
+		return {
+			"id": f"ghl-evt-{index:07d}",
+			"calendarId": GHL_CALENDAR_ID,
+			"title": f"Cita simulada {index}",
+			"startTime": start.isoformat(),
+			"endTime": end.isoformat(),
+			"notes": f"Notas {index}",
+			"contactId": f"ghl-ct-{self.contact_index(index):07d}",
+		}
+
+	def ghl_contact_data(self, index):
+		return {"id": f"ghl-ct-{index:07d}", "firstName": f"Contacto {index}", "phone": f"+57300{index:07d}"}
+
+	def ghl_events(self, query, body):
+		to_datetime = lambda ms: datetime.fromtimestamp(int(ms) / 1000, tz=timezone.utc)
+		indices = self.indices_between(to_datetime(query["startTime"]), to_datetime(query["endTime"]))
+		return 200, {"events": [self.ghl_event(index) for index in indices]}
+
+	def ghl_calendar(self, query, body, id):
+		return 200, {"calendar": {"id": id, "teamMembers": [{"userId": GHL_USER_ID}]}}
+
+	def ghl_contacts(self, query, body):
+		limit = min(int(query.get("limit") or self.page_size), self.page_size)
+		if query.get("startAfterId"):
+			start = int(query["startAfterId"].rsplit("-", 1)[-1]) + 1
+		else:
+			start = (int(query.get("page") or 1) - 1) * limit
+		contacts = [self.ghl_contact_data(index) for index in range(start, min(start + limit, self.contacts))]
+		meta = {"startAfterId": contacts[-1]["id"], "startAfter": int(time.time() * 1000)} if contacts else {}
+		return 200, {"contacts": contacts, "meta": meta}
+
+	def ghl_contact(self, query, body, id):
+		index = int(id.rsplit("-", 1)[-1]) if id.startswith("ghl-ct-") and id[7:].isdigit() else None
+		if index is None or index >= self.contacts:
+			return 404, {"message": "Contact not found"}
+		return 200, {"contact": self.ghl_contact_data(index)}
+
+	def ghl_upsert_contact(self, query, body):
+		return 200, {"contact": {**body, "id": self.next_id("ghl-ct")}}
+
+	def ghl_create_appointment(self, query, body):
+		return 201, {**body, "id": self.next_id("ghl-evt")}
+
+	def ghl_appointment(self, query, body, id):
+		return 200, {**body, "id": id}
+
+	# HubSpot
+	def hubspot_meeting(self, index):
+		start, end = self.event_times(index)
+		return {
+			"id": str(100000000 + index),
+			"properties": {
+				"hs_meeting_title": f"Reunión simulada {index}",
+				"hs_meeting_start_time": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+				"hs_meeting_end_time": end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+				"hs_meeting_body": f"Notas {index}",
+			},
+		}
+
+	def hubspot_contact_data(self, index):
+		return {
+			"id": str(200000000 + index),
+			"properties": {
+				"firstname": f"Contacto{index}",
+				"lastname": "Simulado",
+				"email": f"contacto{index}@simulator.test",
+			},
+		}
+
+	def hubspot_meetings(self, query, body):
+		indices, paging = self.paginate(query, self.events)
+		return 200, self.hubspot_page([self.hubspot_meeting(index) for index in indices], paging)
+
+	def hubspot_associations(self, query, body, id):
+		index = int(id) - 100000000
+		if not 0 <= index < self.events:
+			return 404, {"message": "Meeting not found"}
+		contact_id = str(200000000 + self.contact_index(index))
+		return 200, {"results": [{"id": contact_id, "type": "meeting_event_to_contact"}]}
+
+	def hubspot_contacts(self, query, body):
+		indices, paging = self.paginate(query, self.contacts)
+		return 200, self.hubspot_page([self.hubspot_contact_data(index) for index in indices], paging)
+
+	def hubspot_page(self, results, paging):
+		# HubSpot omite `paging` en la última página
+		return {"results": results, "paging": paging} if paging else {"results": results}
+
+	def hubspot_contact(self, query, body, id):
+		index = int(id) - 200000000 if id.isdigit() else -1
+		if not 0 <= index < self.contacts:
+			return 404, {"message": "Contact not found"}
+		return 200, self.hubspot_contact_data(index)
+
+	def hubspot_create(self, query, body):
+		return 201, {"id": self.next_id("hubspot"), **body}
+
+	def hubspot_object(self, query, body, id):
+		return 200, {"id": id, **body}
+
+	def hubspot_search(self, query, body):
+		return 200, {"total": 0, "results": []}
+
+	def hubspot_batch_create(self, query, body):
+		results = [{"id": self.next_id("hubspot"), **item} for item in body.get("inputs", [])]
+		return 201, {"status": "COMPLETE", "results": results}
+
+	# Goujana
+	def goujana_appointment(self, index):
+		start, end = self.event_times(index)
+		return {
+			"id": 300000000 + index,
+			"text": f"Cita simulada {index}",
+			"observations": f"Notas {index}",
+			"start_date": start.strftime("%Y-%m-%d %H:%M:%S"),
+			"end_date": end.strftime("%Y-%m-%d %H:%M:%S"),
+			"customer": {"id": self.contact_index(index)},
+			"calendar": {"id": 1, "label": f"{self.goujana_calendar_name} | Simulador"},
+		}
+
+	def goujana_appointments(self, query, body):
+		return 200, {"results": [self.goujana_appointment(index) for index in range(self.events)]}
+
+	def goujana_create(self, query, body):
+		return 201, {**body, "id": self.next_id("goujana")}
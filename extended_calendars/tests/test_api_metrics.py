@@ -0,0 +1,25 @@
+# Copyright (c) 2025, Yeifer and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from extended_calendars.sync.api_metrics import field_name, format_metrics
+
+
+class TestAPIMetrics(FrappeTestCase):
+	def test_format_metrics(self):
+		labels = ("Calendar Hubspot", "GET", "api.hubapi.com/crm/v3/objects/meetings/{id}")
+		text = format_metrics({
+			field_name("calendar_api_requests_total", *labels, 429): "2",
+			field_name("calendar_api_request_duration_seconds_bucket", *labels, "+Inf"): "2",
+			field_name("calendar_api_request_duration_seconds_sum", *labels): "0.5",
+			"unknown_metric|x": "1",
+		})
+		self.assertIn("# TYPE calendar_api_request_duration_seconds histogram", text)
+		self.assertIn(
+			'calendar_api_requests_total{provider="Calendar Hubspot",method="GET",'
+			'endpoint="api.hubapi.com/crm/v3/objects/meetings/{id}",status="429"} 2',
+			text,
+		)
+		self.assertIn('le="+Inf"} 2', text)
+		self.assertNotIn("unknown_metric", text)
@@ -0,0 +1,35 @@
+# Copyright (c) 2025, Yeifer and Contributors
+# See license.txt
+
+import requests
+from frappe.tests.utils import FrappeTestCase
+
+from extended_calendars.sync.capture import ReplayAdapter, scrub_headers, scrub_response_body, scrub_url, scrub_value
+
+
+class TestCapture(FrappeTestCase):
+	def test_scrub_secrets(self):
+		self.assertEqual(scrub_headers({"Authorization": "Bearer x", "Accept": "*/*"}), {"Authorization": "***", "Accept": "*/*"})
+		self.assertEqual(scrub_url("https://goujana.co/api?api_key=x&page=2"), "https://goujana.co/api?api_key=%2A%2A%2A&page=2")
+		self.assertEqual(
+			scrub_value({"properties": {"email": "a@b.co"}, "refresh_token": "x", "items": [{"password": "y"}]}),
+			{"properties": {"email": "a@b.co"}, "refresh_token": "***", "items": [{"password": "***"}]},
+		)
+		self.assertEqual(scrub_response_body('{"access_token": "x", "id": 1}'), '{"access_token": "***", "id": 1}')
+		self.assertEqual(scrub_response_body("<html></html>"), "<html></html>")
+
+	def test_replay_matches_exact_then_by_path(self):
+		url = "https://services.leadconnectorhq.com/calendars/events"
+		adapter = ReplayAdapter([
+			{"method": "GET", "url": f"{url}?startTime=1", "status": 200, "headers": {}, "body": '{"events": [1]}'},
+			{"method": "GET", "url": f"{url}?startTime=2", "status": 200, "headers": {}, "body": '{"events": [2]}'},
+		])
+		session = requests.Session()
+		session.mount("https://", adapter)
+
+		self.assertEqual(session.get(f"{url}?startTime=2").json(), {"events": [2]})
+		# Parámetros distintos (otra hora): la siguiente respuesta grabada de la misma ruta
+		self.assertEqual(session.get(f"{url}?startTime=9").json(), {"events": [1]})
+		with self.assertRaises(requests.ConnectionError):
+			session.get(url)
+		self.assertEqual(adapter.unmatched, [f"GET {url}"])
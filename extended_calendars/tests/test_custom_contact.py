@@ -0,0 +1,37 @@
+# Copyright (c) 2025, Yeifer and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from extended_calendars.overrides.contact.custom_contact import get_hubspot_contact_queue_key
+
+
+class TestCustomContact(FrappeTestCase):
+	def setUp(self):
+		name = frappe.db.get_value("Calendar Hubspot", {"calendar_name": "Contact Queue HubSpot"})
+		calendar = frappe.get_doc("Calendar Hubspot", name) if name else frappe.new_doc("Calendar Hubspot")
+		calendar.update({"calendar_name": "Contact Queue HubSpot", "usser": "queue@simulator.test", "access_token": "sim-token", "calendar_id": "sim-hubspot-calendar"})
+		calendar.save(ignore_permissions=True)
+		self.calendar = calendar.name
+		self.addCleanup(frappe.cache.delete_value, get_hubspot_contact_queue_key(self.calendar))
+
+		frappe.flags.pop("hubspot_contact_queue_scheduled", None)
+		self.enqueued = []
+		enqueue = frappe.enqueue
+		frappe.enqueue = lambda method, **kwargs: self.enqueued.append(kwargs)
+		self.addCleanup(setattr, frappe, "enqueue", enqueue)
+
+	def test_bulk_insert_enqueues_once_per_calendar(self):
+		for index in range(5):
+			frappe.get_doc({
+				"doctype": "Contact",
+				"first_name": f"Contacto en cola {index}",
+				"mobile_no": f"301000000{index}",
+				"custom_calendar_provider": "Calendar Hubspot",
+				"custom_calendar": self.calendar,
+			}).insert(ignore_permissions=True)
+
+		self.assertEqual(len(self.enqueued), 1)
+		self.assertEqual(self.enqueued[0]["calendar"], self.calendar)
+		self.assertEqual(len(frappe.cache.smembers(get_hubspot_contact_queue_key(self.calendar))), 5)
@@ -0,0 +1,18 @@
+# Copyright (c) 2025, Yeifer and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from extended_calendars.sync.engine import has_validated_changes
+
+
+class TestEngine(FrappeTestCase):
+	def test_validated_changes_skip_bulk_update(self):
+		row = frappe._dict(starts_on="2025-01-01 10:00:00", ends_on="2025-01-01 10:30:00", custom_calendar="GHL A", subject="Antes")
+
+		# Solo cambian campos de datos: puede ir al bulk_update
+		self.assertFalse(has_validated_changes({"subject": "Después", "starts_on": "2025-01-01 10:00:00", "custom_calendar": "GHL A"}, row))
+		# Fechas movidas o calendario distinto: el Event pasa por validate/before_save
+		self.assertTrue(has_validated_changes({"starts_on": "2025-01-01 11:00:00"}, row))
+		self.assertTrue(has_validated_changes({"custom_calendar": "GHL B"}, row))
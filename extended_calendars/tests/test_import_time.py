@@ -0,0 +1,52 @@
+# Copyright (c) 2025, Yeifer and Contributors
+# See license.txt
+
+import subprocess
+import sys
+
+from frappe.tests.utils import FrappeTestCase
+
+PROVIDER_MODULES = (
+	"extended_calendars.extended_calendars.doctype.calendar_hubspot.calendar_hubspot",
+	"extended_calendars.extended_calendars.doctype.ghl_calendar.ghl_calendar",
+	"extended_calendars.extended_calendars.doctype.goujana_calendar.goujana_calendar",
+)
+GOOGLE_CALENDAR_MODULE = "frappe.integrations.doctype.google_calendar.google_calendar"
+
+
+def get_import_times(statement):
+	"""Ejecuta `statement` con `python -X importtime` y devuelve {módulo: µs acumulados}."""
+	result = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", statement],
+		capture_output=True,
+		text=True,
+		check=True,
+	)
+	times = {}
+	for line in result.stderr.splitlines():
+		if not line.startswith("import time:"):
+			continue
+		_self_us, cumulative_us, module = line[len("import time:") :].split("|")
+		if cumulative_us.strip().isdigit():
+			times[module.strip()] = int(cumulative_us)
+	return times
+
+
+class TestImportTime(FrappeTestCase):
+	def test_app_import_does_not_load_google_calendar(self):
+		times = get_import_times("import extended_calendars")
+		self.assertNotIn(GOOGLE_CALENDAR_MODULE, times)
+		self.assertNotIn("googleapiclient", times)
+
+	def test_event_hooks_do_not_load_providers(self):
+		times = get_import_times("import extended_calendars.utils")
+		for module in PROVIDER_MODULES:
+			self.assertNotIn(module, times)
+		print(f"\nextended_calendars.utils: {times['extended_calendars.utils'] / 1000:.1f} ms")
+
+	def test_provider_import_times(self):
+		# Referencia para comparar entre versiones: costo de importar cada proveedor en frío
+		for module in PROVIDER_MODULES:
+			times = get_import_times(f"import {module}")
+			self.assertIn(module, times)
+			print(f"\n{module}: {times[module] / 1000:.1f} ms")
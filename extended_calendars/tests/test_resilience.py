@@ -0,0 +1,43 @@
+# Copyright (c) 2025, Yeifer and Contributors
+# See license.txt
+
+import requests
+from frappe.tests.utils import FrappeTestCase
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from extended_calendars.sync.resilience import ProviderRetry, get_create_key, get_outcome, was_sent
+
+
+class TestResilience(FrappeTestCase):
+	def test_creates_only_retry_unprocessed_statuses(self):
+		retry = ProviderRetry(total=3, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=None)
+		self.assertTrue(retry.is_retry("GET", 500))
+		self.assertTrue(retry.is_retry("PUT", 502))
+		self.assertTrue(retry.is_retry("POST", 429))
+		self.assertTrue(retry.is_retry("POST", 503))
+		self.assertFalse(retry.is_retry("POST", 500))
+		self.assertFalse(retry.is_retry("PATCH", 504))
+
+	def test_idempotency_outcome(self):
+		def response(status):
+			result = requests.Response()
+			result.status_code = status
+			return result
+
+		self.assertEqual(get_outcome(response(201)), "done")
+		self.assertEqual(get_outcome(response(502)), "unknown")
+		self.assertIsNone(get_outcome(response(503)))
+		self.assertIsNone(get_outcome(response(400)))
+
+	def test_was_sent(self):
+		refused = MaxRetryError(None, "/", NewConnectionError(None, "refused"))
+		self.assertFalse(was_sent(requests.ConnectionError(refused)))
+		self.assertFalse(was_sent(requests.exceptions.ConnectTimeout()))
+		self.assertTrue(was_sent(requests.ConnectionError(ProtocolError("reset"))))
+		self.assertTrue(was_sent(requests.exceptions.ReadTimeout()))
+
+	def test_create_key_tracks_calendar_and_payload(self):
+		key = get_create_key("GHL Calendar", "cal-1", "EV-1", {"title": "A", "startTime": "1"})
+		self.assertEqual(key, get_create_key("GHL Calendar", "cal-1", "EV-1", {"startTime": "1", "title": "A"}))
+		self.assertNotEqual(key, get_create_key("GHL Calendar", "cal-2", "EV-1", {"title": "A", "startTime": "1"}))
+		self.assertNotEqual(key, get_create_key("GHL Calendar", "cal-1", "EV-1", {"title": "B", "startTime": "1"}))
@@ -0,0 +1,246 @@
+# Copyright (c) 2025, Yeifer and Contributors
+# See license.txt
+
+import json
+import os
+import time
+import tracemalloc
+from datetime import timedelta
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import now_datetime
+
+from extended_calendars.extended_calendars.doctype.calendar_hubspot.calendar_hubspot import (
+	pull_hubspot_data,
+	push_hubspot_data,
+)
+from extended_calendars.extended_calendars.doctype.ghl_calendar.ghl_calendar import pull_ghl_data, push_ghl_data
+from extended_calendars.sync.config import invalidate_provider_config
+from extended_calendars.tests.simulator import GHL_CALENDAR_ID, ProviderSimulator
+
+# Tamaños medidos; en CI basta con 100, localmente p. ej. "100,10000,100000"
+BENCHMARK_SIZES = [int(size) for size in os.environ.get("EXTENDED_CALENDARS_BENCHMARK_SIZES", "100").split(",")]
+
+# Si se indica, los resultados se guardan en este archivo JSON para comparar ejecuciones
+BENCHMARK_OUTPUT = os.environ.get("EXTENDED_CALENDARS_BENCHMARK_OUTPUT")
+
+# Techos por evento (llamadas a la API, consultas a la base); superarlos es una regresión
+BUDGETS = {
+	("GHL Calendar", "pull"): {"api_calls": 1.5, "queries": 50},
+	("GHL Calendar", "pull unchanged"): {"api_calls": 1.5, "queries": 1},
+	("GHL Calendar", "push"): {"api_calls": 2.5, "queries": 5},
+	("Calendar Hubspot", "pull"): {"api_calls": 2.5, "queries": 60},
+	("Calendar Hubspot", "pull unchanged"): {"api_calls": 2.5, "queries": 2},
+	("Calendar Hubspot", "push"): {"api_calls": 3, "queries": 10},
+	("Goujana Calendar", "pull"): {"api_calls": 0.1, "queries": 50},
+	("Goujana Calendar", "pull unchanged"): {"api_calls": 0.1, "queries": 1},
+	("Goujana Calendar", "push"): {"api_calls": 1, "queries": 1},
+}
+
+results = []
+
+
+def measure(simulator, provider, operation, events, func):
+	"""Ejecuta `func` midiendo tiempo, llamadas al simulador, consultas SQL y memoria pico.
+
+	El rendimiento incluye el costo de tracemalloc, por lo que solo es comparable entre
+	ejecuciones de esta misma suite.
+	"""
+	simulator.reset_calls()
+	sql = frappe.db.sql
+	queries = 0
+
+	def counted_sql(*args, **kwargs):
+		nonlocal queries
+		queries += 1
+		return sql(*args, **kwargs)
+
+	frappe.db.sql = counted_sql
+	tracemalloc.start()
+	start = time.perf_counter()
+	try:
+		result = func()
+	finally:
+		seconds = time.perf_counter() - start
+		_current, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		frappe.db.sql = sql
+
+	measurement = {
+		"provider": provider,
+		"operation": operation,
+		"events": events,
+		"seconds": round(seconds, 3),
+		"events_per_second": round(events / seconds, 1) if seconds else None,
+		"api_calls_per_event": round(simulator.total_calls / events, 3),
+		"queries_per_event": round(queries / events, 3),
+		"peak_memory_mb": round(peak / 1024 / 1024, 2),
+		"success": bool(result.get("success")),
+	}
+	results.append(measurement)
+	return measurement
+
+
+def insert_pending_events(provider, calendar, count, get_fields):
+	"""Inserta en bloque `count` Event pendientes de push, sin disparar los hooks del proveedor."""
+	now = now_datetime()
+	rows = []
+	for index in range(count):
+		starts_on = now + timedelta(hours=index)
+		rows.append({
+			"name": f"SIM-{provider[:3].upper()}-{index:07d}",
+			"subject": f"Evento simulado {index}",
+			"event_type": "Private",
+			"status": "Open",
+			"starts_on": starts_on,
+			"ends_on": starts_on + timedelta(minutes=30),
+			"custom_calendar_provider": provider,
+			"custom_calendar": calendar,
+			"custom_sync_with_calendar_provider": 1,
+			"owner": "Administrator",
+			"modified_by": "Administrator",
+			"creation": now,
+			"modified": now,
+			**get_fields(index),
+		})
+	fields = list(rows[0])
+	frappe.db.bulk_insert("Event", fields, [[row[field] for field in fields] for row in rows])
+	return [row["name"] for row in rows]
+
+
+def insert_sim_contacts(count):
+	"""Contactos de Frappe con el mismo nombre que los contactos simulados de HubSpot."""
+	now = now_datetime()
+	names = [f"SIM-CONTACT-{index:07d}" for index in range(count)]
+	frappe.db.bulk_insert(
+		"Contact",
+		["name", "first_name", "mobile_no", "owner", "modified_by", "creation", "modified"],
+		[[name, f"Contacto{index}", f"300{index:07d}", "Administrator", "Administrator", now, now] for index, name in enumerate(names)],
+		ignore_duplicates=True,
+	)
+	return names
+
+
+class TestSyncBenchmark(FrappeTestCase):
+	"""Rendimiento de pull y push contra el simulador local de proveedores (sin red)."""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.simulator = ProviderSimulator().start().install()
+		cls.calendars = {
+			"GHL Calendar": cls.get_calendar("GHL Calendar", calendar_name="Benchmark GHL", calendar_id=GHL_CALENDAR_ID, location_id="sim-location"),
+			"Calendar Hubspot": cls.get_calendar("Calendar Hubspot", calendar_name="Benchmark HubSpot", calendar_id="sim-hubspot-calendar", usser="benchmark@simulator.test"),
+			"Goujana Calendar": cls.get_calendar("Goujana Calendar", calendar_name=cls.simulator.goujana_calendar_name, calendar_id="1", cookie_value="sim-cookie"),
+		}
+		frappe.db.commit()
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.simulator.stop()
+		for calendar in cls.calendars.values():
+			cls.delete_events(calendar)
+		frappe.db.delete("Event Participants", {"reference_docname": ["like", "SIM-CONTACT-%"]})
+		frappe.db.delete("Contact", {"name": ["like", "SIM-CONTACT-%"]})
+		# Contactos creados por el pull de HubSpot a partir de los participantes simulados
+		frappe.db.delete("Contact", {"email_id": ["like", "%@simulator.test"]})
+		frappe.db.commit()
+		if BENCHMARK_OUTPUT:
+			with open(BENCHMARK_OUTPUT, "w") as output:
+				json.dump(results, output, indent=1)
+		super().tearDownClass()
+
+	@classmethod
+	def get_calendar(cls, doctype, **fields):
+		name = frappe.db.get_value(doctype, {"calendar_name": fields["calendar_name"]})
+		doc = frappe.get_doc(doctype, name) if name else frappe.new_doc(doctype)
+		doc.update({"access_token": "sim-token", "pull": 1, "push": 1, **fields})
+		doc.save(ignore_permissions=True)
+		return doc.name
+
+	@staticmethod
+	def delete_events(calendar):
+		names = frappe.get_all("Event", filters={"custom_calendar": calendar}, pluck="name")
+		if names:
+			frappe.db.delete("Event Participants", {"parenttype": "Event", "parent": ["in", names]})
+			frappe.db.delete("Event", {"name": ["in", names]})
+		frappe.db.commit()
+
+	def setUp(self):
+		# Cachés de proveedor vacías: cada medición parte del mismo estado
+		frappe.cache.delete_keys("ghl_")
+		for provider, calendar in self.calendars.items():
+			invalidate_provider_config(provider, calendar)
+
+	def assert_budget(self, measurement):
+		budget = BUDGETS[(measurement["provider"], measurement["operation"])]
+		print(json.dumps(measurement))
+		self.assertTrue(measurement["success"], measurement)
+		self.assertLessEqual(measurement["api_calls_per_event"], budget["api_calls"], measurement)
+		self.assertLessEqual(measurement["queries_per_event"], budget["queries"], measurement)
+
+	def run_pull(self, provider, pull):
+		calendar = self.calendars[provider]
+		for size in BENCHMARK_SIZES:
+			with self.subTest(provider=provider, events=size):
+				self.simulator.configure(events=size)
+				try:
+					self.assert_budget(measure(self.simulator, provider, "pull", size, lambda: pull(calendar)))
+					self.assertEqual(frappe.db.count("Event", {"custom_calendar": calendar}), size)
+					self.setUp()
+					self.assert_budget(measure(self.simulator, provider, "pull unchanged", size, lambda: pull(calendar)))
+				finally:
+					self.delete_events(calendar)
+
+	def run_push(self, provider, push, get_fields, after_insert=None):
+		calendar = self.calendars[provider]
+		for size in BENCHMARK_SIZES:
+			with self.subTest(provider=provider, events=size):
+				self.simulator.configure(events=0, contacts=200)
+				try:
+					events = insert_pending_events(provider, calendar, size, get_fields)
+					if after_insert:
+						after_insert(events)
+					frappe.db.commit()
+					self.assert_budget(measure(self.simulator, provider, "push", size, lambda: push(calendar)))
+				finally:
+					self.delete_events(calendar)
+
+	def test_ghl_pull(self):
+		self.run_pull("GHL Calendar", pull_ghl_data)
+
+	def test_hubspot_pull(self):
+		self.run_pull("Calendar Hubspot", pull_hubspot_data)
+
+	def test_goujana_pull(self):
+		self.run_pull("Goujana Calendar", lambda calendar: frappe.get_doc("Goujana Calendar", calendar).process_pull())
+
+	def test_ghl_push(self):
+		self.run_push(
+			"GHL Calendar",
+			push_ghl_data,
+			lambda index: {"custom_client_name": f"Cliente {index % 200}", "custom_contact_phone": f"300{index % 200:07d}"},
+		)
+
+	def test_hubspot_push(self):
+		contacts = insert_sim_contacts(200)
+
+		def add_participants(events):
+			frappe.db.bulk_insert(
+				"Event Participants",
+				["name", "parent", "parenttype", "parentfield", "idx", "reference_doctype", "reference_docname"],
+				[
+					[frappe.generate_hash(length=12), event, "Event", "event_participants", 1, "Contact", contacts[index % len(contacts)]]
+					for index, event in enumerate(events)
+				],
+			)
+
+		self.run_push("Calendar Hubspot", push_hubspot_data, lambda index: {}, after_insert=add_participants)
+
+	def test_goujana_push(self):
+		self.run_push(
+			"Goujana Calendar",
+			lambda calendar: frappe.get_doc("Goujana Calendar", calendar).process_push(),
+			lambda index: {"custom_goujana_customer_id": index % 200, "custom_calendar_id": 1},
+		)
@@ -1,37 +1,28 @@
 import frappe
-from extended_calendars.extended_calendars.doctype.calendar_hubspot.calendar_hubspot import (
-    insert_event_in_calendar_hubspot,
-    update_event_in_calendar_hubspot,
-    delete_event_in_calendar_hubspot
-)
-from extended_calendars.extended_calendars.doctype.ghl_calendar.ghl_calendar import (
-    insert_event_in_ghl_calendar,
-    update_event_in_ghl_calendar,
-    delete_event_in_ghl_calendar
-)
-from extended_calendars.extended_calendars.doctype.goujana_calendar.goujana_calendar import (
-    insert_event_in_goujana_calendar,
-)
+from extended_calendars.sync.registry import get_adapter_class
+from extended_calendars.sync.resilience import defer_event_hook, is_circuit_open
+
+def get_event_adapter_class(doc):
+    # Los Event guardados por un pull ya reflejan al proveedor: no se reenvían
+    if doc.flags.pulled_from_provider:
+        return None
+    return get_adapter_class(doc.custom_calendar_provider)
+
+def run_event_hook(doc, hook, method=None):
+    adapter_class = get_event_adapter_class(doc)
+    if not adapter_class:
+        return
+    # Con el proveedor caído no se hace esperar el guardado: el scheduler lo repite después
+    if is_circuit_open(adapter_class.doctype):
+        defer_event_hook(adapter_class.doctype, hook, doc)
+        return
+    getattr(adapter_class, hook)(doc, method)
 
 def insert_event_in_calendar_provider(doc, method=None):
-    if doc.custom_calendar_provider == "Calendar Hubspot":
-        insert_event_in_calendar_hubspot(doc, method)
-    elif doc.custom_calendar_provider == "GHL Calendar":
-        insert_event_in_ghl_calendar(doc, method)
-    elif doc.custom_calendar_provider == "Goujana Calendar":
-        insert_event_in_goujana_calendar(doc, method)
+    run_event_hook(doc, "insert_event", method)
 
 def update_event_in_calendar_provider(doc, method=None):
-    if doc.custom_calendar_provider == "Calendar Hubspot":
-        update_event_in_calendar_hubspot(doc, method)
-    elif doc.custom_calendar_provider == "GHL Calendar":
-        update_event_in_ghl_calendar(doc, method)
-    #elif doc.custom_calendar_provider == "Goujana Calendar":
-    #    insert_event_in_goujana_calendar(doc, method)
+    run_event_hook(doc, "update_event", method)
 
 def delete_event_in_calendar_provider(doc, method=None):
-    if doc.custom_calendar_provider == "Calendar Hubspot":
-        delete_event_in_calendar_hubspot(doc, method)
-    elif doc.custom_calendar_provider == "GHL Calendar":
-        delete_event_in_ghl_calendar(doc, method)
-
+    run_event_hook(doc, "delete_event", method)